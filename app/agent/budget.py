@@ -0,0 +1,102 @@
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+
+from claude_agent_sdk import AssistantMessage, ResultMessage, TextBlock
+
+from app.core.config import AgentConfig
+
+_USAGE_KEYS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_read_input_tokens",
+    "cache_creation_input_tokens",
+)
+
+# 兜底结果中保留的 Agent 文本条数
+_KEEP_TEXTS = 5
+
+
+@dataclass
+class ReviewBudget:
+    """单次审查的资源预算：token、轮次、耗时与文件获取次数，从消息流中累计"""
+
+    max_tokens: int
+    max_turns: int
+    max_seconds: float
+    max_file_fetches: int
+    max_payload_bytes: int = 0
+    wrap_up_ratio: float = 0.8
+    started_at: float = field(default_factory=time.monotonic)
+    tokens: int = 0
+    turns: int = 0
+    file_fetches: int = 0
+    payload_bytes: int = 0
+    wrapping_up: bool = False
+    texts: List[str] = field(default_factory=list)
+    _message_ids: Set[str] = field(default_factory=set)
+
+    @classmethod
+    def from_config(cls, config: AgentConfig) -> "ReviewBudget":
+        return cls(
+            max_tokens=config.max_review_tokens,
+            max_turns=config.max_turns,
+            max_seconds=config.max_review_seconds,
+            max_file_fetches=config.max_file_fetches,
+            max_payload_bytes=config.max_review_payload_bytes,
+            wrap_up_ratio=config.wrap_up_ratio,
+        )
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def remaining_seconds(self) -> float:
+        return max(self.max_seconds - self.elapsed, 0.0)
+
+    def record(self, msg) -> None:
+        """累计一条消息的用量。同一次模型响应会拆成多条消息，按 message_id 只计一次"""
+        if isinstance(msg, AssistantMessage):
+            for block in msg.content:
+                if isinstance(block, TextBlock) and block.text.strip():
+                    self.texts = (self.texts + [block.text])[-_KEEP_TEXTS:]
+            if msg.message_id and msg.message_id in self._message_ids:
+                return
+            if msg.message_id:
+                self._message_ids.add(msg.message_id)
+            self.turns += 1
+            if msg.usage:
+                self.tokens += sum(int(msg.usage.get(key) or 0) for key in _USAGE_KEYS)
+        elif isinstance(msg, ResultMessage) and msg.usage and not self._message_ids:
+            # 未能从逐条消息取得用量时，以会话汇总为准
+            self.tokens = max(
+                self.tokens, sum(int(msg.usage.get(key) or 0) for key in _USAGE_KEYS)
+            )
+
+    def record_file_fetch(self) -> bool:
+        """登记一次文件获取，超出预算时返回 False"""
+        if self.wrapping_up or self.file_fetches >= self.max_file_fetches:
+            return False
+        if self.max_payload_bytes and self.payload_bytes >= self.max_payload_bytes:
+            return False
+        self.file_fetches += 1
+        return True
+
+    def record_payload(self, text: str) -> None:
+        """累计工具返回给 Agent 的内容大小（字节）"""
+        self.payload_bytes += len(text.encode("utf-8"))
+
+    def exhausted(self) -> Optional[str]:
+        """接近耗尽的预算项（达到 wrap_up_ratio），未接近时返回 None"""
+        if self.tokens >= self.max_tokens * self.wrap_up_ratio:
+            return f"token 用量 {self.tokens}/{self.max_tokens}"
+        if self.elapsed >= self.max_seconds * self.wrap_up_ratio:
+            return f"耗时 {self.elapsed:.0f}s/{self.max_seconds:.0f}s"
+        # 至少为提交结果保留一轮
+        if self.turns >= max(self.max_turns - 1, 1):
+            return f"轮次 {self.turns}/{self.max_turns}"
+        if self.file_fetches >= self.max_file_fetches:
+            return f"文件获取 {self.file_fetches}/{self.max_file_fetches} 次"
+        if self.max_payload_bytes and self.payload_bytes >= self.max_payload_bytes:
+            return f"内容 {self.payload_bytes}/{self.max_payload_bytes} 字节"
+        return None
@@ -1,14 +1,26 @@
+import asyncio
 import logging
+from typing import Callable, Optional, Set
 
 from claude_agent_sdk import (
     ClaudeAgentOptions,
     ClaudeSDKClient,
     AssistantMessage,
+    CLIConnectionError,
     TextBlock,
+    ToolResultBlock,
+    ToolUseBlock,
+    UserMessage,
 )
 
+from app.agent.budget import ReviewBudget
+from app.agent.transcript import TranscriptRecorder
 from app.core.config import BASE_DIR, settings
-from app.models.review import AgentReviewResult
+from app.core.metrics import metrics
+from app.core.outbound import get_governor
+from app.models.diff import ParsedDiff
+from app.models.review import AgentReviewResult, ReviewDecision
+from app.service.review_cache import ReviewCache
 from app.agent.tools import (
     create_review_tools_server,
     set_review_context,
@@ -36,6 +48,34 @@ TOOL_USAGE_GUIDE = """
 - 最终必须调用 submit_review 提交结果，不要只输出文本
 """
 
+SYMBOL_INDEX_GUIDE = """
+### 代码索引
+
+- 需要了解变更函数、类的调用方或定义时，优先调用 `find_references` / `find_definition`
+  （参数 branch 使用源分支），只对查询结果中确有必要的文件再调用 get_file_content
+- 不知道文件路径时，用 `search_code` 按关键词搜索，结果已包含带行号的代码片段
+"""
+
+
+WRAP_UP_PROMPT = (
+    "本次审查的资源预算即将用尽（{reason}）。请不要再调用 get_diff 以外的信息获取工具，"
+    "立即基于已经掌握的信息调用 submit_review 提交审查结果，"
+    "并在 mrDescription 中注明哪些部分因预算限制未能完整审查。"
+)
+
+
+_TRANSIENT_MARKERS = ("rate_limit", "rate limit", "429", "overloaded", "529")
+
+
+def _classify_claude_error(exc: Exception) -> Optional[float]:
+    """Claude 调用错误分类：连接失败、限流与过载视为可重试"""
+    if isinstance(exc, CLIConnectionError):
+        return 0.0
+    message = str(exc).lower()
+    if any(marker in message for marker in _TRANSIENT_MARKERS):
+        return 0.0
+    return None
+
 
 class CodeReviewAgent:
     """基于 Claude Agent SDK 的代码审查 Agent"""
@@ -65,6 +105,8 @@ class CodeReviewAgent:
         """构建 system prompt：模板 + json_schema + 工具使用指导"""
         prompt = self._prompt_template.format(json_schema=self._json_schema)
         prompt += "\n" + TOOL_USAGE_GUIDE
+        if settings.index.enabled:
+            prompt += SYMBOL_INDEX_GUIDE
         return prompt
 
     async def review(
@@ -72,28 +114,47 @@ class CodeReviewAgent:
         project: str,
         source_branch: str,
         target_branch: str,
+        lint_report: Optional[str] = None,
+        cache: Optional[ReviewCache] = None,
+        diff: Optional[ParsedDiff] = None,
+        progress: Optional[Callable[[str, str], None]] = None,
     ) -> AgentReviewResult:
-        """执行代码审查（异步多轮 Agent 循环）"""
+        """执行代码审查（异步多轮 Agent 循环），progress 接收每轮的进度说明"""
+        budget = ReviewBudget.from_config(settings.agent)
+        recorder = TranscriptRecorder.create(project)
         # 设置工具上下文
         set_review_context(
             gitlab_service=self.gitlab_service,
             project=project,
             source_branch=source_branch,
             target_branch=target_branch,
+            cache=cache,
+            diff=diff,
+            budget=budget,
         )
 
         try:
             review_server = create_review_tools_server()
 
+            allowed_tools = [
+                "mcp__review__get_diff",
+                "mcp__review__get_file_content",
+                "mcp__review__submit_review",
+            ]
+            if settings.index.enabled:
+                allowed_tools += [
+                    "mcp__review__find_definition",
+                    "mcp__review__find_references",
+                    "mcp__review__search_code",
+                ]
+
             options = ClaudeAgentOptions(
                 system_prompt=self._build_system_prompt(),
+                model=self.model,
                 max_turns=self.max_turns,
+                env={"CLAUDE_CODE_MAX_OUTPUT_TOKENS": str(settings.agent.max_tokens)},
                 mcp_servers={"review": review_server},
-                allowed_tools=[
-                    "mcp__review__get_diff",
-                    "mcp__review__get_file_content",
-                    "mcp__review__submit_review",
-                ],
+                allowed_tools=allowed_tools,
             )
 
             user_prompt = (
@@ -104,6 +165,14 @@ class CodeReviewAgent:
                 f"请先调用 get_diff 工具获取代码差异，"
                 f"然后进行分析并通过 submit_review 提交结果。"
             )
+            if lint_report:
+                user_prompt += (
+                    "\n\n## 静态分析预检结果\n\n"
+                    "以下问题由静态分析工具在变更行上确定性检出，"
+                    "可直接纳入审查结果，无需再花费轮次重复确认，"
+                    "请将精力集中在工具无法发现的问题上：\n\n"
+                    f"{lint_report}"
+                )
 
             logger.info(
                 "启动 Agent 审查: project=%s, %s -> %s",
@@ -112,19 +181,42 @@ class CodeReviewAgent:
                 target_branch,
             )
 
-            async with ClaudeSDKClient(options=options) as client:
-                await client.query(user_prompt)
-                async for msg in client.receive_response():
-                    if isinstance(msg, AssistantMessage):
-                        for block in msg.content:
-                            if isinstance(block, TextBlock):
-                                logger.info("Agent: %s", block.text[:200])
+            if recorder:
+                recorder.start(
+                    project=project,
+                    source_branch=source_branch,
+                    target_branch=target_branch,
+                    model=self.model,
+                    system_prompt_chars=len(options.system_prompt or ""),
+                    user_prompt_chars=len(user_prompt),
+                    diff_files=len(diff.files) if diff else None,
+                )
+
+            # 一次会话包含多轮模型请求、持续数分钟，不能整体重试：治理器只在会话开始时
+            # 熔断与限速（rate 即每秒新建会话数），会话结束后按错误分类计入熔断
+            governor = get_governor("claude", _classify_claude_error)
+            started = await governor.admit()
+            try:
+                await self._run_session(
+                    options, user_prompt, budget, recorder, progress
+                )
+            except Exception as exc:
+                governor.record(started, exc)
+                raise
+            except BaseException:
+                governor.abandon()
+                raise
+            governor.record(started)
 
+            metrics.observe("review_tokens", budget.tokens)
+            metrics.observe("review_turns", budget.turns)
             result = get_review_result()
             if result is None:
-                raise RuntimeError(
-                    "Agent 未调用 submit_review 提交审查结果"
-                )
+                if not budget.wrapping_up:
+                    raise RuntimeError(
+                        "Agent 未调用 submit_review 提交审查结果"
+                    )
+                result = self._partial_result(budget)
 
             logger.info(
                 "审查完成: decision=%s, issues=%d",
@@ -134,4 +226,106 @@ class CodeReviewAgent:
             return result
 
         finally:
+            if recorder:
+                recorder.close(
+                    tokens=budget.tokens,
+                    elapsed=round(budget.elapsed, 3),
+                    file_fetches=budget.file_fetches,
+                    wrapped_up=budget.wrapping_up,
+                    submitted=get_review_result() is not None,
+                )
             clear_review_context()
+
+    @staticmethod
+    async def _receive(
+        client: ClaudeSDKClient,
+        budget: ReviewBudget,
+        recorder: Optional[TranscriptRecorder] = None,
+        progress: Optional[Callable[[str, str], None]] = None,
+    ) -> None:
+        """消费一轮响应；预算接近耗尽且尚未提交结果时中断当前回合
+
+        Agent 已发起 submit_review 但工具尚未返回时不中断，否则已完成的审查结果会被丢弃。
+        """
+        interrupted = False
+        # 已发起、尚未返回结果的 submit_review 调用
+        submitting: Set[str] = set()
+        async for msg in client.receive_response():
+            budget.record(msg)
+            if recorder:
+                recorder.record(msg)
+            if isinstance(msg, AssistantMessage):
+                for block in msg.content:
+                    if isinstance(block, TextBlock):
+                        logger.info("Agent: %s", block.text[:200])
+                    elif isinstance(block, ToolUseBlock):
+                        tool_name = block.name.rsplit("__", 1)[-1]
+                        if tool_name == "submit_review":
+                            submitting.add(block.id)
+                        if progress:
+                            progress("agent", f"第 {budget.turns} 轮，调用 {tool_name}")
+            elif isinstance(msg, UserMessage) and isinstance(msg.content, list):
+                for block in msg.content:
+                    if isinstance(block, ToolResultBlock):
+                        submitting.discard(block.tool_use_id)
+            if (
+                not interrupted
+                and not submitting
+                and not budget.wrapping_up
+                and get_review_result() is None
+                and budget.exhausted()
+            ):
+                interrupted = True
+                await client.interrupt()
+
+    @classmethod
+    async def _run_session(
+        cls,
+        options: ClaudeAgentOptions,
+        user_prompt: str,
+        budget: ReviewBudget,
+        recorder: Optional[TranscriptRecorder] = None,
+        progress: Optional[Callable[[str, str], None]] = None,
+    ) -> None:
+        """运行一次 Agent 会话直至结束，预算耗尽时追加一次收尾请求；总耗时不超过预算"""
+
+        async def run() -> None:
+            async with ClaudeSDKClient(options=options) as client:
+                await client.query(user_prompt)
+                await cls._receive(client, budget, recorder, progress)
+                if get_review_result() is not None or budget.wrapping_up:
+                    return
+
+                reason = budget.exhausted() or "已达到最大轮次"
+                logger.warning("审查预算即将耗尽（%s），要求 Agent 提交已有结论", reason)
+                metrics.incr("review_wrap_up", reason=reason.split(" ", 1)[0])
+                budget.wrapping_up = True
+                if recorder:
+                    recorder.note("wrap_up", reason=reason)
+                if progress:
+                    progress("agent", f"预算即将用尽（{reason}），正在收尾")
+                await client.query(WRAP_UP_PROMPT.format(reason=reason))
+                await cls._receive(client, budget, recorder, progress)
+
+        try:
+            # asyncio.wait_for 而非 asyncio.timeout，兼容 Python 3.10
+            await asyncio.wait_for(run(), timeout=budget.remaining_seconds())
+        except asyncio.TimeoutError:
+            logger.warning("审查超过耗时预算 %.0fs，终止 Agent 会话", budget.max_seconds)
+            metrics.incr("review_wrap_up", reason="timeout")
+            budget.wrapping_up = True
+
+    @staticmethod
+    def _partial_result(budget: ReviewBudget) -> AgentReviewResult:
+        """Agent 在收尾阶段仍未提交时，以已产出的分析文本构造部分结果"""
+        analysis = "\n\n".join(budget.texts) or "（无）"
+        logger.warning("Agent 未在预算内提交审查结果，返回部分结果")
+        return AgentReviewResult(
+            mrDescription=(
+                "> ⚠️ 本次审查因资源预算耗尽提前结束，结果不完整，请人工复核。\n\n"
+                f"## Agent 已完成的分析\n\n{analysis}"
+            ),
+            issues=[],
+            # 结果不完整，不能视为通过
+            reviewDecision=ReviewDecision.REQUEST_CHANGES,
+        )
@@ -0,0 +1,161 @@
+import json
+import re
+from typing import Any, Callable, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.models.review import AgentReviewResult, Category, ReviewDecision, Severity
+
+_FENCE_RE = re.compile(r"^\s*```[\w-]*\s*\n(.*?)\n?\s*```\s*$", re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+_PY_LITERALS_RE = re.compile(r"\b(True|False|None)\b")
+_LINE_NUMBER_RE = re.compile(r"\d+")
+
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+# JSON 字符串字面量（含转义），修复只作用于字符串之外的部分
+_STRING_RE = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_DECISION_ALIASES = {decision.label: decision.value for decision in ReviewDecision}
+_ENUM_FIELDS = {
+    "severity": {member.value for member in Severity},
+    "category": {member.value for member in Category},
+}
+
+
+def _outside_strings(text: str, fix: Callable[[str], str]) -> str:
+    """只对字符串字面量之外的文本应用 fix，避免改写审查描述等字符串值"""
+    parts = []
+    position = 0
+    for match in _STRING_RE.finditer(text):
+        parts.append(fix(text[position:match.start()]))
+        parts.append(match.group())
+        position = match.end()
+    parts.append(fix(text[position:]))
+    return "".join(parts)
+
+
+class ReviewJsonError(ValueError):
+    """审查结果无法修复，errors 为逐字段的错误说明"""
+
+    def __init__(self, message: str, errors: Optional[List[str]] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def _load(text: str, repairs: List[str]) -> Any:
+    """解析 JSON，依次尝试去除代码块标记、截取对象主体、删除尾逗号、替换 Python 字面量"""
+    candidate = text.strip()
+    fenced = _FENCE_RE.match(candidate)
+    if fenced:
+        candidate = fenced.group(1).strip()
+        repairs.append("code_fence")
+
+    start, end = candidate.find("{"), candidate.rfind("}")
+    if start > 0 or (end != -1 and end < len(candidate) - 1):
+        if start != -1 and end > start:
+            candidate = candidate[start:end + 1]
+            repairs.append("surrounding_text")
+
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError as e:
+        error = e
+
+    fixes = (
+        ("trailing_comma", lambda s: _TRAILING_COMMA_RE.sub(r"\1", s)),
+        ("python_literal", lambda s: _PY_LITERALS_RE.sub(lambda m: _PY_LITERALS[m.group(1)], s)),
+    )
+    for name, fix in fixes:
+        fixed = _outside_strings(candidate, fix)
+        if fixed == candidate:
+            continue
+        candidate = fixed
+        repairs.append(name)
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError as e:
+            error = e
+    raise ReviewJsonError(f"JSON 格式错误: {error}")
+
+
+def _normalize_enum(value: Any, allowed: set) -> Any:
+    if not isinstance(value, str):
+        return value
+    normalized = value.strip().lower()
+    return normalized if normalized in allowed else value
+
+
+def _normalize_decision(value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    stripped = value.strip()
+    if stripped in _DECISION_ALIASES:
+        return _DECISION_ALIASES[stripped]
+    return re.sub(r"[\s_]+", "-", stripped.lower())
+
+
+def _normalize_line(value: Any) -> Any:
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        if not value.strip():
+            return None
+        # "42"、"L42"、"42-45" 等形式取第一个行号
+        match = _LINE_NUMBER_RE.search(value)
+        if match:
+            return int(match.group())
+    return value
+
+
+def _normalize(data: Any, repairs: List[str]) -> Any:
+    """规范化枚举大小写与字段类型，只修改能无歧义修正的值"""
+    if not isinstance(data, dict):
+        return data
+
+    def update(target: dict, key: str, value: Any, repair: str) -> None:
+        if key in target and target[key] != value:
+            target[key] = value
+            repairs.append(repair)
+
+    update(data, "reviewDecision", _normalize_decision(data.get("reviewDecision")), "enum_value")
+
+    issues = data.get("issues")
+    if issues is None and "issues" in data:
+        data["issues"] = []
+        repairs.append("issues_type")
+    elif isinstance(issues, dict):
+        data["issues"] = [issues]
+        repairs.append("issues_type")
+
+    for issue in data.get("issues") or []:
+        if not isinstance(issue, dict):
+            continue
+        for key, allowed in _ENUM_FIELDS.items():
+            update(issue, key, _normalize_enum(issue.get(key), allowed), "enum_value")
+        update(issue, "line", _normalize_line(issue.get("line")), "line_type")
+    return data
+
+
+def _format_errors(error: ValidationError) -> List[str]:
+    messages = []
+    for item in error.errors():
+        pointer = "/" + "/".join(str(part) for part in item["loc"])
+        suffix = ""
+        if item["type"] != "missing":
+            value = json.dumps(item.get("input"), ensure_ascii=False, default=str)
+            suffix = f"（当前值: {value[:80]}）"
+        messages.append(f"{pointer}: {item['msg']}{suffix}")
+    return messages
+
+
+def parse_review_json(text: str) -> Tuple[AgentReviewResult, List[str]]:
+    """解析并在可能时自动修复 submit_review 提交的 JSON
+
+    返回审查结果与已应用的修复项列表；无法修复时抛出 ReviewJsonError。
+    """
+    repairs: List[str] = []
+    data = _normalize(_load(text, repairs), repairs)
+    try:
+        return AgentReviewResult.model_validate(data), sorted(set(repairs))
+    except ValidationError as e:
+        errors = _format_errors(e)
+        raise ReviewJsonError("审查结果校验失败", errors) from e
@@ -1,15 +1,29 @@
-import json
+import asyncio
 import logging
-from typing import Any, Dict, Optional
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
 
 from claude_agent_sdk import tool, create_sdk_mcp_server
 
+from app.core.config import settings
+from app.agent.budget import ReviewBudget
+from app.agent.review_json import ReviewJsonError, parse_review_json
+from app.core.metrics import metrics
 from app.models.review import AgentReviewResult
+from app.models.diff import ParsedDiff, estimate_tokens
+from app.service.review_cache import ReviewCache
+from app.service.search_index import get_search_index_service
+from app.service.symbol_index import SymbolLocation, get_symbol_index_service
 
 logger = logging.getLogger(__name__)
 
-# 模块级上下文，用于在工具间共享状态
-_review_context: Dict[str, Any] = {}
+# 审查上下文，用于在工具间共享状态。使用 ContextVar 隔离同一进程内并发执行的审查，
+# Agent 会话内派生的任务会继承设置时的上下文
+_review_context: ContextVar[Dict[str, Any]] = ContextVar("review_context")
+
+
+def _context() -> Dict[str, Any]:
+    return _review_context.get({})
 
 
 def set_review_context(
@@ -17,25 +31,51 @@ def set_review_context(
     project: str,
     source_branch: str,
     target_branch: str,
+    cache: Optional[ReviewCache] = None,
+    diff: Optional[ParsedDiff] = None,
+    budget: Optional[ReviewBudget] = None,
 ) -> None:
     """设置审查上下文，供工具函数使用"""
-    _review_context.update({
+    _review_context.set({
         "gitlab_service": gitlab_service,
         "project": project,
         "source_branch": source_branch,
         "target_branch": target_branch,
+        "cache": cache,
+        "diff": diff,
+        "budget": budget,
+        # 检出与索引加载任务，同一审查内复用（见 _once）
+        "tasks": {},
+        # 本次审查持有的工作目录，审查结束时释放
+        "worktrees": [],
         "review_result": None,
     })
 
 
 def get_review_result() -> Optional[AgentReviewResult]:
     """获取 Agent 提交的审查结果"""
-    return _review_context.get("review_result")
+    return _context().get("review_result")
 
 
 def clear_review_context() -> None:
-    """清理审查上下文"""
-    _review_context.clear()
+    """清理审查上下文，释放审查期间持有的工作目录"""
+    for repo_service, worktree in _context().get("worktrees", []):
+        repo_service.release(worktree)
+    _review_context.set({})
+
+
+def _record_payload(text: str) -> None:
+    budget = _context().get("budget")
+    if budget:
+        budget.record_payload(text)
+
+
+def _review_cache(project: str) -> Optional[ReviewCache]:
+    """当前审查的预取缓存（仅在请求的项目与审查上下文一致时可用）"""
+    context = _context()
+    if context.get("project") != project:
+        return None
+    return context.get("cache")
 
 
 @tool(
@@ -49,7 +89,7 @@ def clear_review_context() -> None:
 )
 async def get_diff(args: dict) -> dict:
     """获取分支间的代码差异"""
-    gitlab_service = _review_context.get("gitlab_service")
+    gitlab_service = _context().get("gitlab_service")
     if not gitlab_service:
         return {
             "content": [{"type": "text", "text": "错误: 审查上下文未初始化"}],
@@ -57,14 +97,58 @@ async def get_diff(args: dict) -> dict:
         }
 
     try:
-        diff = gitlab_service.get_diff(
-            args["project"], args["source_branch"], args["target_branch"]
+        context = _context()
+        is_current_review = (
+            args["project"],
+            args["source_branch"],
+            args["target_branch"],
+        ) == (context["project"], context["source_branch"], context["target_branch"])
+
+        parsed = context.get("diff") if is_current_review else None
+        if parsed is None:
+            compare = None
+            cache = context.get("cache") if is_current_review else None
+            if cache:
+                compare = await asyncio.to_thread(
+                    cache.get_compare, settings.prefetch.wait_seconds
+                )
+            if compare is None:
+                compare = await asyncio.to_thread(
+                    gitlab_service.get_compare,
+                    args["project"],
+                    args["source_branch"],
+                    args["target_branch"],
+                )
+            parsed = ParsedDiff.from_compare(compare, settings.memory.max_file_diff_bytes)
+            del compare
+            if is_current_review:
+                context["diff"] = parsed
+
+        mode = settings.diff.render_mode
+        diff = parsed.render(
+            mode, settings.diff.context_radius, settings.memory.max_diff_bytes
         )
         if not diff.strip():
             return {
                 "content": [{"type": "text", "text": "两个分支之间没有代码差异。"}]
             }
+        if mode == "full":
+            metrics.observe("diff_tokens", estimate_tokens(diff), mode="full")
+        else:
+            # 完整渲染的 token 数按解析结果估算，不为统计再渲染一遍
+            full_tokens = parsed.full_tokens()
+            metrics.observe("diff_tokens", full_tokens, mode="full")
+            rendered_tokens = estimate_tokens(diff)
+            metrics.observe("diff_tokens", rendered_tokens, mode=mode)
+            logger.info(
+                "diff 渲染模式=%s，估算 token: %d -> %d（节省 %.0f%%）",
+                mode,
+                full_tokens,
+                rendered_tokens,
+                100 * (1 - rendered_tokens / full_tokens),
+            )
         logger.info("成功获取 diff，长度: %d", len(diff))
+        _record_payload(diff)
         return {"content": [{"type": "text", "text": diff}]}
     except Exception as e:
         logger.exception("获取 diff 失败")
@@ -85,24 +169,54 @@ async def get_diff(args: dict) -> dict:
 )
 async def get_file_content(args: dict) -> dict:
     """获取文件完整内容"""
-    gitlab_service = _review_context.get("gitlab_service")
+    gitlab_service = _context().get("gitlab_service")
     if not gitlab_service:
         return {
             "content": [{"type": "text", "text": "错误: 审查上下文未初始化"}],
             "isError": True,
         }
 
+    budget = _context().get("budget")
+    if budget and not budget.record_file_fetch():
+        return {
+            "content": [
+                {
+                    "type": "text",
+                    "text": "本次审查的文件获取预算已用尽，请基于已有信息调用 submit_review 提交结果。",
+                }
+            ],
+            "isError": True,
+        }
+
+    max_bytes = settings.memory.max_file_bytes
     try:
-        project = gitlab_service.get_project(args["project"])
-        file_content = project.files.get(
-            file_path=args["file_path"], ref=args["branch"]
-        )
-        content = file_content.decode().decode("utf-8")
+        content = None
+        cache = _review_cache(args["project"])
+        if cache:
+            content = await asyncio.to_thread(
+                cache.get_file,
+                args["branch"],
+                args["file_path"],
+                settings.prefetch.wait_seconds,
+                max_bytes,
+            )
+            missing = cache.get_missing(args["branch"], args["file_path"])
+            if content is None and missing:
+                raise FileNotFoundError(missing)
+        if content is None:
+            content = await asyncio.to_thread(
+                gitlab_service.get_file_content,
+                args["project"],
+                args["file_path"],
+                args["branch"],
+                max_bytes,
+            )
         logger.info(
             "成功获取文件内容: %s (分支: %s)",
             args["file_path"],
             args["branch"],
         )
+        _record_payload(content)
         return {"content": [{"type": "text", "text": content}]}
     except Exception as e:
         logger.exception("获取文件内容失败")
@@ -114,6 +228,140 @@ async def get_file_content(args: dict) -> dict:
         }
 
 
+async def _once(key: tuple, func: Any, *args: Any) -> Any:
+    """同一审查内相同 key 的调用只在线程中执行一次，并发调用共享同一个任务；失败不缓存"""
+    tasks = _context().get("tasks")
+    if tasks is None:
+        return await asyncio.to_thread(func, *args)
+    task = tasks.get(key)
+    if task is None:
+        task = tasks[key] = asyncio.ensure_future(asyncio.to_thread(func, *args))
+    try:
+        return await asyncio.shield(task)
+    except Exception:
+        # 失败（如网络错误）后允许下次调用重试
+        if tasks.get(key) is task:
+            del tasks[key]
+        raise
+
+
+async def _get_index(service: Any, project: str, branch: str) -> Any:
+    """获取代码索引：每次审查只将分支解析为 commit 并检出一次，各索引共用该工作目录
+
+    逐次工具调用都重新拉取与检出代价很高，也可能让同一审查中的查询落在不同 commit 上。
+    """
+    held = _context().get("worktrees")
+
+    def checkout() -> Any:
+        worktree = service.repo_service.checkout(project, branch)
+        # 索引查询会读取工作目录中的文件，审查结束前不能被其他审查的检出淘汰
+        if held is None:
+            service.repo_service.release(worktree)
+        else:
+            held.append((service.repo_service, worktree))
+        return worktree
+
+    worktree = await _once(("checkout", project, branch), checkout)
+    return await _once((service.name, project, branch), service.get, project, branch, worktree)
+
+
+def _format_locations(title: str, locations: List[SymbolLocation]) -> str:
+    limit = settings.index.max_results
+    lines = [f"{title}（共 {len(locations)} 处）:"]
+    lines.extend(location.format() for location in locations[:limit])
+    if len(locations) > limit:
+        lines.append(f"... 仅显示前 {limit} 处")
+    return "\n".join(lines)
+
+
+async def _query_symbol_index(args: dict, kind: str) -> dict:
+    try:
+        index = await _get_index(get_symbol_index_service(), args["project"], args["branch"])
+        if kind == "definition":
+            locations = index.find_definition(args["symbol"])
+            title = f"{args['symbol']} 的定义"
+        else:
+            locations = index.find_references(args["symbol"])
+            title = f"{args['symbol']} 的引用"
+        if not locations:
+            text = f"索引中未找到 {args['symbol']} 的{'定义' if kind == 'definition' else '引用'}。"
+        else:
+            text = _format_locations(title, locations)
+        logger.info(
+            "符号查询: %s %s@%s -> %d 处", kind, args["symbol"], args["branch"], len(locations)
+        )
+        return {"content": [{"type": "text", "text": text}]}
+    except Exception as e:
+        logger.exception("符号查询失败")
+        return {
+            "content": [{"type": "text", "text": f"符号查询失败: {e}"}],
+            "isError": True,
+        }
+
+
+@tool(
+    "find_definition",
+    "在仓库符号索引中查找符号（函数、类、变量等）的定义位置，返回 文件:行号 列表。"
+    "支持 Class.method 形式。比逐个获取文件查找定义快得多。",
+    {
+        "project": str,
+        "branch": str,
+        "symbol": str,
+    },
+)
+async def find_definition(args: dict) -> dict:
+    """查找符号定义"""
+    return await _query_symbol_index(args, "definition")
+
+
+@tool(
+    "find_references",
+    "在仓库符号索引中查找符号被引用的位置，返回 文件:行号 列表。"
+    "用于评估变更函数、类的影响范围（调用方）。",
+    {
+        "project": str,
+        "branch": str,
+        "symbol": str,
+    },
+)
+async def find_references(args: dict) -> dict:
+    """查找符号引用"""
+    return await _query_symbol_index(args, "reference")
+
+
+@tool(
+    "search_code",
+    "在仓库中按关键词搜索代码（BM25 排序），返回最相关的文件及带行号的代码片段。"
+    "query 可以是标识符、多个关键词或短语。适合在不知道文件路径时定位相关代码。",
+    {
+        "project": str,
+        "branch": str,
+        "query": str,
+    },
+)
+async def search_code(args: dict) -> dict:
+    """搜索代码"""
+    try:
+        index = await _get_index(get_search_index_service(), args["project"], args["branch"])
+        hits = await asyncio.to_thread(
+            index.search, args["query"], settings.index.search_results
+        )
+        logger.info("代码搜索: %r@%s -> %d 个文件", args["query"], args["branch"], len(hits))
+        if not hits:
+            return {
+                "content": [{"type": "text", "text": f"未找到与 {args['query']} 相关的代码。"}]
+            }
+        text = "\n\n".join(hit.format() for hit in hits)
+        _record_payload(text)
+        return {"content": [{"type": "text", "text": text}]}
+    except Exception as e:
+        logger.exception("代码搜索失败")
+        return {
+            "content": [{"type": "text", "text": f"代码搜索失败: {e}"}],
+            "isError": True,
+        }
+
+
 @tool(
     "submit_review",
     "提交代码审查的结构化结果。审查完成后必须调用此工具提交最终结果。"
@@ -123,47 +371,46 @@ async def get_file_content(args: dict) -> dict:
     },
 )
 async def submit_review(args: dict) -> dict:
-    """提交结构化审查结果"""
+    """提交结构化审查结果，轻微的格式问题会自动修复以避免重新提交"""
     review_json_str = args.get("review_json", "")
 
     try:
-        review_data = json.loads(review_json_str)
-    except json.JSONDecodeError as e:
-        return {
-            "content": [
-                {
-                    "type": "text",
-                    "text": f"JSON 格式错误: {e}。请修正后重新提交。",
-                }
-            ],
-            "isError": True,
-        }
+        result, repairs = parse_review_json(review_json_str)
+    except ReviewJsonError as e:
+        metrics.incr("submit_review", outcome="invalid")
+        text = f"{e}。"
+        if e.errors:
+            text += "以下字段不符合 JSON Schema:\n" + "\n".join(
+                f"- {error}" for error in e.errors
+            )
+            text += "\n请只修正上述字段后重新提交。"
+        else:
+            text += "请修正后重新提交。"
+        return {"content": [{"type": "text", "text": text}], "isError": True}
 
-    try:
-        result = AgentReviewResult.model_validate(review_data)
-        _review_context["review_result"] = result
-        logger.info("审查结果已提交: decision=%s", result.reviewDecision.value)
-        return {
-            "content": [
-                {"type": "text", "text": "审查结果已成功提交。"}
-            ]
-        }
-    except Exception as e:
-        return {
-            "content": [
-                {
-                    "type": "text",
-                    "text": f"审查结果校验失败: {e}。请按照 JSON Schema 修正后重新提交。",
-                }
-            ],
-            "isError": True,
-        }
+    _context()["review_result"] = result
+    if repairs:
+        metrics.incr("submit_review", outcome="repaired")
+        for repair in repairs:
+            metrics.incr("submit_review_repairs", kind=repair)
+        logger.info("审查结果已自动修复: %s", ", ".join(repairs))
+    else:
+        metrics.incr("submit_review", outcome="ok")
+    logger.info("审查结果已提交: decision=%s", result.reviewDecision.value)
+    return {
+        "content": [
+            {"type": "text", "text": "审查结果已成功提交。"}
+        ]
+    }
 
 
 def create_review_tools_server():
     """创建包含所有审查工具的 SDK MCP Server"""
+    tools = [get_diff, get_file_content, submit_review]
+    if settings.index.enabled:
+        tools += [find_definition, find_references, search_code]
     return create_sdk_mcp_server(
         name="review-tools",
         version="1.0.0",
-        tools=[get_diff, get_file_content, submit_review],
+        tools=tools,
     )
@@ -0,0 +1,143 @@
+import json
+import logging
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from claude_agent_sdk import (
+    AssistantMessage,
+    ResultMessage,
+    TextBlock,
+    ToolResultBlock,
+    ToolUseBlock,
+    UserMessage,
+)
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 记录工具参数时单个字符串值保留的最大长度
+_MAX_ARG_CHARS = 200
+
+
+def _truncate_args(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > _MAX_ARG_CHARS:
+        return f"{value[:_MAX_ARG_CHARS]}...(+{len(value) - _MAX_ARG_CHARS})"
+    if isinstance(value, dict):
+        return {key: _truncate_args(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_truncate_args(item) for item in value]
+    return value
+
+
+def _content_chars(content: Any) -> int:
+    if content is None:
+        return 0
+    if isinstance(content, str):
+        return len(content)
+    return sum(len(item.get("text", "")) for item in content if isinstance(item, dict))
+
+
+class TranscriptRecorder:
+    """Agent 会话记录：每轮的 token 用量、耗时，以及工具调用参数、结果大小与耗时
+
+    每次审查写入一个 JSONL 文件，每行一个事件，t 为距会话开始的秒数。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._started = time.monotonic()
+        self._last_event = self._started
+        self._turns = 0
+        self._message_ids: set = set()
+        # tool_use_id -> (工具名, 发起时间)
+        self._pending_tools: Dict[str, tuple] = {}
+
+    @classmethod
+    def create(cls, project: str) -> Optional["TranscriptRecorder"]:
+        """按配置创建记录器，未启用时返回 None"""
+        if not settings.transcript.enabled:
+            return None
+        name = re.sub(r"[^\w.-]+", "_", project)
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{uuid.uuid4().hex[:6]}.jsonl"
+        return cls(Path(settings.transcript.dir) / filename)
+
+    def _write(self, event: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        event = {"t": round(now - self._started, 3), **event}
+        self._last_event = now
+        self._file.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def start(self, **fields: Any) -> None:
+        self._write({"type": "start", **fields})
+
+    def record(self, msg: Any) -> None:
+        now = time.monotonic()
+        if isinstance(msg, AssistantMessage):
+            new_turn = not msg.message_id or msg.message_id not in self._message_ids
+            if msg.message_id:
+                self._message_ids.add(msg.message_id)
+            if new_turn:
+                self._turns += 1
+            tool_calls = []
+            text_chars = 0
+            for block in msg.content:
+                if isinstance(block, TextBlock):
+                    text_chars += len(block.text)
+                elif isinstance(block, ToolUseBlock):
+                    self._pending_tools[block.id] = (block.name, now)
+                    tool_calls.append({
+                        "id": block.id,
+                        "name": block.name,
+                        "args": _truncate_args(block.input),
+                    })
+            event: Dict[str, Any] = {
+                "type": "assistant",
+                "turn": self._turns,
+                "latency": round(now - self._last_event, 3),
+                "text_chars": text_chars,
+                "tool_calls": tool_calls,
+            }
+            # 同一次响应拆分出的后续消息不重复计入用量
+            if new_turn and msg.usage:
+                event["usage"] = msg.usage
+            self._write(event)
+        elif isinstance(msg, UserMessage) and isinstance(msg.content, list):
+            for block in msg.content:
+                if not isinstance(block, ToolResultBlock):
+                    continue
+                name, started = self._pending_tools.pop(block.tool_use_id, ("", now))
+                self._write({
+                    "type": "tool_result",
+                    "id": block.tool_use_id,
+                    "name": name,
+                    "duration": round(now - started, 3),
+                    "chars": _content_chars(block.content),
+                    "is_error": bool(block.is_error),
+                })
+        elif isinstance(msg, ResultMessage):
+            self._write({
+                "type": "result",
+                "num_turns": msg.num_turns,
+                "duration_ms": msg.duration_ms,
+                "duration_api_ms": msg.duration_api_ms,
+                "usage": msg.usage,
+                "cost_usd": msg.total_cost_usd,
+                "is_error": msg.is_error,
+            })
+
+    def note(self, kind: str, **fields: Any) -> None:
+        self._write({"type": kind, **fields})
+
+    def close(self, **fields: Any) -> None:
+        try:
+            self._write({"type": "end", "turns": self._turns, **fields})
+        finally:
+            self._file.close()
+        logger.info("Agent 会话记录已写入: %s", self.path)
@@ -1,39 +1,113 @@
+import asyncio
 import logging
+from collections import Counter
+from dataclasses import asdict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 
 from app.api.schemas import (
+    BatchItemStatus,
+    BatchReviewItem,
+    BatchReviewRequest,
+    BatchReviewResponse,
     ErrorResponse,
     HealthResponse,
+    ReviewJobResponse,
     ReviewRequest,
     ReviewResponse,
 )
-from app.service.gitlab_service import GitLabService
-from app.service.review_service import ReviewService
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.worker.admission import AdmissionRejected, get_admission_controller
+from app.worker.dispatch import submit_batch, submit_review, wait_for_job
+from app.worker.queue import JobStatus, ReviewJob, get_queue
+from app.worker.scheduler import get_scheduler
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.get("/health", response_model=HealthResponse)
-async def health_check():
-    """健康检查"""
-    return HealthResponse(status="healthy")
+async def _admit(
+    incoming: int = 1, priority: Optional[int] = None, batch: bool = False
+) -> None:
+    """准入检查，超出处理能力时返回 429 并附带 Retry-After"""
+    try:
+        await asyncio.to_thread(
+            get_admission_controller().admit, incoming, "api", priority, batch
+        )
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+@router.get(
+    "/health",
+    response_model=HealthResponse,
+    responses={503: {"model": HealthResponse}},
+)
+async def health_check(request: Request, response: Response):
+    """健康检查：队列后端不可用或内置 worker 已退出时返回 503，超出处理能力时 accepting=false"""
+    worker_task = getattr(request.app.state, "worker_task", None)
+    if worker_task is not None and worker_task.done():
+        response.status_code = 503
+        return HealthResponse(
+            status="unhealthy", ready=False, accepting=False, reason="审查 worker 已退出"
+        )
+    try:
+        # 以"能否再接受一个默认优先级的审查"判断是否可接收新请求
+        capacity = await asyncio.to_thread(
+            get_admission_controller().capacity, 1, settings.scheduling.default_priority
+        )
+    except Exception as e:
+        logger.exception("健康检查获取队列状态失败")
+        response.status_code = 503
+        return HealthResponse(
+            status="unhealthy", ready=False, accepting=False, reason=f"队列后端不可用: {e}"
+        )
+    accepting = capacity.accepting or not settings.admission.enabled
+    return HealthResponse(
+        status="healthy" if accepting else "overloaded",
+        accepting=accepting,
+        reason=capacity.reason,
+        capacity=capacity.to_dict(),
+    )
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """运行指标（出站调用、熔断状态等）"""
+    return metrics.snapshot()
 
 
 @router.post(
     "/review",
     response_model=ReviewResponse,
-    responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
+    responses={
+        400: {"model": ErrorResponse},
+        429: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+    },
 )
 async def create_review(request: ReviewRequest):
     """创建代码审查"""
+    from app.service.gitlab_service import GitLabService
+
+    await _admit(
+        priority=get_scheduler().priority_for(
+            request.project, request.source_branch, request.target_branch
+        )
+    )
+
     gitlab_service = GitLabService()
 
-    # 校验项目
+    # 校验项目（GitLab 调用为同步请求且含退避重试，放到线程中执行以免阻塞事件循环）
     try:
-        gitlab_service.get_project(request.project)
+        await asyncio.to_thread(gitlab_service.get_project, request.project)
     except Exception:
         raise HTTPException(
             status_code=400,
@@ -41,31 +115,182 @@ async def create_review(request: ReviewRequest):
         )
 
     # 校验源分支
-    if not gitlab_service.check_branch_exists(request.project, request.source_branch):
+    if not await asyncio.to_thread(
+        gitlab_service.check_branch_exists, request.project, request.source_branch
+    ):
         raise HTTPException(
             status_code=400,
             detail=f"源分支不存在: {request.source_branch}",
         )
 
     # 校验目标分支
-    if not gitlab_service.check_branch_exists(request.project, request.target_branch):
+    if not await asyncio.to_thread(
+        gitlab_service.check_branch_exists, request.project, request.target_branch
+    ):
         raise HTTPException(
             status_code=400,
             detail=f"目标分支不存在: {request.target_branch}",
         )
 
-    # 执行代码审查
-    try:
-        review_service = ReviewService()
-        result = await review_service.execute_review(
-            project=request.project,
-            source_branch=request.source_branch,
-            target_branch=request.target_branch,
-        )
-        return ReviewResponse(**result)
-    except Exception as e:
-        logger.exception("代码审查失败")
+    # 提交到共享队列并等待执行完成
+    job = await asyncio.to_thread(
+        submit_review,
+        request.project,
+        request.source_branch,
+        request.target_branch,
+        {"type": "api", "requester": request.requester},
+    )
+    job = await wait_for_job(job.id)
+    if job.status == JobStatus.FAILED:
         raise HTTPException(
             status_code=500,
-            detail=f"代码审查失败: {str(e)}",
+            detail=f"代码审查失败: {job.error}",
+        )
+    return ReviewResponse(**job.result)
+
+
+@router.get(
+    "/reviews/{job_id}",
+    response_model=ReviewJobResponse,
+    responses={404: {"model": ErrorResponse}},
+)
+async def get_review_job(job_id: str):
+    """查询审查任务状态"""
+    job = await asyncio.to_thread(get_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {job_id}")
+    return ReviewJobResponse(**asdict(job))
+
+
+async def _validate_batch(items: List[BatchReviewItem]) -> List[Optional[str]]:
+    """并发校验批量条目，返回每个条目的错误（通过为 None）
+
+    共用一个 GitLab 客户端，同一项目、同一分支只校验一次。只有 GitLab 明确返回 404
+    才判定为不存在；超时、5xx 等暂时性错误跳过该项校验，由执行阶段报告真实错误。
+    """
+    import gitlab
+
+    from app.service.gitlab_service import GitLabService
+
+    gitlab_service = GitLabService()
+    semaphore = asyncio.Semaphore(settings.queue.batch_validate_concurrency)
+    checks: Dict[Tuple[str, ...], Awaitable[Optional[bool]]] = {}
+
+    def project_exists(project: str) -> bool:
+        gitlab_service.get_project(project)
+        return True
+
+    def branch_exists(project: str, branch: str) -> bool:
+        gitlab_service.gl.projects.get(project, lazy=True).branches.get(branch)
+        return True
+
+    async def run(func: Callable[..., bool], *args: str) -> Optional[bool]:
+        """返回 None 表示 GitLab 暂时无法确认"""
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(func, *args)
+            except gitlab.exceptions.GitlabGetError as e:
+                if e.response_code == 404:
+                    return False
+                logger.warning("批量审查校验跳过 %s: %s", "/".join(args), e)
+                return None
+            except Exception as e:
+                logger.warning("批量审查校验跳过 %s: %s", "/".join(args), e)
+                return None
+
+    def check(func: Callable[..., bool], *args: str) -> Awaitable[Optional[bool]]:
+        if args not in checks:
+            checks[args] = asyncio.ensure_future(run(func, *args))
+        return checks[args]
+
+    seen: Dict[Tuple[str, str, str], int] = {}
+
+    async def validate(index: int, item: BatchReviewItem) -> Optional[str]:
+        key = (item.project, item.source_branch, item.target_branch)
+        if seen.setdefault(key, index) != index:
+            return f"与第 {seen[key]} 条重复"
+        if await check(project_exists, item.project) is False:
+            return f"项目不存在或无权访问: {item.project}"
+        source_ok, target_ok = await asyncio.gather(
+            check(branch_exists, item.project, item.source_branch),
+            check(branch_exists, item.project, item.target_branch),
         )
+        if source_ok is False:
+            return f"源分支不存在: {item.source_branch}"
+        if target_ok is False:
+            return f"目标分支不存在: {item.target_branch}"
+        return None
+
+    return await asyncio.gather(
+        *(validate(index, item) for index, item in enumerate(items))
+    )
+
+
+def _batch_response(batch_id: str, jobs: List[ReviewJob]) -> BatchReviewResponse:
+    return BatchReviewResponse(
+        batch_id=batch_id,
+        total=len(jobs),
+        counts=dict(Counter(job.status for job in jobs)),
+        items=[
+            BatchItemStatus(
+                index=job.origin.get("batch_index", index),
+                project=job.project,
+                source_branch=job.source_branch,
+                target_branch=job.target_branch,
+                job_id=job.id,
+                status=job.status,
+                error=job.error,
+                mr_url=(job.result or {}).get("mr_url"),
+            )
+            for index, job in enumerate(jobs)
+        ],
+    )
+
+
+@router.post(
+    "/reviews:batch",
+    status_code=202,
+    response_model=BatchReviewResponse,
+    responses={400: {"model": ErrorResponse}, 429: {"model": ErrorResponse}},
+)
+async def create_review_batch(request: BatchReviewRequest):
+    """批量创建代码审查：校验后一次性入队，立即返回批次 ID 与各条目状态"""
+    if not request.items:
+        raise HTTPException(status_code=400, detail="批量审查条目不能为空")
+    limit = settings.queue.batch_max_items
+    if len(request.items) > limit:
+        raise HTTPException(
+            status_code=400,
+            detail=f"批量审查条目过多: {len(request.items)} > {limit}",
+        )
+    await _admit(len(request.items), batch=True)
+
+    errors = await _validate_batch(request.items)
+    batch_id, jobs = await asyncio.to_thread(
+        submit_batch,
+        [
+            (item.project, item.source_branch, item.target_branch, error)
+            for item, error in zip(request.items, errors)
+        ],
+        {"type": "api", "requester": request.requester},
+    )
+    rejected = sum(1 for error in errors if error)
+    metrics.incr("batch_items", len(jobs) - rejected, status="queued")
+    metrics.incr("batch_items", rejected, status="rejected")
+    logger.info(
+        "批量审查 %s 已提交: %d 个条目，校验失败 %d 个", batch_id, len(jobs), rejected
+    )
+    return _batch_response(batch_id, jobs)
+
+
+@router.get(
+    "/reviews/batches/{batch_id}",
+    response_model=BatchReviewResponse,
+    responses={404: {"model": ErrorResponse}},
+)
+async def get_review_batch(batch_id: str):
+    """查询批量审查各条目的状态"""
+    jobs = await asyncio.to_thread(get_queue().batch, batch_id)
+    if not jobs:
+        raise HTTPException(status_code=404, detail=f"批次不存在: {batch_id}")
+    return _batch_response(batch_id, jobs)
@@ -16,6 +16,40 @@ class ReviewRequest(BaseModel):
     project: str
     source_branch: str
     target_branch: str
+    requester: Optional[str] = None
+
+
+class BatchReviewItem(BaseModel):
+    """批量审查中的单个条目"""
+    project: str
+    source_branch: str
+    target_branch: str
+
+
+class BatchReviewRequest(BaseModel):
+    """批量审查请求"""
+    items: List[BatchReviewItem]
+    requester: Optional[str] = None
+
+
+class BatchItemStatus(BaseModel):
+    """批量审查条目状态"""
+    index: int
+    project: str
+    source_branch: str
+    target_branch: str
+    job_id: str
+    status: str
+    error: Optional[str] = None
+    mr_url: Optional[str] = None
+
+
+class BatchReviewResponse(BaseModel):
+    """批量审查响应"""
+    batch_id: str
+    total: int
+    counts: Dict[str, int]
+    items: List[BatchItemStatus]
 
 
 class ReviewResponse(BaseModel):
@@ -26,6 +60,21 @@ class ReviewResponse(BaseModel):
     mr_url: Optional[str] = None
 
 
+class ReviewJobResponse(BaseModel):
+    """审查任务状态响应"""
+    id: str
+    status: str
+    project: str
+    source_branch: str
+    target_branch: str
+    priority_class: str = ""
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
 class ErrorResponse(BaseModel):
     """错误响应"""
     detail: str
@@ -35,3 +84,7 @@ class HealthResponse(BaseModel):
     """健康检查响应"""
     status: str
     version: str = "1.0.0"
+    ready: bool = True
+    accepting: bool = True
+    reason: Optional[str] = None
+    capacity: Optional[Dict[str, Any]] = None
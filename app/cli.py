@@ -0,0 +1,313 @@
+import argparse
+import asyncio
+import json
+import logging
+import re
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+def _percentile(values: List[float], ratio: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * ratio), len(ordered) - 1)]
+
+
+def _load_transcripts(paths: List[Path]) -> List[List[Dict[str, Any]]]:
+    files: List[Path] = []
+    for path in paths:
+        files.extend(sorted(path.glob("*.jsonl")) if path.is_dir() else [path])
+    transcripts = []
+    for file in files:
+        events = []
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        if events:
+            transcripts.append(events)
+    return transcripts
+
+
+def build_profile(transcripts: List[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """汇总会话记录：每次审查的轮次、耗时与 token，各工具的调用耗时与返回大小"""
+    turns: List[int] = []
+    elapsed: List[float] = []
+    tokens: List[int] = []
+    model_latency: List[float] = []
+    wrapped_up = 0
+    tools: Dict[str, Dict[str, Any]] = defaultdict(
+        lambda: {"calls": 0, "errors": 0, "durations": [], "chars": []}
+    )
+
+    for events in transcripts:
+        end = next((e for e in reversed(events) if e["type"] == "end"), {})
+        assistant = [e for e in events if e["type"] == "assistant"]
+        turns.append(end.get("turns") or max((e["turn"] for e in assistant), default=0))
+        elapsed.append(end.get("elapsed") or events[-1]["t"])
+        tokens.append(end.get("tokens") or 0)
+        wrapped_up += bool(end.get("wrapped_up"))
+        model_latency.extend(e["latency"] for e in assistant if "usage" in e)
+        for event in events:
+            if event["type"] != "tool_result":
+                continue
+            stats = tools[event["name"] or "unknown"]
+            stats["calls"] += 1
+            stats["errors"] += bool(event.get("is_error"))
+            stats["durations"].append(event["duration"])
+            stats["chars"].append(event["chars"])
+
+    return {
+        "reviews": len(transcripts),
+        "wrapped_up": wrapped_up,
+        "turns": {
+            "mean": round(statistics.mean(turns), 2) if turns else 0,
+            "p50": _percentile(turns, 0.5),
+            "p90": _percentile(turns, 0.9),
+            "max": max(turns, default=0),
+            "histogram": dict(sorted(Counter(turns).items())),
+        },
+        "elapsed_seconds": {
+            "p50": round(_percentile(elapsed, 0.5), 2),
+            "p90": round(_percentile(elapsed, 0.9), 2),
+            "max": round(max(elapsed, default=0), 2),
+        },
+        "tokens": {
+            "total": sum(tokens),
+            "p50": _percentile(tokens, 0.5),
+            "p90": _percentile(tokens, 0.9),
+        },
+        "model_latency_seconds": {
+            "total": round(sum(model_latency), 2),
+            "p50": round(_percentile(model_latency, 0.5), 2),
+            "p90": round(_percentile(model_latency, 0.9), 2),
+        },
+        "tools": {
+            name: {
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "calls_per_review": round(stats["calls"] / len(transcripts), 2),
+                "total_seconds": round(sum(stats["durations"]), 2),
+                "p50_seconds": round(_percentile(stats["durations"], 0.5), 3),
+                "p90_seconds": round(_percentile(stats["durations"], 0.9), 3),
+                "total_chars": sum(stats["chars"]),
+                "mean_chars": round(statistics.mean(stats["chars"])),
+            }
+            for name, stats in sorted(
+                tools.items(), key=lambda item: sum(item[1]["durations"]), reverse=True
+            )
+        },
+    }
+
+
+def _print_profile(profile: Dict[str, Any]) -> None:
+    turns = profile["turns"]
+    print(f"审查次数: {profile['reviews']}（触发预算收尾 {profile['wrapped_up']} 次）")
+    print(
+        f"轮次: 平均 {turns['mean']}, p50 {turns['p50']}, p90 {turns['p90']}, 最大 {turns['max']}"
+    )
+    print(
+        "轮次分布: "
+        + ", ".join(f"{turn}轮×{count}" for turn, count in turns["histogram"].items())
+    )
+    elapsed = profile["elapsed_seconds"]
+    print(f"耗时(秒): p50 {elapsed['p50']}, p90 {elapsed['p90']}, 最大 {elapsed['max']}")
+    tokens = profile["tokens"]
+    print(f"token: 合计 {tokens['total']}, p50 {tokens['p50']}, p90 {tokens['p90']}")
+    latency = profile["model_latency_seconds"]
+    print(f"模型响应(秒): 合计 {latency['total']}, p50 {latency['p50']}, p90 {latency['p90']}")
+    print()
+    header = f"{'工具':<28}{'调用':>6}{'失败':>6}{'次/审查':>9}{'总耗时s':>10}{'p50 s':>8}{'p90 s':>8}{'返回字符':>12}{'平均字符':>10}"
+    print(header)
+    for name, stats in profile["tools"].items():
+        print(
+            f"{name:<28}{stats['calls']:>6}{stats['errors']:>6}{stats['calls_per_review']:>9}"
+            f"{stats['total_seconds']:>10}{stats['p50_seconds']:>8}{stats['p90_seconds']:>8}"
+            f"{stats['total_chars']:>12}{stats['mean_chars']:>10}"
+        )
+
+
+def _cmd_profile(args: argparse.Namespace) -> int:
+    paths = [Path(p) for p in args.paths] or [Path(settings.transcript.dir)]
+    transcripts = _load_transcripts(paths)
+    if not transcripts:
+        print(f"未找到会话记录: {', '.join(str(p) for p in paths)}", file=sys.stderr)
+        return 1
+    profile = build_profile(transcripts)
+    if args.json:
+        print(json.dumps(profile, ensure_ascii=False, indent=2))
+    else:
+        _print_profile(profile)
+    return 0
+
+
+def _parse_range(value: str) -> Tuple[str, str]:
+    """解析 目标..源 形式的范围（与 git log base..head 一致）"""
+    target, sep, source = value.partition("..")
+    if not sep or not target or not source or source.startswith("."):
+        raise argparse.ArgumentTypeError(f"范围格式应为 <目标>..<源>: {value}")
+    return target, source
+
+
+async def _review_range(
+    repo: str,
+    target: str,
+    source: str,
+    output: Path,
+    semaphore: asyncio.Semaphore,
+) -> Dict[str, Any]:
+    """离线审查一个范围，结果写入 output 目录"""
+    # Agent 相关依赖在执行审查时才加载，profile 子命令不依赖它们
+    from app.agent.code_review_agent import CodeReviewAgent
+    from app.models.diff import ParsedDiff
+    from app.service.git_service import LocalGitService
+    from app.service.lint_service import LintService
+
+    name = re.sub(r"[^\w.-]+", "_", f"{target}..{source}")
+    summary: Dict[str, Any] = {"range": f"{target}..{source}", "output": None}
+    async with semaphore:
+        started = time.monotonic()
+        git_service = LocalGitService()
+        try:
+            target_sha, source_sha = await asyncio.gather(
+                asyncio.to_thread(git_service.resolve, repo, target),
+                asyncio.to_thread(git_service.resolve, repo, source),
+            )
+            diff = ParsedDiff.from_compare(
+                await asyncio.to_thread(git_service.get_compare, repo, source_sha, target_sha),
+                settings.memory.max_file_diff_bytes,
+            )
+            summary["files"] = len(diff.files)
+            if not diff.files:
+                summary["status"] = "empty"
+                return summary
+
+            lint_report = None
+            if settings.lint.enabled:
+                try:
+                    findings = await LintService().run(repo, source_sha, diff)
+                    lint_report = LintService.format_findings(findings) if findings else None
+                except Exception:
+                    logging.getLogger(__name__).exception("静态分析预检失败，跳过")
+
+            # 以 commit sha 审查，避免执行期间分支移动导致前后不一致
+            result = await CodeReviewAgent(gitlab_service=git_service).review(
+                project=repo,
+                source_branch=source_sha,
+                target_branch=target_sha,
+                lint_report=lint_report,
+                diff=diff,
+            )
+        except Exception as e:
+            summary.update(status="failed", error=str(e))
+            return summary
+        finally:
+            summary["elapsed"] = round(time.monotonic() - started, 2)
+
+    path = output / f"{name}.json"
+    path.write_text(result.model_dump_json(indent=2), encoding="utf-8")
+    summary.update(
+        status="done",
+        decision=result.reviewDecision.value,
+        issues=len(result.issues),
+        output=str(path),
+    )
+    return summary
+
+
+async def _review_all(
+    repo: str, ranges: List[Tuple[str, str]], output: Path, concurrency: int
+) -> List[Dict[str, Any]]:
+    semaphore = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(
+        *(_review_range(repo, target, source, output, semaphore) for target, source in ranges)
+    )
+
+
+def _cmd_review(args: argparse.Namespace) -> int:
+    repo = Path(args.repo).resolve()
+    if not (repo / ".git").exists() and not (repo / "HEAD").exists():
+        print(f"不是 git 仓库: {repo}", file=sys.stderr)
+        return 1
+    ranges = list(args.ranges)
+    if args.ranges_file:
+        with open(args.ranges_file, encoding="utf-8") as f:
+            ranges += [
+                _parse_range(line.strip())
+                for line in f
+                if line.strip() and not line.lstrip().startswith("#")
+            ]
+    if not ranges:
+        print("请指定至少一个 <目标>..<源> 范围", file=sys.stderr)
+        return 1
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    concurrency = args.concurrency or settings.queue.worker_concurrency
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+    summaries = asyncio.run(_review_all(str(repo), ranges, output, concurrency))
+    (output / "summary.json").write_text(
+        json.dumps(summaries, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    if args.json:
+        print(json.dumps(summaries, ensure_ascii=False, indent=2))
+    else:
+        for summary in summaries:
+            if summary["status"] == "done":
+                detail = f"{summary['decision']}，{summary['issues']} 个问题 -> {summary['output']}"
+            elif summary["status"] == "empty":
+                detail = "无代码差异"
+            else:
+                detail = f"失败: {summary['error']}"
+            print(f"{summary['range']}: {detail}（{summary['elapsed']}s）")
+    return 1 if any(summary["status"] == "failed" for summary in summaries) else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Code Review Agent 命令行工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    profile = subparsers.add_parser("profile", help="汇总 Agent 会话记录，输出轮次与工具耗时报告")
+    profile.add_argument(
+        "paths", nargs="*", help="会话记录文件或目录（默认 transcript.dir）"
+    )
+    profile.add_argument("--json", action="store_true", help="以 JSON 输出")
+    profile.set_defaults(func=_cmd_profile)
+
+    review = subparsers.add_parser(
+        "review", help="离线审查本地 git 仓库中的一个或多个范围，结果写入 JSON 文件"
+    )
+    review.add_argument("repo", help="本地 git 仓库路径")
+    review.add_argument(
+        "ranges", nargs="*", type=_parse_range, help="审查范围 <目标>..<源>，如 main..feature"
+    )
+    review.add_argument("--ranges-file", help="从文件读取审查范围（每行一个）")
+    review.add_argument(
+        "-o", "--output", default="review-results", help="结果输出目录（默认 review-results）"
+    )
+    review.add_argument(
+        "-j", "--concurrency", type=int, help="并发审查数（默认 queue.worker_concurrency）"
+    )
+    review.add_argument("--json", action="store_true", help="以 JSON 输出汇总")
+    review.add_argument("-v", "--verbose", action="store_true", help="输出审查过程日志")
+    review.set_defaults(func=_cmd_review)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
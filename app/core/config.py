@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 
 import yaml
 from dotenv import load_dotenv
@@ -14,12 +14,19 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 class ServerConfig(BaseModel):
     host: str = "0.0.0.0"
     port: int = 8000
+    workers: int = 1
+    reload: bool = True
 
 
 class AgentConfig(BaseModel):
     model: str = "claude-sonnet-4-20250514"
     max_tokens: int = 4096
     max_turns: int = 10
+    max_review_tokens: int = 1_000_000
+    max_review_seconds: int = 600
+    max_file_fetches: int = 30
+    max_review_payload_bytes: int = 8_000_000
+    wrap_up_ratio: float = 0.8
 
 
 class GitLabEnvConfig(BaseModel):
@@ -30,10 +37,126 @@ class GitLabEnvConfig(BaseModel):
 class GitLabConfig(BaseModel):
     clone_depth: int = 1
     temp_dir: str = "/tmp/code-review"
+    max_worktrees: int = 5
 
 
 class ReviewConfig(BaseModel):
     prompt_template: str = "prompt/code_review.md"
+    dedup_line_window: int = 5
+    snap_line_distance: int = 3
+    resolve_stale_comments: bool = False
+
+
+class LintAnalyzerConfig(BaseModel):
+    name: str
+    command: List[str]
+    extensions: List[str] = []
+    format: str = "line"
+
+
+class LintConfig(BaseModel):
+    enabled: bool = False
+    timeout: int = 60
+    max_findings: int = 50
+    analyzers: List[LintAnalyzerConfig] = []
+
+
+class OutboundLimitConfig(BaseModel):
+    rate: float = 10.0
+    burst: int = 20
+    max_retries: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    failure_threshold: int = 5
+    recovery_timeout: float = 30.0
+
+
+class OutboundConfig(BaseModel):
+    gitlab: OutboundLimitConfig = OutboundLimitConfig()
+    claude: OutboundLimitConfig = OutboundLimitConfig(rate=1.0, burst=4, max_retries=0)
+    feishu: OutboundLimitConfig = OutboundLimitConfig(rate=5.0, burst=10)
+
+
+class PrefetchConfig(BaseModel):
+    enabled: bool = True
+    concurrency: int = 8
+    max_files: int = 50
+    max_file_bytes: int = 200_000
+    max_total_bytes: int = 5_000_000
+    wait_seconds: float = 10.0
+
+
+class TranscriptConfig(BaseModel):
+    enabled: bool = False
+    dir: str = "/tmp/code-review/transcripts"
+
+
+class DiffConfig(BaseModel):
+    render_mode: Literal["full", "compact"] = "full"
+    context_radius: int = 3
+
+
+class MemoryConfig(BaseModel):
+    max_diff_bytes: int = 1_000_000
+    max_file_diff_bytes: int = 200_000
+    max_file_bytes: int = 300_000
+    chunk_bytes: int = 65_536
+
+
+class IndexConfig(BaseModel):
+    enabled: bool = False
+    extensions: List[str] = [
+        ".py", ".js", ".jsx", ".ts", ".tsx", ".go", ".java", ".kt", ".rs",
+        ".c", ".h", ".cc", ".cpp", ".hpp", ".cs", ".php", ".rb", ".swift", ".scala",
+    ]
+    max_file_bytes: int = 500_000
+    max_results: int = 50
+    search_results: int = 10
+    max_snapshots: int = 5
+
+
+class QueueConfig(BaseModel):
+    backend: str = "memory"
+    sqlite_path: str = "/tmp/code-review/queue.db"
+    redis_url: str = "redis://localhost:6379/0"
+    embedded_workers: bool = True
+    worker_concurrency: int = 2
+    poll_interval: float = 1.0
+    leader_lease_seconds: int = 30
+    journal_path: str = "/tmp/code-review/queue.jsonl"
+    heartbeat_interval: float = 10.0
+    stale_seconds: float = 60.0
+    max_attempts: int = 3
+    batch_max_items: int = 200
+    batch_validate_concurrency: int = 8
+
+
+class AdmissionConfig(BaseModel):
+    enabled: bool = True
+    queue_wait_slo_seconds: float = 600
+    max_queued: int = 500
+    window_seconds: float = 300
+    retry_after_seconds: int = 60
+    stats_ttl: float = 1.0
+
+
+class PriorityClassConfig(BaseModel):
+    name: str
+    priority: int
+    projects: List[str] = []
+    target_branches: List[str] = []
+    source_branches: List[str] = []
+
+
+class SchedulingConfig(BaseModel):
+    classes: List[PriorityClassConfig] = []
+    default_class: str = "normal"
+    default_priority: int = 1
+    aging_seconds: float = 300
+    fair_share_key: str = "project"
+    weights: Dict[str, float] = {}
+    scan_limit: int = 500
+    batch_priority_offset: int = 1
 
 
 class ClaudeEnvConfig(BaseModel):
@@ -48,6 +171,7 @@ class FeishuEnvConfig(BaseModel):
 
 class FeishuConfig(BaseModel):
     enabled: bool = True
+    progress_interval: float = 3.0
 
 
 class Settings(BaseModel):
@@ -57,6 +181,16 @@ class Settings(BaseModel):
     gitlab_env: GitLabEnvConfig
     claude_env: ClaudeEnvConfig
     review: ReviewConfig = ReviewConfig()
+    lint: LintConfig = LintConfig()
+    outbound: OutboundConfig = OutboundConfig()
+    queue: QueueConfig = QueueConfig()
+    admission: AdmissionConfig = AdmissionConfig()
+    scheduling: SchedulingConfig = SchedulingConfig()
+    prefetch: PrefetchConfig = PrefetchConfig()
+    diff: DiffConfig = DiffConfig()
+    memory: MemoryConfig = MemoryConfig()
+    transcript: TranscriptConfig = TranscriptConfig()
+    index: IndexConfig = IndexConfig()
     feishu: FeishuConfig = FeishuConfig()
     feishu_env: FeishuEnvConfig
 
@@ -98,6 +232,16 @@ def load_settings() -> Settings:
         gitlab_env=gitlab_env,
         claude_env=claude_env,
         review=ReviewConfig(**yaml_config.get("review", {})),
+        lint=LintConfig(**yaml_config.get("lint", {})),
+        outbound=OutboundConfig(**yaml_config.get("outbound", {})),
+        queue=QueueConfig(**yaml_config.get("queue", {})),
+        admission=AdmissionConfig(**yaml_config.get("admission", {})),
+        scheduling=SchedulingConfig(**yaml_config.get("scheduling", {})),
+        prefetch=PrefetchConfig(**yaml_config.get("prefetch", {})),
+        diff=DiffConfig(**yaml_config.get("diff", {})),
+        memory=MemoryConfig(**yaml_config.get("memory", {})),
+        transcript=TranscriptConfig(**yaml_config.get("transcript", {})),
+        index=IndexConfig(**yaml_config.get("index", {})),
         feishu=FeishuConfig(**yaml_config.get("feishu", {})),
         feishu_env=feishu_env,
     )
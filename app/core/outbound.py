@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import requests
+
+from app.core.config import OutboundLimitConfig, settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 分类函数：返回 None 表示不可重试；返回数值表示可重试，数值为上游建议的等待秒数（0 表示按退避策略）
+Classifier = Callable[[Exception], Optional[float]]
+
+
+class RateLimitedError(Exception):
+    """上游限流或暂时不可用"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，调用被拒绝"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（仅支持秒数形式）"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+def default_classifier(exc: Exception) -> Optional[float]:
+    """默认错误分类：限流与连接错误可重试"""
+    if isinstance(exc, RateLimitedError):
+        return exc.retry_after or 0.0
+    if isinstance(
+        exc,
+        (ConnectionError, TimeoutError, requests.ConnectionError, requests.Timeout),
+    ):
+        return 0.0
+    return None
+
+
+class TokenBucket:
+    """令牌桶限速器"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """预留一个令牌，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """熔断器：连续失败达到阈值后打开，冷却后半开放行一次试探调用"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """放行的试探调用被取消、没有结果时，允许下一次试探"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def retry_in(self) -> float:
+        """距离下一次允许试探的秒数"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(self.recovery_timeout - (time.monotonic() - self._opened_at), 0.0)
+
+
+class OutboundGovernor:
+    """出站调用治理：令牌桶限速、抖动重试（遵循 Retry-After）与熔断"""
+
+    def __init__(
+        self,
+        name: str,
+        config: OutboundLimitConfig,
+        classify: Classifier = default_classifier,
+    ):
+        self.name = name
+        self.config = config
+        self.classify = classify
+        self.bucket = TokenBucket(config.rate, config.burst)
+        self.breaker = CircuitBreaker(config.failure_threshold, config.recovery_timeout)
+
+    def _check_circuit(self) -> None:
+        if not self.breaker.allow():
+            metrics.incr("outbound_calls", upstream=self.name, outcome="rejected")
+            raise CircuitOpenError(
+                f"{self.name} 熔断中，{self.breaker.retry_in():.0f}s 后重试"
+            )
+
+    def _backoff(self, attempt: int, hint: float) -> float:
+        delay = min(self.config.max_delay, self.config.base_delay * (2 ** attempt))
+        return max(hint, delay * random.uniform(0.5, 1.0))
+
+    def _on_error(self, exc: Exception, attempt: int) -> Optional[float]:
+        """记录失败并返回重试等待时间；不可重试或已达上限时返回 None"""
+        hint = self.classify(exc)
+        if hint is None:
+            # 业务错误（如 404）说明上游可用，不计入熔断
+            self.breaker.record_success()
+            metrics.incr("outbound_calls", upstream=self.name, outcome="error")
+            return None
+        self.breaker.record_failure()
+        metrics.set("outbound_circuit_open", self.breaker.state != CircuitBreaker.CLOSED,
+                    upstream=self.name)
+        if attempt >= self.config.max_retries or self.breaker.state == CircuitBreaker.OPEN:
+            metrics.incr("outbound_calls", upstream=self.name, outcome="failed")
+            return None
+        metrics.incr("outbound_calls", upstream=self.name, outcome="retry")
+        delay = self._backoff(attempt, hint)
+        logger.warning(
+            "%s 调用失败，%.1fs 后第 %d 次重试: %s", self.name, delay, attempt + 1, exc
+        )
+        return delay
+
+    def _on_success(self, started: float) -> None:
+        self.breaker.record_success()
+        metrics.set("outbound_circuit_open", False, upstream=self.name)
+        metrics.incr("outbound_calls", upstream=self.name, outcome="success")
+        metrics.observe(
+            "outbound_latency_seconds", time.monotonic() - started, upstream=self.name
+        )
+
+    async def admit(self) -> float:
+        """长时间运行的调用（如一次 Agent 会话）开始前检查熔断并限速，返回开始时间
+
+        不做重试；调用结束后须以 record 记录结果，被取消时调用 abandon。
+        """
+        self._check_circuit()
+        metrics.observe(
+            "outbound_throttle_seconds",
+            await self.bucket.acquire_async(),
+            upstream=self.name,
+        )
+        return time.monotonic()
+
+    def record(self, started: float, exc: Optional[Exception] = None) -> None:
+        """记录 admit 放行的调用结果：按分类计入熔断，业务错误不计入"""
+        if exc is None:
+            self._on_success(started)
+        else:
+            self._on_error(exc, self.config.max_retries)
+
+    def abandon(self) -> None:
+        """admit 放行的调用被取消，不计入成功或失败"""
+        self.breaker.release_trial()
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """同步执行受治理的调用"""
+        attempt = 0
+        while True:
+            self._check_circuit()
+            metrics.observe(
+                "outbound_throttle_seconds", self.bucket.acquire(), upstream=self.name
+            )
+            started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as exc:
+                delay = self._on_error(exc, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._on_success(started)
+            return result
+
+    async def acall(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """异步执行受治理的调用"""
+        attempt = 0
+        while True:
+            self._check_circuit()
+            metrics.observe(
+                "outbound_throttle_seconds",
+                await self.bucket.acquire_async(),
+                upstream=self.name,
+            )
+            started = time.monotonic()
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as exc:
+                delay = self._on_error(exc, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._on_success(started)
+            return result
+
+
+_governors: Dict[str, OutboundGovernor] = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(name: str, classify: Classifier = default_classifier) -> OutboundGovernor:
+    """获取指定上游（gitlab / claude / feishu）的共享治理器"""
+    with _governors_lock:
+        if name not in _governors:
+            _governors[name] = OutboundGovernor(
+                name, getattr(settings.outbound, name), classify
+            )
+        return _governors[name]
@@ -1,30 +1,23 @@
 import asyncio
 import json
 import logging
-import os
 import re
 import ssl
 import threading
-
-_orig_create_default_context = ssl.create_default_context
-
-def _create_unverified_context(*args, **kwargs):
-    ctx = _orig_create_default_context(*args, **kwargs)
-    ctx.check_hostname = False
-    ctx.verify_mode = ssl.CERT_NONE
-    return ctx
-
-ssl.create_default_context = _create_unverified_context
-ssl._create_default_https_context = ssl._create_unverified_context
-
-import lark_oapi as lark
-from lark_oapi.api.im.v1 import P2ImMessageReceiveV1
+import time
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 from app.core.config import settings
 from app.models.review import ReviewDecision
-from app.service.feishu_service import FeishuService
-from app.service.gitlab_service import GitLabService
-from app.service.review_service import ReviewService
+from app.worker.dispatch import submit_review
+from app.worker.leader import LeaderElector
+from app.worker.queue import JobStatus, ReviewJob, get_queue
+
+# lark_oapi / python-gitlab 导入耗时较长，仅在飞书子系统实际使用时加载
+if TYPE_CHECKING:
+    from lark_oapi.api.im.v1 import P2ImMessageReceiveV1
+
+    from app.service.feishu_service import FeishuService
 
 logger = logging.getLogger(__name__)
 
@@ -37,68 +30,221 @@ HELP_TEXT = (
     "第三行：目标分支"
 )
 
-feishu_service = FeishuService()
+_feishu_service: Optional["FeishuService"] = None
+_feishu_service_lock = threading.Lock()
 
 
-def _run_review_async(
-    message_id: str, chat_id: str, project: str, source_branch: str, target_branch: str
-) -> None:
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        loop.run_until_complete(
-            _do_review(message_id, chat_id, project, source_branch, target_branch)
-        )
-    finally:
-        loop.close()
+def _disable_ssl_verification() -> None:
+    if ssl._create_default_https_context is ssl._create_unverified_context:
+        return
+    _orig_create_default_context = ssl.create_default_context
+
+    def _create_unverified_context(*args, **kwargs):
+        ctx = _orig_create_default_context(*args, **kwargs)
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+        return ctx
+
+    ssl.create_default_context = _create_unverified_context
+    ssl._create_default_https_context = ssl._create_unverified_context
+
+
+def _get_feishu_service() -> "FeishuService":
+    global _feishu_service
+    with _feishu_service_lock:
+        if _feishu_service is None:
+            _disable_ssl_verification()
+            from app.service.feishu_service import FeishuService
+
+            _feishu_service = FeishuService()
+        return _feishu_service
+
+
+class ProgressCard:
+    """审查进度卡片：在同一条卡片消息上原地更新阶段进度
+
+    进度更新由后台线程按 feishu.progress_interval 节流发送，期间只保留最新状态，
+    调用方（Agent 事件循环）不会被飞书接口阻塞。
+    """
 
+    def __init__(self, card_message_id: str, project: str, source_branch: str, target_branch: str):
+        self.card_message_id = card_message_id
+        self.project = project
+        self.source_branch = source_branch
+        self.target_branch = target_branch
+        self._latest: Optional[Tuple[str, str]] = None
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
 
-async def _do_review(
-    message_id: str, chat_id: str, project: str, source_branch: str, target_branch: str
+    def _card(self, phase: str, detail: str = "", status: str = "running") -> dict:
+        from app.service.feishu_service import build_progress_card
+
+        return build_progress_card(
+            self.project, self.source_branch, self.target_branch, phase, detail, status
+        )
+
+    def update(self, phase: str, detail: str = "", status: str = "running") -> None:
+        """立即更新卡片（同步调用）"""
+        _get_feishu_service().patch_card(self.card_message_id, self._card(phase, detail, status))
+
+    def report(self, phase: str, detail: str = "") -> None:
+        """登记最新进度，由后台线程节流发送"""
+        with self._condition:
+            if self._closed:
+                return
+            self._latest = (phase, detail)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"feishu-progress-{self.card_message_id[-6:]}", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self) -> None:
+        interval = settings.feishu.progress_interval
+        while True:
+            with self._condition:
+                while self._latest is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                phase, detail = self._latest
+                self._latest = None
+            try:
+                self.update(phase, detail)
+            except Exception:
+                logger.exception("更新审查进度卡片失败")
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed, timeout=interval)
+
+    def close(self) -> None:
+        """停止进度更新并等待进行中的更新结束，避免覆盖随后发送的最终结果"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+
+def progress_card_for(job: ReviewJob) -> Optional[ProgressCard]:
+    """飞书发起的任务对应的进度卡片，未发送卡片时返回 None"""
+    card_message_id = job.origin.get("card_message_id")
+    if job.origin.get("type") != "feishu" or not card_message_id:
+        return None
+    return ProgressCard(card_message_id, job.project, job.source_branch, job.target_branch)
+
+
+def _submit_review(
+    message_id: str,
+    chat_id: str,
+    project: str,
+    source_branch: str,
+    target_branch: str,
+    card_message_id: Optional[str] = None,
 ) -> None:
+    from app.service.gitlab_service import GitLabService
+
+    feishu_service = _get_feishu_service()
+    card = (
+        ProgressCard(card_message_id, project, source_branch, target_branch)
+        if card_message_id
+        else None
+    )
+
+    def reject(text: str) -> None:
+        if card:
+            card.update("queued", text, status="failed")
+        else:
+            feishu_service.reply_text(message_id, text)
+
     try:
         gitlab_service = GitLabService()
 
         try:
             gitlab_service.get_project(project)
         except Exception:
-            feishu_service.reply_text(message_id, f"项目不存在或无权访问: {project}")
+            reject(f"项目不存在或无权访问: {project}")
             return
 
         if not gitlab_service.check_branch_exists(project, source_branch):
-            feishu_service.reply_text(message_id, f"源分支不存在: {source_branch}")
+            reject(f"源分支不存在: {source_branch}")
             return
 
         if not gitlab_service.check_branch_exists(project, target_branch):
-            feishu_service.reply_text(message_id, f"目标分支不存在: {target_branch}")
+            reject(f"目标分支不存在: {target_branch}")
             return
 
-        review_service = ReviewService()
-        result = await review_service.execute_review(
-            project=project,
-            source_branch=source_branch,
-            target_branch=target_branch,
-        )
+        origin = {"type": "feishu", "message_id": message_id, "chat_id": chat_id}
+        if card_message_id:
+            origin["card_message_id"] = card_message_id
+        job = submit_review(project, source_branch, target_branch, origin)
 
-        mr_url = result.get("mr_url", "未知")
-        decision = "未知"
-        review_result = result.get("review_result")
-        if review_result and isinstance(review_result, dict):
-            raw = review_result.get("reviewDecision", "")
-            try:
-                decision = ReviewDecision(raw).label
-            except ValueError:
-                decision = raw
-
-        reply = f"代码审查完成\n审查决定: {decision}\nMR 链接: {mr_url}"
-        feishu_service.reply_text(message_id, reply)
+        if card:
+            position = get_queue().position(job.id)
+            if position is not None:
+                card.update(
+                    "queued", f"前方约 {position} 个任务" if position else "即将开始"
+                )
 
     except Exception as e:
-        logger.exception("飞书触发的代码审查失败")
-        feishu_service.reply_text(message_id, f"代码审查失败: {str(e)}")
+        logger.exception("飞书触发的代码审查提交失败")
+        reject(f"代码审查失败: {str(e)}")
+
+
+# 检查点（按完成顺序倒序）-> 其后失败时所处的进度阶段；MR 描述更新属于"更新 MR"阶段
+_FAILED_PHASE_AFTER: List[Tuple[str, str]] = [
+    ("comments", "comments"),
+    ("description", "comments"),
+    ("mr", "mr"),
+    ("agent_result", "mr"),
+]
+
+
+def _failed_phase(job: ReviewJob) -> str:
+    """由最后完成的检查点推断失败的阶段；没有检查点时失败发生在 Agent 审查及之前"""
+    return next(
+        (phase for key, phase in _FAILED_PHASE_AFTER if key in job.checkpoints), "agent"
+    )
+
 
+def notify_review_finished(job: ReviewJob) -> None:
+    """审查任务结束后更新进度卡片或回复发起消息（由执行任务的 worker 调用）"""
+    feishu_service = _get_feishu_service()
+    message_id = job.origin["message_id"]
+    card = progress_card_for(job)
+    if job.status == JobStatus.FAILED:
+        if card:
+            card.update(_failed_phase(job), f"代码审查失败: {job.error}", status="failed")
+        else:
+            feishu_service.reply_text(message_id, f"代码审查失败: {job.error}")
+        return
+
+    result = job.result or {}
+    mr_url = result.get("mr_url", "未知")
+    decision = "未知"
+    review_result = result.get("review_result")
+    if review_result and isinstance(review_result, dict):
+        raw = review_result.get("reviewDecision", "")
+        try:
+            decision = ReviewDecision(raw).label
+        except ValueError:
+            decision = raw
+
+    if card:
+        issues = len(review_result.get("issues", [])) if isinstance(review_result, dict) else 0
+        card.update(
+            "",
+            f"**审查决定**: {decision}\n**问题数**: {issues}\n**MR 链接**: {mr_url}",
+            status="done",
+        )
+        return
+    reply = f"代码审查完成\n审查决定: {decision}\nMR 链接: {mr_url}"
+    feishu_service.reply_text(message_id, reply)
 
-def do_p2_im_message_receive_v1(data: P2ImMessageReceiveV1) -> None:
+
+def do_p2_im_message_receive_v1(data: "P2ImMessageReceiveV1") -> None:
+    feishu_service = _get_feishu_service()
     message = data.event.message
 
     if message.message_type != "text":
@@ -118,22 +264,54 @@ def do_p2_im_message_receive_v1(data: P2ImMessageReceiveV1) -> None:
         feishu_service.reply_text(message.message_id, HELP_TEXT)
         return
 
-    feishu_service.reply_text(
+    from app.worker.admission import AdmissionRejected, get_admission_controller
+    from app.worker.scheduler import get_scheduler
+
+    try:
+        get_admission_controller().admit(
+            source="feishu",
+            priority=get_scheduler().priority_for(
+                command.project, command.source_branch, command.target_branch
+            ),
+        )
+    except AdmissionRejected as e:
+        feishu_service.reply_text(message.message_id, str(e))
+        return
+    except Exception:
+        # 准入检查本身失败时不阻塞提交，由后续流程报告错误
+        logger.exception("准入检查失败")
+
+    # 以一张卡片承载整个审查过程的进度，卡片发送失败时退回文本回复
+    from app.service.feishu_service import build_progress_card
+
+    card_message_id = feishu_service.reply_card(
         message.message_id,
-        f"收到，正在审查中，请稍候...\n"
-        f"项目: {command.project}\n"
-        f"源分支: {command.source_branch}\n"
-        f"目标分支: {command.target_branch}",
+        build_progress_card(
+            command.project,
+            command.source_branch,
+            command.target_branch,
+            "queued",
+            "收到，正在校验分支...",
+        ),
     )
+    if card_message_id is None:
+        feishu_service.reply_text(
+            message.message_id,
+            f"收到，正在审查中，请稍候...\n"
+            f"项目: {command.project}\n"
+            f"源分支: {command.source_branch}\n"
+            f"目标分支: {command.target_branch}",
+        )
 
     thread = threading.Thread(
-        target=_run_review_async,
+        target=_submit_review,
         args=(
             message.message_id,
             message.chat_id,
             command.project,
             command.source_branch,
             command.target_branch,
+            card_message_id,
         ),
         daemon=True,
     )
@@ -149,19 +327,84 @@ def start_feishu_bot() -> None:
         logger.warning("飞书 APP_ID 或 APP_SECRET 未配置，跳过启动")
         return
 
-    event_handler = (
-        lark.EventDispatcherHandler.builder("", "")
-        .register_p2_im_message_receive_v1(do_p2_im_message_receive_v1)
-        .build()
-    )
+    # 多进程 / 多机部署时只有 leader 建立长连接，失去租约时断开，避免同一消息被重复处理
+    connection = _WsConnection()
+    LeaderElector("feishu-bot", connection.start, connection.stop).start()
 
-    ws_client = lark.ws.Client(
-        settings.feishu_env.app_id,
-        settings.feishu_env.app_secret,
-        event_handler=event_handler,
-        log_level=lark.LogLevel.INFO,
-    )
 
-    thread = threading.Thread(target=ws_client.start, daemon=True)
-    thread.start()
-    logger.info("飞书机器人已启动 (WebSocket 长连接)")
+class _WsConnection:
+    """飞书 WebSocket 长连接：当选 leader 时建立，失去租约时断开，再次当选时重新连接
+
+    lark ws.Client 没有公开的停止接口，且 start() 会在模块级事件循环上永久阻塞，
+    因此客户端只创建一次，之后在其事件循环中断开与重连；暂停期间拒绝一切连接，
+    包括 SDK 内部已在进行的自动重连。
+    """
+
+    def __init__(self):
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        if self._client is None:
+            self._create()
+            return
+        asyncio.run_coroutine_threadsafe(self._resume(), self._loop).result(timeout=30)
+        logger.info("飞书机器人已重新连接 (WebSocket 长连接)")
+
+    def stop(self) -> None:
+        if self._client is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._suspend(), self._loop).result(timeout=30)
+        logger.warning("飞书机器人已断开 WebSocket 长连接")
+
+    def _create(self) -> None:
+        _disable_ssl_verification()
+        import lark_oapi as lark
+        from lark_oapi.ws import client as ws_module
+
+        class LeaderClient(lark.ws.Client):
+            suspended = False
+            _guard: Optional[asyncio.Lock] = None
+
+            async def _connect(self) -> None:
+                # 串行化连接：父类在已连接时会提前返回且不释放内部锁
+                if self._guard is None:
+                    self._guard = asyncio.Lock()
+                async with self._guard:
+                    if self.suspended:
+                        raise ConnectionError("已失去 leader 租约，暂停连接")
+                    if self._conn is None:
+                        await super()._connect()
+
+        event_handler = (
+            lark.EventDispatcherHandler.builder("", "")
+            .register_p2_im_message_receive_v1(do_p2_im_message_receive_v1)
+            .build()
+        )
+
+        self._client = LeaderClient(
+            settings.feishu_env.app_id,
+            settings.feishu_env.app_secret,
+            event_handler=event_handler,
+            log_level=lark.LogLevel.INFO,
+        )
+        self._loop = ws_module.loop
+
+        thread = threading.Thread(target=self._client.start, daemon=True)
+        thread.start()
+        logger.info("飞书机器人已启动 (WebSocket 长连接)")
+
+    async def _suspend(self) -> None:
+        # 断开后接收循环随之退出且不再自动重连，心跳在无连接时不发送
+        self._client.suspended = True
+        self._client._auto_reconnect = False
+        await self._client._disconnect()
+
+    async def _resume(self) -> None:
+        self._client.suspended = False
+        self._client._auto_reconnect = True
+        try:
+            await self._client._connect()
+        except Exception:
+            logger.exception("飞书 WebSocket 重新连接失败，转入自动重连")
+            asyncio.ensure_future(self._client._reconnect())
@@ -1,3 +1,5 @@
+import argparse
+import asyncio
 import logging
 
 import uvicorn
@@ -5,7 +7,6 @@ from fastapi import FastAPI
 
 from app.api.router import router
 from app.core.config import settings
-from app.feishu_bot import start_feishu_bot
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,7 +24,25 @@ app.include_router(router, prefix="/api/v1")
 
 @app.on_event("startup")
 async def startup_event():
-    start_feishu_bot()
+    # 各子系统按需导入：未启用时不加载对应的 SDK
+    if settings.queue.embedded_workers:
+        from app.worker.runner import ReviewWorker
+
+        app.state.worker_task = asyncio.create_task(ReviewWorker().run())
+
+    if settings.feishu.enabled:
+        from app.feishu_bot import start_feishu_bot
+
+        start_feishu_bot()
+    else:
+        logging.getLogger(__name__).info("飞书机器人已禁用")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    worker_task = getattr(app.state, "worker_task", None)
+    if worker_task is not None:
+        worker_task.cancel()
 
 
 @app.get("/")
@@ -32,9 +51,22 @@ async def root():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Code Review Agent API")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.server.workers,
+        help="uvicorn 进程数（大于 1 时关闭 reload）",
+    )
+    args = parser.parse_args()
+    if args.workers > 1 and settings.queue.backend == "memory":
+        # memory 队列只存在于各自进程内，其他进程查不到任务、也领取不到任务
+        parser.error("多个 uvicorn 进程需要共享队列后端，请将 queue.backend 设置为 sqlite 或 redis")
+
     uvicorn.run(
         "app.main:app",
         host=settings.server.host,
         port=settings.server.port,
-        reload=True,
+        reload=settings.server.reload and args.workers == 1,
+        workers=args.workers,
     )
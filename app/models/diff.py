@@ -0,0 +1,420 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+_HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@(.*)$")
+_CJK_RE = re.compile(r"[\u2e80-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+# 跨文件去重的最小变更行数，避免 "+}" 之类的零碎 hunk 被折叠
+_DEDUP_MIN_CHANGED_LINES = 2
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：CJK 字符按 1 个计，其余按 4 字符 1 个计"""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _strip_trailing_whitespace(text: str) -> str:
+    # 只忽略行尾空白与换行符（\r\n）差异；缩进与行内空白（如字符串内容）可能改变语义，需保留
+    return text.rstrip()
+
+
+@dataclass
+class DiffLine:
+    kind: str  # "+" 新增 / "-" 删除 / " " 上下文 / "\\" 无换行标记
+    text: str
+    old_line: Optional[int] = None
+    new_line: Optional[int] = None
+
+
+@dataclass
+class DiffHunk:
+    old_start: int
+    old_count: int
+    new_start: int
+    new_count: int
+    section: str = ""
+    lines: List[DiffLine] = field(default_factory=list)
+
+    @property
+    def header(self) -> str:
+        return (
+            f"@@ -{self.old_start},{self.old_count} "
+            f"+{self.new_start},{self.new_count} @@{self.section}"
+        )
+
+    @property
+    def changed_lines(self) -> List[DiffLine]:
+        return [line for line in self.lines if line.kind in "+-"]
+
+    def is_whitespace_only(self) -> bool:
+        """删除与新增内容仅有行尾空白、换行符或空行的差异"""
+        removed = [_strip_trailing_whitespace(l.text) for l in self.lines if l.kind == "-"]
+        added = [_strip_trailing_whitespace(l.text) for l in self.lines if l.kind == "+"]
+        if not removed or not added:
+            return False
+        return [t for t in removed if t] == [t for t in added if t]
+
+    def fingerprint(self) -> Tuple[Tuple[str, str], ...]:
+        return tuple((line.kind, line.text) for line in self.lines)
+
+    def trimmed(self, radius: int) -> List["DiffHunk"]:
+        """将上下文裁剪到变更行前后 radius 行，间隔处拆分为多个 hunk"""
+        changed = [i for i, line in enumerate(self.lines) if line.kind in "+-"]
+        if not changed:
+            return []
+
+        # 记录每行之前的新旧行号游标，用于计算拆分后 hunk 的起始行
+        cursors = []
+        old_line, new_line = self.old_start, self.new_start
+        for line in self.lines:
+            cursors.append((old_line, new_line))
+            if line.kind in " -":
+                old_line += 1
+            if line.kind in " +":
+                new_line += 1
+
+        keep = []
+        nearest = 0
+        for i, line in enumerate(self.lines):
+            while nearest + 1 < len(changed) and changed[nearest + 1] <= i:
+                nearest += 1
+            distance = min(abs(i - c) for c in changed[max(nearest - 1, 0): nearest + 2])
+            keep.append(line.kind != " " or distance <= radius)
+
+        hunks: List[DiffHunk] = []
+        current: Optional[DiffHunk] = None
+        for i, line in enumerate(self.lines):
+            if not keep[i]:
+                current = None
+                continue
+            if current is None:
+                current = DiffHunk(
+                    old_start=cursors[i][0],
+                    old_count=0,
+                    new_start=cursors[i][1],
+                    new_count=0,
+                    section=self.section if not hunks else "",
+                )
+                hunks.append(current)
+            current.lines.append(line)
+            if line.kind in " -":
+                current.old_count += 1
+            if line.kind in " +":
+                current.new_count += 1
+        return hunks
+
+
+@dataclass
+class DiffPosition:
+    """GitLab 行级评论可用的位置"""
+
+    old_path: str
+    new_path: str
+    old_line: Optional[int]
+    new_line: Optional[int]
+
+
+@dataclass
+class FileDiff:
+    old_path: str
+    new_path: str
+    new_file: bool = False
+    deleted_file: bool = False
+    renamed_file: bool = False
+    preamble: str = ""  # 首个 hunk 之前的文本（如二进制文件提示）
+    hunks: List[DiffHunk] = field(default_factory=list)
+    # 超过解析上限被截断时为原始 diff 的大小（UTF-8 字节数），否则为 0
+    truncated_size: int = 0
+    # 截断部分中新文件一侧的行：新行号 -> 旧行号（新增行为 None），只用于评论定位与变更行判断
+    overflow_lines: Dict[int, Optional[int]] = field(default_factory=dict)
+
+    @classmethod
+    def parse(cls, data: dict, max_bytes: Optional[int] = None) -> "FileDiff":
+        """解析单个文件的 diff；超过 max_bytes 时只解析前面完整的行"""
+        file_diff = cls(
+            old_path=data["old_path"],
+            new_path=data["new_path"],
+            new_file=bool(data.get("new_file")),
+            deleted_file=bool(data.get("deleted_file")),
+            renamed_file=bool(data.get("renamed_file")),
+        )
+        text = data.get("diff") or ""
+        overflow = ""
+        if max_bytes and len(text) > max_bytes // 4:
+            # UTF-8 每字符至多 4 字节，字符数足够小时无需编码即可确定不超限
+            encoded = text.encode("utf-8")
+            if len(encoded) > max_bytes:
+                file_diff.truncated_size = len(encoded)
+                # 在换行处切分，两侧都是完整的 UTF-8 序列
+                cut = encoded.rfind(b"\n", 0, max_bytes) + 1
+                text, overflow = encoded[:cut].decode("utf-8"), encoded[cut:].decode("utf-8")
+            del encoded
+        preamble: List[str] = []
+        hunk: Optional[DiffHunk] = None
+        old_line = new_line = 0
+        for raw in text.splitlines():
+            header = _HUNK_HEADER_RE.match(raw)
+            if header:
+                old_start, old_count, new_start, new_count, section = header.groups()
+                hunk = DiffHunk(
+                    old_start=int(old_start),
+                    old_count=int(old_count) if old_count is not None else 1,
+                    new_start=int(new_start),
+                    new_count=int(new_count) if new_count is not None else 1,
+                    section=section,
+                )
+                file_diff.hunks.append(hunk)
+                old_line, new_line = hunk.old_start, hunk.new_start
+                continue
+            if hunk is None:
+                preamble.append(raw)
+                continue
+            kind, text = (raw[0], raw[1:]) if raw else (" ", "")
+            if kind == "+":
+                hunk.lines.append(DiffLine(kind, text, new_line=new_line))
+                new_line += 1
+            elif kind == "-":
+                hunk.lines.append(DiffLine(kind, text, old_line=old_line))
+                old_line += 1
+            elif kind == "\\":
+                hunk.lines.append(DiffLine(kind, text))
+            else:
+                hunk.lines.append(DiffLine(" ", text, old_line, new_line))
+                old_line += 1
+                new_line += 1
+        file_diff.preamble = "\n".join(preamble)
+        if file_diff.truncated_size and hunk is not None:
+            # 最后一个 hunk 被截断，行数以实际保留的行为准
+            hunk.old_count = sum(1 for line in hunk.lines if line.kind in " -")
+            hunk.new_count = sum(1 for line in hunk.lines if line.kind in " +")
+        if overflow:
+            file_diff._scan_overflow(overflow, old_line, new_line)
+        return file_diff
+
+    def _scan_overflow(self, text: str, old_line: int, new_line: int) -> None:
+        """截断部分不保留行内容，只记录新文件一侧的行号，使评论仍能定位到完整 diff 中的任意行"""
+        for raw in text.splitlines():
+            header = _HUNK_HEADER_RE.match(raw)
+            if header:
+                old_line, new_line = int(header.group(1)), int(header.group(3))
+                continue
+            kind = raw[:1] or " "
+            if kind == "+":
+                self.overflow_lines[new_line] = None
+                new_line += 1
+            elif kind == "-":
+                old_line += 1
+            elif kind != "\\":
+                self.overflow_lines[new_line] = old_line
+                old_line += 1
+                new_line += 1
+
+    @property
+    def path(self) -> str:
+        return self.old_path if self.deleted_file else self.new_path
+
+    def added_lines(self) -> Set[int]:
+        """新文件中新增行的行号（含截断部分）"""
+        added = {
+            line.new_line
+            for hunk in self.hunks
+            for line in hunk.lines
+            if line.kind == "+"
+        }
+        added.update(new for new, old in self.overflow_lines.items() if old is None)
+        return added
+
+    def _new_side_lines(self) -> Dict[int, Optional[int]]:
+        """新文件一侧可评论的行：新行号 -> 旧行号（新增行为 None）"""
+        lines = {
+            line.new_line: line.old_line if line.kind == " " else None
+            for hunk in self.hunks
+            for line in hunk.lines
+            if line.new_line is not None
+        }
+        lines.update(self.overflow_lines)
+        return lines
+
+    def position(self, line: int, max_distance: int = 0) -> Optional[DiffPosition]:
+        """将新文件行号映射为可评论位置，不在 diff 中时吸附到 max_distance 内最近的可评论行"""
+        if self.deleted_file:
+            return None
+        commentable = self._new_side_lines()
+        for distance in range(max_distance + 1):
+            for candidate in (line - distance, line + distance):
+                if candidate not in commentable:
+                    continue
+                return DiffPosition(
+                    old_path=self.old_path,
+                    new_path=self.new_path,
+                    # 新增行只有 new_line；上下文行需同时提供 old_line 与 new_line
+                    old_line=commentable[candidate],
+                    new_line=candidate,
+                )
+        return None
+
+    def content_signature(self) -> Tuple[str, ...]:
+        """新增或删除文件的完整内容，用于识别以 删除 + 新增 形式出现的纯重命名"""
+        kind = "-" if self.deleted_file else "+"
+        return tuple(
+            line.text for hunk in self.hunks for line in hunk.lines if line.kind == kind
+        )
+
+    def _truncation_notice(self) -> str:
+        return (
+            f"... [diff 已截断：该文件 diff 共 {self.truncated_size} 字节，仅显示前面部分。"
+            f"如需查看其余变更，请调用 get_file_content 获取文件]"
+        )
+
+    def render(self) -> str:
+        parts = [f"--- a/{self.old_path}", f"+++ b/{self.new_path}"]
+        if self.preamble:
+            parts.append(self.preamble)
+        for hunk in self.hunks:
+            parts.append(hunk.header)
+            parts.extend(f"{line.kind}{line.text}" for line in hunk.lines)
+        if self.truncated_size:
+            parts.append(self._truncation_notice())
+        return "\n".join(parts)
+
+    def render_compact(
+        self, radius: int, seen_hunks: Dict[Tuple[Tuple[str, str], ...], str]
+    ) -> str:
+        """紧凑渲染：裁剪上下文、折叠纯空白变更与重复 hunk"""
+        if self.renamed_file and not self.hunks:
+            return f"=== 重命名: {self.old_path} -> {self.new_path}（内容无变化）"
+        if self.hunks and all(hunk.is_whitespace_only() for hunk in self.hunks):
+            return f"=== {self.path}: 仅空白字符变更（{len(self.hunks)} 处），已省略"
+
+        parts = [f"--- a/{self.old_path}", f"+++ b/{self.new_path}"]
+        if self.preamble:
+            parts.append(self.preamble)
+        for hunk in self.hunks:
+            if hunk.is_whitespace_only():
+                parts.append(
+                    f"@@ -{hunk.old_start},{hunk.old_count} +{hunk.new_start},{hunk.new_count} @@"
+                    f" 仅空白字符变更，已省略"
+                )
+                continue
+            fingerprint = hunk.fingerprint()
+            if len(hunk.changed_lines) >= _DEDUP_MIN_CHANGED_LINES:
+                if fingerprint in seen_hunks:
+                    parts.append(
+                        f"@@ -{hunk.old_start},{hunk.old_count} +{hunk.new_start},{hunk.new_count} @@"
+                        f" 与 {seen_hunks[fingerprint]} 中的变更相同，已省略"
+                    )
+                    continue
+                seen_hunks[fingerprint] = self.path
+            for trimmed in hunk.trimmed(radius):
+                parts.append(trimmed.header)
+                parts.extend(f"{line.kind}{line.text}" for line in trimmed.lines)
+        if self.truncated_size:
+            parts.append(self._truncation_notice())
+        return "\n".join(parts)
+
+
+@dataclass
+class ParsedDiff:
+    """结构化 diff：逐文件的 hunk 与新旧行号映射，每次审查解析一次"""
+
+    files: List[FileDiff] = field(default_factory=list)
+
+    @classmethod
+    def from_compare(cls, compare: dict, max_file_bytes: Optional[int] = None) -> "ParsedDiff":
+        return cls(
+            files=[FileDiff.parse(diff, max_file_bytes) for diff in compare.get("diffs", [])]
+        )
+
+    def file(self, path: str) -> Optional[FileDiff]:
+        for file_diff in self.files:
+            if path in (file_diff.new_path, file_diff.old_path):
+                return file_diff
+        return None
+
+    def position(
+        self, path: str, line: Optional[int], max_distance: int = 0
+    ) -> Optional[DiffPosition]:
+        """问题所在位置对应的行级评论位置，无法定位时返回 None"""
+        file_diff = self.file(path)
+        if file_diff is None or not line:
+            return None
+        return file_diff.position(line, max_distance)
+
+    def full_tokens(self) -> int:
+        """按解析结果估算完整渲染（full 模式、不截断）的 token 数，不生成 diff 文本"""
+        chars = cjk = 0
+        for file_diff in self.files:
+            # "--- a/" 与 "+++ b/" 两行
+            chars += len(file_diff.old_path) + len(file_diff.new_path) + 14
+            chars += len(file_diff.preamble)
+            for hunk in file_diff.hunks:
+                chars += len(hunk.header) + 1
+                for line in hunk.lines:
+                    chars += len(line.text) + 2
+                    cjk += len(_CJK_RE.findall(line.text))
+        return cjk + (chars - cjk + 3) // 4
+
+    def _renamed_pairs(self) -> Dict[int, str]:
+        """以 删除 + 新增 形式出现、内容完全相同的文件对视为纯重命名
+
+        返回 id(被删除文件) -> 新路径、id(新增文件) -> ""（不再单独输出）。
+        """
+        added = {
+            f.content_signature(): f for f in self.files if f.new_file and f.hunks
+        }
+        renamed: Dict[int, str] = {}
+        for file_diff in self.files:
+            if not file_diff.deleted_file or not file_diff.hunks:
+                continue
+            match = added.pop(file_diff.content_signature(), None)
+            if match is not None:
+                renamed[id(file_diff)] = match.new_path
+                renamed[id(match)] = ""
+        return renamed
+
+    def render(
+        self, mode: str = "full", context_radius: int = 3, max_bytes: Optional[int] = None
+    ) -> str:
+        """渲染为 diff 文本，mode 为 full（原样）或 compact（紧凑）
+
+        超过 max_bytes（按 UTF-8 字节计）后不再渲染后续文件，只在末尾列出其路径。
+        """
+        if mode not in ("full", "compact"):
+            raise ValueError(f"不支持的 diff 渲染模式: {mode}")
+        renamed = self._renamed_pairs() if mode == "compact" else {}
+
+        seen_hunks: Dict[Tuple[Tuple[str, str], ...], str] = {}
+        parts: List[str] = []
+        size = 0
+        omitted: List[str] = []
+        for file_diff in self.files:
+            if renamed.get(id(file_diff)) == "":
+                continue
+            if omitted:
+                omitted.append(file_diff.path)
+                continue
+            if mode == "full":
+                text = file_diff.render()
+            elif id(file_diff) in renamed:
+                text = (
+                    f"=== 重命名: {file_diff.old_path} -> {renamed[id(file_diff)]}"
+                    f"（内容无变化）"
+                )
+            else:
+                text = file_diff.render_compact(context_radius, seen_hunks)
+            text_bytes = len(text.encode("utf-8")) if max_bytes else 0
+            if max_bytes and parts and size + text_bytes > max_bytes:
+                omitted.append(file_diff.path)
+                continue
+            parts.append(text)
+            size += text_bytes + 1
+
+        if omitted:
+            parts.append(
+                f"... [diff 已截断：超过 {max_bytes} 字节上限，以下 {len(omitted)} 个文件的变更未显示，"
+                f"如需审查请调用 get_file_content 获取]\n"
+                + "\n".join(f"- {path}" for path in omitted)
+            )
+        return "\n".join(parts)
@@ -0,0 +1,155 @@
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Generic, List, Optional, Tuple, Type, TypeVar
+
+from app.core.config import settings
+from app.service.git_service import LocalRepoService
+
+logger = logging.getLogger(__name__)
+
+
+class CodeIndex:
+    """单个 commit 的代码索引，files 为 路径 -> 该文件的解析结果"""
+
+    def __init__(self, sha: str, files: Dict[str, dict]):
+        self.sha = sha
+        self.files = files
+        # 构建该索引的工作目录，由服务在每次获取时刷新
+        self.worktree: Optional[Path] = None
+
+    def to_json(self) -> str:
+        return json.dumps({"sha": self.sha, "files": self.files}, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, data: str):
+        payload = json.loads(data)
+        return cls(payload["sha"], payload["files"])
+
+
+IndexT = TypeVar("IndexT", bound=CodeIndex)
+
+
+class CodeIndexService(Generic[IndexT]):
+    """代码索引服务基类：基于本地检出按 commit 建立并持久化索引，新 commit 增量更新
+
+    子类需指定 name（索引子目录与日志名称）、index_class，并实现 parse。
+    """
+
+    name = ""
+    index_class: Type[IndexT]
+
+    def __init__(self, repo_service: Optional[LocalRepoService] = None):
+        self.config = settings.index
+        self.root = Path(settings.gitlab.temp_dir) / "index"
+        self.repo_service = repo_service or LocalRepoService()
+        self._loaded: Dict[Tuple[str, str], IndexT] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def parse(self, path: str, text: str) -> dict:
+        raise NotImplementedError
+
+    def _project_lock(self, project_path: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(project_path, threading.Lock())
+
+    def _index_dir(self, project_path: str) -> Path:
+        return self.root / project_path.replace("/", "__") / self.name
+
+    def _indexable(self, path: str) -> bool:
+        return any(path.endswith(ext) for ext in self.config.extensions)
+
+    def _parse_file(self, worktree: Path, path: str) -> Optional[dict]:
+        file_path = worktree / path
+        try:
+            if not file_path.is_file() or file_path.stat().st_size > self.config.max_file_bytes:
+                return None
+            text = file_path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            return None
+        return self.parse(path, text)
+
+    def _scan(self, worktree: Path) -> List[str]:
+        paths = []
+        for file_path in worktree.rglob("*"):
+            relative = file_path.relative_to(worktree).as_posix()
+            if relative.startswith(".git") or "/.git/" in relative:
+                continue
+            if file_path.is_file() and self._indexable(relative):
+                paths.append(relative)
+        return paths
+
+    @staticmethod
+    def _snapshots(index_dir: Path) -> List[Path]:
+        return sorted(
+            index_dir.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True
+        )
+
+    def _build(self, project_path: str, worktree: Path, sha: str, index_dir: Path) -> IndexT:
+        files: Dict[str, dict] = {}
+        changed: Optional[List[str]] = None
+        snapshots = self._snapshots(index_dir)
+        if snapshots:
+            base = snapshots[0]
+            try:
+                changed = self.repo_service.changed_files(project_path, base.stem, sha)
+                files = self.index_class.from_json(base.read_text(encoding="utf-8")).files
+            except (RuntimeError, OSError, ValueError, KeyError) as e:
+                # 浅克隆下基准 commit 可能已不可达，退回全量构建
+                logger.info("无法增量更新%s，改为全量构建: %s", self.name, e)
+                changed, files = None, {}
+
+        paths = self._scan(worktree) if changed is None else changed
+        for path in paths:
+            files.pop(path, None)
+            if self._indexable(path):
+                entry = self._parse_file(worktree, path)
+                if entry is not None:
+                    files[path] = entry
+
+        logger.info(
+            "%s 索引已%s: %s@%s，解析 %d 个文件，共 %d 个文件",
+            self.name,
+            "全量构建" if changed is None else "增量更新",
+            project_path,
+            sha[:8],
+            len(paths),
+            len(files),
+        )
+        index = self.index_class(sha, files)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        target = index_dir / f"{sha}.json"
+        tmp = target.with_name(f"{target.name}.tmp")
+        tmp.write_text(index.to_json(), encoding="utf-8")
+        tmp.replace(target)
+        for stale in self._snapshots(index_dir)[self.config.max_snapshots:]:
+            stale.unlink(missing_ok=True)
+        return index
+
+    def get(self, project_path: str, ref: str, worktree: Optional[Path] = None) -> IndexT:
+        """获取指定 ref 的索引，不存在时基于最近的索引增量构建
+
+        worktree 为调用方已检出的该 ref 的工作目录时不再重复拉取与检出。
+        """
+        if worktree is None:
+            with self.repo_service.checked_out(project_path, ref) as worktree:
+                return self.get(project_path, ref, worktree)
+        # 工作目录按 commit sha 命名
+        sha = worktree.name
+        with self._project_lock(project_path):
+            index = self._loaded.get((project_path, sha))
+            if index is None:
+                index_dir = self._index_dir(project_path)
+                snapshot = index_dir / f"{sha}.json"
+                if snapshot.exists():
+                    index = self.index_class.from_json(snapshot.read_text(encoding="utf-8"))
+                else:
+                    index = self._build(project_path, worktree, sha, index_dir)
+                # 内存中每个项目只保留最新使用的一个快照
+                for key in [key for key in self._loaded if key[0] == project_path]:
+                    del self._loaded[key]
+                self._loaded[(project_path, sha)] = index
+            index.worktree = worktree
+            return index
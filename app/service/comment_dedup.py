@@ -0,0 +1,112 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from app.models.review import Issue
+
+_MARKER_RE = re.compile(
+    r"<!-- code-review-agent fp=(?P<fp>[0-9a-f]{16}) line=(?P<line>\d*) -->"
+)
+# 兼容未带指纹标记的历史评论：**[HIGH] bug**\n\n描述\n\n**建议**: ...
+_LEGACY_BODY_RE = re.compile(
+    r"^(?:\*\*(?P<file>[^*\n]+)\*\*\n\n)?"
+    r"\*\*\[(?P<severity>[A-Z]+)\] (?P<category>[a-z]+)\*\*\n\n"
+    r"(?P<description>.*?)\n\n\*\*建议\*\*",
+    re.DOTALL,
+)
+_MARKDOWN_CHARS_RE = re.compile(r"[`*_#>~\[\]()]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@dataclass
+class ExistingComment:
+    """MR 上已存在的审查评论"""
+
+    discussion_id: str
+    fingerprint: str
+    line: Optional[int]
+    resolved: bool
+    resolvable: bool
+    # 由本服务所用账号发布（只有这类讨论会被自动解决）
+    own: bool
+
+
+def normalize_description(text: str) -> str:
+    """归一化问题描述：去除 Markdown 符号、统一大小写与空白，截取前 200 字符"""
+    text = _MARKDOWN_CHARS_RE.sub("", text.lower())
+    return _WHITESPACE_RE.sub(" ", text).strip()[:200]
+
+
+def _fingerprint(file: str, category: str, description: str) -> str:
+    key = "\0".join([file, category, normalize_description(description)])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def fingerprint_issue(issue: Issue) -> str:
+    """计算问题指纹（文件 + 分类 + 归一化描述，不含行号）"""
+    return _fingerprint(issue.file, issue.category.value, issue.description)
+
+
+def fingerprint_marker(issue: Issue) -> str:
+    """嵌入评论正文的指纹标记（Markdown 渲染时不可见）"""
+    line = issue.line if issue.line else ""
+    return f"<!-- code-review-agent fp={fingerprint_issue(issue)} line={line} -->"
+
+
+def parse_existing_comments(
+    discussions: Iterable[dict], bot_user_id: Optional[int] = None
+) -> List[ExistingComment]:
+    """从 MR discussions 中识别本服务发布过的审查评论
+
+    带指纹标记的评论直接识别；无标记的历史格式评论只认 bot_user_id 发布的，
+    避免把人工评论当作本服务的评论去重或解决。
+    """
+    comments = []
+    for discussion in discussions:
+        notes = discussion.get("notes") or []
+        if not notes:
+            continue
+        note = notes[0]
+        body = note.get("body", "")
+        position = note.get("position") or {}
+        own = bot_user_id is not None and (note.get("author") or {}).get("id") == bot_user_id
+
+        marker = _MARKER_RE.search(body)
+        if marker:
+            fingerprint = marker.group("fp")
+            line = int(marker.group("line")) if marker.group("line") else None
+        else:
+            legacy = own and _LEGACY_BODY_RE.match(body)
+            file = (legacy and legacy.group("file")) or position.get("new_path")
+            if not legacy or not file:
+                continue
+            fingerprint = _fingerprint(
+                file, legacy.group("category"), legacy.group("description")
+            )
+            line = position.get("new_line")
+
+        comments.append(ExistingComment(
+            discussion_id=discussion["id"],
+            fingerprint=fingerprint,
+            line=line,
+            resolved=bool(note.get("resolved")),
+            resolvable=bool(note.get("resolvable")),
+            own=own,
+        ))
+    return comments
+
+
+def find_duplicate(
+    issue: Issue, existing: Iterable[ExistingComment], line_window: int
+) -> Optional[ExistingComment]:
+    """查找与问题重复的已有评论：指纹相同且行号相差不超过 line_window"""
+    fingerprint = fingerprint_issue(issue)
+    for comment in existing:
+        if comment.fingerprint != fingerprint:
+            continue
+        if issue.line is None or comment.line is None:
+            return comment
+        if abs(issue.line - comment.line) <= line_window:
+            return comment
+    return None
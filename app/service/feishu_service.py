@@ -1,20 +1,95 @@
 import json
 import logging
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import lark_oapi as lark
 from lark_oapi.api.im.v1 import (
     CreateMessageRequest,
     CreateMessageRequestBody,
+    PatchMessageRequest,
+    PatchMessageRequestBody,
     ReplyMessageRequest,
     ReplyMessageRequestBody,
 )
 
 from app.core.config import settings
+from app.core.outbound import (
+    CircuitOpenError,
+    RateLimitedError,
+    get_governor,
+    parse_retry_after,
+)
 
 logger = logging.getLogger(__name__)
 
+# 飞书频控错误码：接口频率限制 / 消息发送频率限制
+_RATE_LIMIT_CODES = {99991400, 11232, 230020}
+
+
+# 进度卡片展示的审查阶段（阶段键, 名称）
+PROGRESS_PHASES: List[Tuple[str, str]] = [
+    ("queued", "排队"),
+    ("diff", "获取 diff"),
+    ("lint", "静态分析"),
+    ("agent", "Agent 审查"),
+    ("mr", "更新 MR"),
+    ("comments", "发布评论"),
+]
+
+_CARD_TEMPLATES = {"running": "blue", "done": "green", "failed": "red"}
+_CARD_TITLES = {"running": "代码审查进行中", "done": "代码审查完成", "failed": "代码审查失败"}
+
+
+def build_progress_card(
+    project: str,
+    source_branch: str,
+    target_branch: str,
+    phase: str,
+    detail: str = "",
+    status: str = "running",
+) -> Dict[str, Any]:
+    """构建审查进度卡片：已完成阶段打勾，当前阶段附带说明"""
+    keys = [key for key, _ in PROGRESS_PHASES]
+    current = keys.index(phase) if phase in keys else (len(keys) if status == "done" else 0)
+    steps = []
+    for index, (_, name) in enumerate(PROGRESS_PHASES):
+        if index < current or status == "done":
+            mark = "✅"
+        elif index == current:
+            mark = "❌" if status == "failed" else "⏳"
+        else:
+            mark = "⬜"
+        line = f"{mark} {name}"
+        if index == current and detail:
+            line += f"：{detail}"
+        steps.append(line)
+    if status == "done" and detail:
+        steps.append(detail)
+
+    return {
+        "config": {"wide_screen_mode": True, "update_multi": True},
+        "header": {
+            "template": _CARD_TEMPLATES[status],
+            "title": {"tag": "plain_text", "content": _CARD_TITLES[status]},
+        },
+        "elements": [
+            {
+                "tag": "div",
+                "text": {
+                    "tag": "lark_md",
+                    "content": (
+                        f"**项目**: {project}\n"
+                        f"**源分支**: {source_branch}\n"
+                        f"**目标分支**: {target_branch}"
+                    ),
+                },
+            },
+            {"tag": "hr"},
+            {"tag": "div", "text": {"tag": "lark_md", "content": "\n".join(steps)}},
+        ],
+    }
+
 
 @dataclass
 class ReviewCommand:
@@ -43,6 +118,31 @@ class FeishuService:
             target_branch=lines[2],
         )
 
+    def _execute(self, api: Callable[[Any], Any], request: Any, action: str) -> Any:
+        def _call():
+            response = api(request)
+            if response.code in _RATE_LIMIT_CODES:
+                raw_headers = response.raw.headers if response.raw else {}
+                headers = {k.lower(): v for k, v in raw_headers.items()}
+                raise RateLimitedError(
+                    f"飞书频控: {response.code}",
+                    parse_retry_after(
+                        headers.get("x-ogw-ratelimit-reset") or headers.get("retry-after")
+                    ),
+                )
+            return response
+
+        try:
+            response = get_governor("feishu").call(_call)
+        except (RateLimitedError, CircuitOpenError) as e:
+            logger.error("%s failed: %s", action, e)
+            return None
+        if not response.success():
+            logger.error(
+                "%s failed, code: %s, msg: %s", action, response.code, response.msg
+            )
+        return response
+
     def reply_text(self, message_id: str, text: str) -> None:
         content = json.dumps({"text": text})
         request = (
@@ -56,11 +156,7 @@ class FeishuService:
             )
             .build()
         )
-        response = self.client.im.v1.message.reply(request)
-        if not response.success():
-            logger.error(
-                "reply failed, code: %s, msg: %s", response.code, response.msg
-            )
+        self._execute(self.client.im.v1.message.reply, request, "reply")
 
     def send_text(self, chat_id: str, text: str) -> None:
         content = json.dumps({"text": text})
@@ -76,8 +172,37 @@ class FeishuService:
             )
             .build()
         )
-        response = self.client.im.v1.message.create(request)
-        if not response.success():
-            logger.error(
-                "send failed, code: %s, msg: %s", response.code, response.msg
+        self._execute(self.client.im.v1.message.create, request, "send")
+
+    def reply_card(self, message_id: str, card: Dict[str, Any]) -> Optional[str]:
+        """以消息卡片回复，返回卡片消息 ID（失败时为 None）"""
+        request = (
+            ReplyMessageRequest.builder()
+            .message_id(message_id)
+            .request_body(
+                ReplyMessageRequestBody.builder()
+                .content(json.dumps(card, ensure_ascii=False))
+                .msg_type("interactive")
+                .build()
+            )
+            .build()
+        )
+        response = self._execute(self.client.im.v1.message.reply, request, "reply_card")
+        if response is None or not response.success() or response.data is None:
+            return None
+        return response.data.message_id
+
+    def patch_card(self, message_id: str, card: Dict[str, Any]) -> bool:
+        """原地更新已发送的消息卡片"""
+        request = (
+            PatchMessageRequest.builder()
+            .message_id(message_id)
+            .request_body(
+                PatchMessageRequestBody.builder()
+                .content(json.dumps(card, ensure_ascii=False))
+                .build()
             )
+            .build()
+        )
+        response = self._execute(self.client.im.v1.message.patch, request, "patch_card")
+        return response is not None and response.success()
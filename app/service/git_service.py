@@ -0,0 +1,252 @@
+import base64
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from app.core.config import settings
+from app.service.spool import read_text, spooled_file
+
+logger = logging.getLogger(__name__)
+
+
+class LocalRepoService:
+    """本地仓库镜像服务：为每个项目维护一个裸镜像，并按 commit 检出工作目录"""
+
+    _locks: Dict[str, threading.Lock] = {}
+    _locks_guard = threading.Lock()
+    # 正在使用的工作目录及其引用计数，淘汰时跳过
+    _in_use: Dict[Path, int] = {}
+    _in_use_guard = threading.Lock()
+
+    def __init__(self):
+        self.root = Path(settings.gitlab.temp_dir) / "repos"
+        self.depth = settings.gitlab.clone_depth
+        self.max_worktrees = settings.gitlab.max_worktrees
+
+    @classmethod
+    def _project_lock(cls, project_path: str) -> threading.Lock:
+        with cls._locks_guard:
+            return cls._locks.setdefault(project_path, threading.Lock())
+
+    def _project_dir(self, project_path: str) -> Path:
+        return self.root / project_path.replace("/", "__")
+
+    def _remote_url(self, project_path: str) -> str:
+        # 离线审查时项目即本地仓库路径，以 file:// 协议拉取（支持浅克隆与按 sha 拉取）
+        if Path(project_path).is_absolute() and Path(project_path).is_dir():
+            return Path(project_path).as_uri()
+        return f"{settings.gitlab_env.url.rstrip('/')}/{project_path}.git"
+
+    def _auth_args(self) -> List[str]:
+        """通过临时 http.extraHeader 传递凭证，避免将 token 写入 git 配置"""
+        if not settings.gitlab_env.token:
+            return []
+        credential = base64.b64encode(
+            f"oauth2:{settings.gitlab_env.token}".encode()
+        ).decode()
+        return ["-c", f"http.extraHeader=Authorization: Basic {credential}"]
+
+    def _git(self, cwd: Path, *args: str) -> str:
+        completed = subprocess.run(
+            ["git", *self._auth_args(), *args],
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(
+                f"git {args[0]} 执行失败: {completed.stderr.strip()}"
+            )
+        return completed.stdout
+
+    def _ensure_mirror(self, project_path: str) -> Path:
+        mirror = self._project_dir(project_path) / "mirror.git"
+        if not mirror.exists():
+            mirror.mkdir(parents=True)
+            self._git(mirror, "init", "--bare", "--quiet")
+            self._git(mirror, "remote", "add", "origin", self._remote_url(project_path))
+        return mirror
+
+    def fetch(self, project_path: str, ref: str) -> str:
+        """拉取指定 ref 到本地镜像，返回其 commit sha"""
+        with self._project_lock(project_path):
+            mirror = self._ensure_mirror(project_path)
+            self._git(
+                mirror, "fetch", "--quiet", "--depth", str(self.depth), "origin", ref
+            )
+            return self._git(mirror, "rev-parse", "FETCH_HEAD").strip()
+
+    def checkout(self, project_path: str, ref: str) -> Path:
+        """检出指定 ref 的工作目录（按 commit 复用），返回目录路径
+
+        返回的目录在调用 release 之前不会被淘汰；仅在一段代码内使用时用 checked_out。
+        """
+        sha = self.fetch(project_path, ref)
+        with self._project_lock(project_path):
+            mirror = self._ensure_mirror(project_path)
+            worktree = self._project_dir(project_path) / sha
+            if not worktree.exists():
+                self._git(
+                    mirror, "worktree", "add", "--detach", "--force", str(worktree), sha
+                )
+                logger.info("已检出工作目录: %s@%s", project_path, sha[:8])
+            else:
+                os.utime(worktree)
+            with self._in_use_guard:
+                self._in_use[worktree] = self._in_use.get(worktree, 0) + 1
+            self._evict_worktrees(project_path, mirror)
+        return worktree
+
+    def release(self, worktree: Path) -> None:
+        """释放 checkout 返回的工作目录，之后允许被淘汰"""
+        with self._in_use_guard:
+            count = self._in_use.get(worktree, 0) - 1
+            if count > 0:
+                self._in_use[worktree] = count
+            else:
+                self._in_use.pop(worktree, None)
+
+    @contextmanager
+    def checked_out(self, project_path: str, ref: str) -> Iterator[Path]:
+        """检出工作目录，退出时释放"""
+        worktree = self.checkout(project_path, ref)
+        try:
+            yield worktree
+        finally:
+            self.release(worktree)
+
+    def changed_files(self, project_path: str, base_sha: str, sha: str) -> List[str]:
+        """两个已拉取 commit 之间发生变化（含删除）的文件路径"""
+        with self._project_lock(project_path):
+            mirror = self._ensure_mirror(project_path)
+            output = self._git(
+                mirror, "diff", "--name-only", "--no-renames", base_sha, sha
+            )
+        return [line for line in output.splitlines() if line]
+
+    def _evict_worktrees(self, project_path: str, mirror: Path) -> None:
+        """仅保留最近使用的若干个工作目录，正在使用的不淘汰（调用方持有项目锁）"""
+        with self._in_use_guard:
+            in_use = set(self._in_use)
+        worktrees = sorted(
+            (
+                path
+                for path in self._project_dir(project_path).iterdir()
+                if path.is_dir() and path.name != mirror.name
+            ),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True,
+        )
+        for stale in worktrees[self.max_worktrees:]:
+            if stale in in_use:
+                continue
+            try:
+                self._git(mirror, "worktree", "remove", "--force", str(stale))
+            except RuntimeError:
+                shutil.rmtree(stale, ignore_errors=True)
+                self._git(mirror, "worktree", "prune")
+
+
+class LocalGitService:
+    """本地 git 仓库的只读服务，以 GitLabService 相同的接口提供比较结果与文件内容
+
+    用于离线审查（python -m app.cli review），project 参数为仓库的绝对路径。
+    """
+
+    @staticmethod
+    def _git(repo: str, *args: str) -> bytes:
+        completed = subprocess.run(
+            ["git", "-c", "core.quotePath=false", *args],
+            cwd=repo,
+            capture_output=True,
+            check=False,
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(
+                f"git {args[0]} 执行失败: {completed.stderr.decode('utf-8', 'replace').strip()}"
+            )
+        return completed.stdout
+
+    def resolve(self, project_path: str, ref: str) -> str:
+        """将 ref 解析为 commit sha"""
+        return self._git(project_path, "rev-parse", "--verify", f"{ref}^{{commit}}").decode().strip()
+
+    @staticmethod
+    def _strip_prefix(path: str) -> Optional[str]:
+        if path == "/dev/null":
+            return None
+        return path[2:] if path[:2] in ("a/", "b/") else path
+
+    @classmethod
+    def _parse_file_diff(cls, lines: List[str]) -> dict:
+        """将 git diff 中单个文件的片段转换为 GitLab compare 接口的 diff 条目"""
+        header = lines[0][len("diff --git "):]
+        # 无 ---/+++ 行（二进制、纯重命名、模式变更）时从首行取路径
+        old_path = new_path = cls._strip_prefix(header[: len(header) // 2])
+        data = {"new_file": False, "deleted_file": False, "renamed_file": False}
+        body_start = len(lines)
+        for index, line in enumerate(lines[1:], start=1):
+            if line.startswith("@@"):
+                body_start = index
+                break
+            if line.startswith("new file mode"):
+                data["new_file"] = True
+            elif line.startswith("deleted file mode"):
+                data["deleted_file"] = True
+            elif line.startswith("rename from "):
+                old_path = line[len("rename from "):]
+                data["renamed_file"] = True
+            elif line.startswith("rename to "):
+                new_path = line[len("rename to "):]
+            elif line.startswith("--- "):
+                old_path = cls._strip_prefix(line[4:]) or new_path
+            elif line.startswith("+++ "):
+                new_path = cls._strip_prefix(line[4:]) or old_path
+        body = lines[body_start:]
+        return {
+            "old_path": old_path,
+            "new_path": new_path,
+            **data,
+            "diff": "\n".join(body) + "\n" if body else "",
+        }
+
+    def get_compare(
+        self, project_path: str, source_branch: str, target_branch: str
+    ) -> dict:
+        """比较两个 ref（基于合并基准，与 GitLab compare 一致）"""
+        output = self._git(
+            project_path, "diff", "--find-renames", f"{target_branch}...{source_branch}"
+        ).decode("utf-8", "replace")
+        diffs = []
+        current: List[str] = []
+        for line in output.splitlines():
+            if line.startswith("diff --git ") and current:
+                diffs.append(self._parse_file_diff(current))
+                current = []
+            current.append(line)
+        if current:
+            diffs.append(self._parse_file_diff(current))
+        return {"diffs": diffs}
+
+    def get_file_content(
+        self, project_path: str, file_path: str, ref: str, max_bytes: Optional[int] = None
+    ) -> str:
+        """获取指定 ref 上文件的内容，超过 max_bytes 时截断并注明"""
+        with spooled_file() as path:
+            with open(path, "wb") as f:
+                completed = subprocess.run(
+                    ["git", "cat-file", "blob", f"{ref}:{file_path}"],
+                    cwd=project_path,
+                    stdout=f,
+                    stderr=subprocess.DEVNULL,
+                    check=False,
+                )
+            if completed.returncode != 0:
+                raise FileNotFoundError(f"{ref} 上不存在文件 {file_path}")
+            return read_text(path, max_bytes)
@@ -1,9 +1,88 @@
-from typing import Optional
+import logging
+from pathlib import Path
+from typing import List, Optional
 
 import gitlab
+import requests
 from gitlab.v4.objects import Project, ProjectMergeRequest
+from urllib3.exceptions import NewConnectionError
 
 from app.core.config import settings
+from app.models.diff import DiffPosition, ParsedDiff
+from app.core.outbound import (
+    RateLimitedError,
+    default_classifier,
+    get_governor,
+    parse_retry_after,
+)
+from app.service.spool import read_text, spooled_file
+
+logger = logging.getLogger(__name__)
+
+_TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+# 幂等方法可安全重放；POST/PATCH 可能已在服务端生效（创建 MR、评论等），重放会产生重复
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class _TransientResponseError(RateLimitedError):
+    """携带原始响应的可重试错误"""
+
+    def __init__(self, response: requests.Response):
+        super().__init__(
+            f"HTTP {response.status_code}",
+            parse_retry_after(response.headers.get("Retry-After")),
+        )
+        self.response = response
+
+
+def _request_method(exc: Exception) -> str:
+    response = getattr(exc, "response", None)
+    request = getattr(response, "request", None) or getattr(exc, "request", None)
+    return (getattr(request, "method", None) or "GET").upper()
+
+
+def _never_sent(exc: Exception) -> bool:
+    """连接未建立（超时或被拒绝），请求必然没有到达服务端"""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.ConnectionError) and exc.args:
+        return isinstance(getattr(exc.args[0], "reason", None), NewConnectionError)
+    return False
+
+
+def _classify_gitlab_error(exc: Exception) -> Optional[float]:
+    """GitLab 调用错误分类：非幂等请求仅在 429 或连接未建立时重试"""
+    if _request_method(exc) in _IDEMPOTENT_METHODS:
+        return default_classifier(exc)
+    if isinstance(exc, _TransientResponseError) and exc.response.status_code == 429:
+        return exc.retry_after or 0.0
+    if _never_sent(exc):
+        return 0.0
+    return None
+
+
+class _GovernedSession(requests.Session):
+    """所有 GitLab HTTP 请求经由出站治理器（限速、重试、熔断）"""
+
+    def request(self, method, url, *args, **kwargs):
+        try:
+            return get_governor("gitlab", _classify_gitlab_error).call(
+                self._request, method, url, *args, **kwargs
+            )
+        except _TransientResponseError as e:
+            # 重试已耗尽：直接抛出 HTTP 错误，避免 python-gitlab 再叠加一轮 429 重试
+            raise gitlab.exceptions.GitlabHttpError(
+                response_code=e.response.status_code,
+                error_message=e.response.text[:500],
+                response_body=e.response.content,
+            ) from e
+
+    def _request(self, method, url, *args, **kwargs):
+        response = super().request(method, url, *args, **kwargs)
+        if response.status_code in _TRANSIENT_STATUS:
+            raise _TransientResponseError(response)
+        return response
 
 
 class GitLabService:
@@ -13,35 +92,60 @@ class GitLabService:
         self.gl = gitlab.Gitlab(
             url=settings.gitlab_env.url,
             private_token=settings.gitlab_env.token,
+            session=_GovernedSession(),
         )
 
     def get_project(self, project_path: str) -> Project:
         """获取项目"""
         return self.gl.projects.get(project_path)
 
+    def _lazy_project(self, project_path: str) -> Project:
+        """不发起请求的项目引用，用于后续的子资源操作，省去一次往返"""
+        return self.gl.projects.get(project_path, lazy=True)
+
     def check_branch_exists(self, project_path: str, branch_name: str) -> bool:
         """检查分支是否存在"""
         try:
-            project = self.get_project(project_path)
+            project = self._lazy_project(project_path)
             project.branches.get(branch_name)
             return True
         except gitlab.exceptions.GitlabGetError:
             return False
 
+    def get_compare(
+        self, project_path: str, source_branch: str, target_branch: str
+    ) -> dict:
+        """获取两个分支之间的比较结果（含逐文件 diff）"""
+        project = self._lazy_project(project_path)
+        return project.repository_compare(target_branch, source_branch)
+
     def get_diff(
         self, project_path: str, source_branch: str, target_branch: str
     ) -> str:
         """获取两个分支之间的 diff"""
-        project = self.get_project(project_path)
-        compare = project.repository_compare(target_branch, source_branch)
+        compare = self.get_compare(project_path, source_branch, target_branch)
+        return ParsedDiff.from_compare(compare).render()
 
-        diff_content = []
-        for diff in compare.get("diffs", []):
-            diff_content.append(f"--- a/{diff['old_path']}")
-            diff_content.append(f"+++ b/{diff['new_path']}")
-            diff_content.append(diff.get("diff", ""))
+    def download_file(self, project_path: str, file_path: str, ref: str, dest: Path) -> int:
+        """将文件原始内容分块流式写入 dest，返回字节数，不在内存中保留完整内容"""
+        project = self._lazy_project(project_path)
+        with open(dest, "wb") as f:
+            project.files.raw(
+                file_path=file_path,
+                ref=ref,
+                streamed=True,
+                action=f.write,
+                chunk_size=settings.memory.chunk_bytes,
+            )
+        return dest.stat().st_size
 
-        return "\n".join(diff_content)
+    def get_file_content(
+        self, project_path: str, file_path: str, ref: str, max_bytes: Optional[int] = None
+    ) -> str:
+        """获取指定 ref 上文件的内容，超过 max_bytes 时截断并注明"""
+        with spooled_file() as path:
+            self.download_file(project_path, file_path, ref, path)
+            return read_text(path, max_bytes)
 
     def find_or_create_mr(
         self,
@@ -51,7 +155,7 @@ class GitLabService:
         title: Optional[str] = None,
     ) -> ProjectMergeRequest:
         """查找或创建 MR"""
-        project = self.get_project(project_path)
+        project = self._lazy_project(project_path)
 
         # 查找已存在的 MR
         mrs = project.mergerequests.list(
@@ -74,51 +178,96 @@ class GitLabService:
         self, project_path: str, mr_iid: int, description: str
     ) -> None:
         """更新 MR 描述"""
-        project = self.get_project(project_path)
+        project = self._lazy_project(project_path)
         mr = project.mergerequests.get(mr_iid)
         mr.description = description
         mr.save()
 
+    def get_mr_diff_refs(self, project_path: str, mr_iid: int) -> Optional[dict]:
+        """获取 MR 最新版本的 diff 基准（base/start/head sha），每次审查获取一次"""
+        project = self._lazy_project(project_path)
+        mr = project.mergerequests.get(mr_iid)
+        diff_refs = getattr(mr, "diff_refs", None)
+        if diff_refs and diff_refs.get("head_sha"):
+            return diff_refs
+        # 新建 MR 的 diff_refs 可能尚未计算完成，回退到版本列表
+        versions = mr.diffs.list()
+        if not versions:
+            return None
+        latest = versions[-1]
+        return {
+            "base_sha": latest.base_commit_sha,
+            "start_sha": latest.start_commit_sha,
+            "head_sha": latest.head_commit_sha,
+        }
+
     def add_mr_comment(
         self,
         project_path: str,
         mr_iid: int,
         file_path: str,
-        line: Optional[int],
+        position: Optional[DiffPosition],
         comment: str,
+        diff_refs: Optional[dict] = None,
     ) -> None:
-        """在 MR 上添加评论"""
-        project = self.get_project(project_path)
-        mr = project.mergerequests.get(mr_iid)
+        """在 MR 上添加评论：位置有效时为行级评论，否则为普通评论"""
+        project = self._lazy_project(project_path)
+        mr = project.mergerequests.get(mr_iid, lazy=True)
 
-        if line:
-            # 添加行级评论（需要获取 diff 信息）
+        if position and diff_refs:
+            gitlab_position = {
+                "base_sha": diff_refs["base_sha"],
+                "start_sha": diff_refs["start_sha"],
+                "head_sha": diff_refs["head_sha"],
+                "position_type": "text",
+                "old_path": position.old_path,
+                "new_path": position.new_path,
+            }
+            if position.old_line is not None:
+                gitlab_position["old_line"] = position.old_line
+            if position.new_line is not None:
+                gitlab_position["new_line"] = position.new_line
             try:
-                diffs = mr.diffs.list()
-                if diffs:
-                    latest_diff = diffs[-1]
-                    mr.discussions.create({
-                        "body": comment,
-                        "position": {
-                            "base_sha": latest_diff.base_commit_sha,
-                            "start_sha": latest_diff.start_commit_sha,
-                            "head_sha": latest_diff.head_commit_sha,
-                            "position_type": "text",
-                            "new_path": file_path,
-                            "new_line": line,
-                        },
-                    })
-                    return
-            except Exception:
-                pass
+                mr.discussions.create({"body": comment, "position": gitlab_position})
+                return
+            except gitlab.exceptions.GitlabError as e:
+                logger.warning(
+                    "行级评论发布失败，降级为普通评论: %s:%s (%s)",
+                    file_path,
+                    position.new_line,
+                    e,
+                )
 
         # 添加普通评论
         mr.notes.create({"body": f"**{file_path}**\n\n{comment}"})
 
+    def current_user_id(self) -> int:
+        """当前令牌对应的用户 ID，即本服务发布评论所用的账号"""
+        if self.gl.user is None:
+            self.gl.auth()
+        return self.gl.user.id
+
+    def list_mr_discussions(self, project_path: str, mr_iid: int) -> List[dict]:
+        """获取 MR 上的全部讨论"""
+        project = self._lazy_project(project_path)
+        mr = project.mergerequests.get(mr_iid, lazy=True)
+        return [
+            discussion.attributes
+            for discussion in mr.discussions.list(get_all=True)
+        ]
+
+    def resolve_mr_discussion(
+        self, project_path: str, mr_iid: int, discussion_id: str
+    ) -> None:
+        """将 MR 讨论标记为已解决"""
+        project = self._lazy_project(project_path)
+        mr = project.mergerequests.get(mr_iid, lazy=True)
+        mr.discussions.update(discussion_id, {"resolved": True})
+
     def add_mr_general_comment(
         self, project_path: str, mr_iid: int, comment: str
     ) -> None:
         """在 MR 上添加普通评论"""
-        project = self.get_project(project_path)
-        mr = project.mergerequests.get(mr_iid)
+        project = self._lazy_project(project_path)
+        mr = project.mergerequests.get(mr_iid, lazy=True)
         mr.notes.create({"body": comment})
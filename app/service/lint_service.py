@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from app.core.config import LintAnalyzerConfig, settings
+from app.models.diff import ParsedDiff
+from app.service.git_service import LocalRepoService
+
+logger = logging.getLogger(__name__)
+
+_LINE_OUTPUT_RE = re.compile(
+    r"^(?P<file>[^:\s][^:]*):(?P<line>\d+)(?::\d+)?:?\s*(?P<message>.+)$"
+)
+
+
+@dataclass
+class LintFinding:
+    tool: str
+    file: str
+    line: int
+    code: str
+    message: str
+
+
+def _parse_ruff(output: str) -> List[dict]:
+    return [
+        {
+            "file": item["filename"],
+            "line": item["location"]["row"],
+            "code": item.get("code") or "",
+            "message": item["message"],
+        }
+        for item in json.loads(output or "[]")
+    ]
+
+
+def _parse_bandit(output: str) -> List[dict]:
+    return [
+        {
+            "file": item["filename"],
+            "line": item["line_number"],
+            "code": item.get("test_id", ""),
+            "message": f"[{item.get('issue_severity', '').lower()}] {item['issue_text']}",
+        }
+        for item in json.loads(output or "{}").get("results", [])
+    ]
+
+
+def _parse_lines(output: str) -> List[dict]:
+    findings = []
+    for raw in output.splitlines():
+        match = _LINE_OUTPUT_RE.match(raw.strip())
+        if match:
+            findings.append({
+                "file": match.group("file"),
+                "line": int(match.group("line")),
+                "code": "",
+                "message": match.group("message"),
+            })
+    return findings
+
+
+_PARSERS = {
+    "ruff": _parse_ruff,
+    "bandit": _parse_bandit,
+    "line": _parse_lines,
+}
+
+
+class LintService:
+    """静态分析预检服务：在本地检出上运行分析器，仅保留变更行上的问题"""
+
+    def __init__(self, repo_service: Optional[LocalRepoService] = None):
+        self.config = settings.lint
+        self.repo_service = repo_service or LocalRepoService()
+
+    async def run(
+        self, project: str, source_branch: str, diff: ParsedDiff
+    ) -> List[LintFinding]:
+        """对变更文件运行所有已配置的分析器"""
+        changed: Dict[str, Set[int]] = {}
+        for file_diff in diff.files:
+            if file_diff.deleted_file:
+                continue
+            added = file_diff.added_lines()
+            if added:
+                changed[file_diff.new_path] = added
+        if not changed:
+            return []
+
+        checkout = await asyncio.to_thread(
+            self.repo_service.checkout, project, source_branch
+        )
+        try:
+            worktree = checkout.resolve()
+            results = await asyncio.gather(
+                *(
+                    self._run_analyzer(analyzer, worktree, changed)
+                    for analyzer in self.config.analyzers
+                ),
+                return_exceptions=True,
+            )
+        finally:
+            self.repo_service.release(checkout)
+
+        findings: List[LintFinding] = []
+        for analyzer, result in zip(self.config.analyzers, results):
+            if isinstance(result, Exception):
+                logger.warning("分析器 %s 执行失败: %s", analyzer.name, result)
+                continue
+            findings.extend(result)
+
+        findings.sort(key=lambda f: (f.file, f.line, f.tool))
+        return findings[: self.config.max_findings]
+
+    async def _run_analyzer(
+        self,
+        analyzer: LintAnalyzerConfig,
+        worktree: Path,
+        changed: Dict[str, Set[int]],
+    ) -> List[LintFinding]:
+        files = [
+            path
+            for path in changed
+            if not analyzer.extensions
+            or any(path.endswith(ext) for ext in analyzer.extensions)
+        ]
+        files = [path for path in files if (worktree / path).is_file()]
+        if not files:
+            return []
+
+        process = await asyncio.create_subprocess_exec(
+            *analyzer.command,
+            *files,
+            cwd=worktree,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(
+                process.communicate(), timeout=self.config.timeout
+            )
+        except asyncio.TimeoutError:
+            process.kill()
+            # 回收子进程，避免留下僵尸进程
+            await process.wait()
+            raise RuntimeError(f"执行超时（{self.config.timeout}s）")
+
+        parser = _PARSERS.get(analyzer.format)
+        if parser is None:
+            raise ValueError(f"不支持的输出格式: {analyzer.format}")
+
+        findings = []
+        for item in parser(stdout.decode("utf-8", errors="replace")):
+            path = Path(item["file"])
+            if path.is_absolute():
+                try:
+                    path = path.relative_to(worktree)
+                except ValueError:
+                    continue
+            file_path = path.as_posix().removeprefix("./")
+            if item["line"] in changed.get(file_path, ()):
+                findings.append(LintFinding(
+                    tool=analyzer.name,
+                    file=file_path,
+                    line=item["line"],
+                    code=item["code"],
+                    message=item["message"],
+                ))
+        logger.info("分析器 %s 在变更行上发现 %d 个问题", analyzer.name, len(findings))
+        return findings
+
+    @staticmethod
+    def format_findings(findings: List[LintFinding]) -> str:
+        """格式化为紧凑的 prompt 片段"""
+        lines = []
+        for f in findings:
+            code = f" {f.code}" if f.code else ""
+            lines.append(f"- `{f.file}:{f.line}` [{f.tool}{code}] {f.message}")
+        return "\n".join(lines)
@@ -0,0 +1,123 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import gitlab
+
+from app.core.config import settings
+from app.service.gitlab_service import GitLabService
+from app.service.review_cache import ReviewCache
+from app.service.spool import spooled_file
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchService:
+    """审查预取服务：任务受理后并发拉取比较结果与变更文件内容，写入审查缓存"""
+
+    def __init__(self):
+        self.config = settings.prefetch
+        self._local = threading.local()
+
+    def _gitlab(self) -> GitLabService:
+        # requests.Session 非线程安全，每个线程使用独立的客户端
+        if not hasattr(self._local, "service"):
+            self._local.service = GitLabService()
+        return self._local.service
+
+    def prefetch(
+        self,
+        cache: ReviewCache,
+        project: str,
+        source_branch: str,
+        target_branch: str,
+    ) -> None:
+        """执行预取；调用方需已调用 cache.begin_prefetch()，审查结束（缓存被清理）后尽快停止"""
+        try:
+            compare = self._gitlab().get_compare(project, source_branch, target_branch)
+            if cache.cancelled:
+                return
+            cache.put_compare(compare)
+
+            targets: List[Tuple[str, str]] = []
+            for diff in compare.get("diffs", [])[: self.config.max_files]:
+                if not diff.get("deleted_file"):
+                    targets.append((source_branch, diff["new_path"]))
+                if not diff.get("new_file"):
+                    targets.append((target_branch, diff["old_path"]))
+
+            budget = {"remaining": self.config.max_total_bytes}
+            budget_lock = threading.Lock()
+
+            def fetch(target: Tuple[str, str]) -> None:
+                ref, file_path = target
+                if cache.cancelled:
+                    return
+                with budget_lock:
+                    if budget["remaining"] <= 0:
+                        return
+                # 流式下载到临时文件，超大文件不进入内存，也不写入缓存
+                with spooled_file() as path:
+                    try:
+                        size = self._gitlab().download_file(project, file_path, ref, path)
+                    except gitlab.exceptions.GitlabGetError as e:
+                        cache.put_missing(ref, file_path, str(e))
+                        return
+                    if size > self.config.max_file_bytes:
+                        return
+                    with budget_lock:
+                        if size > budget["remaining"]:
+                            return
+                        budget["remaining"] -= size
+                    cache.adopt_file(ref, file_path, path)
+
+            with ThreadPoolExecutor(max_workers=self.config.concurrency) as pool:
+                list(pool.map(fetch, targets))
+
+            logger.info(
+                "预取完成: %s %s -> %s, 文件 %d 个, %d 字节",
+                project,
+                source_branch,
+                target_branch,
+                len(targets),
+                self.config.max_total_bytes - budget["remaining"],
+            )
+        except Exception:
+            logger.exception("预取失败，Agent 将直接请求 GitLab")
+        finally:
+            cancelled = cache.cancelled
+            cache.end_prefetch()
+
+        if settings.index.enabled and not cancelled:
+            self._warm_index(project, source_branch)
+
+    @staticmethod
+    def _warm_index(project: str, source_branch: str) -> None:
+        """排队期间预先构建源分支的代码索引，Agent 首次查询无需等待"""
+        from app.service.search_index import get_search_index_service
+        from app.service.symbol_index import get_symbol_index_service
+
+        try:
+            get_symbol_index_service().get(project, source_branch)
+            get_search_index_service().get(project, source_branch)
+        except Exception:
+            logger.exception("预建代码索引失败，将在 Agent 查询时重试")
+
+
+def start_prefetch(
+    key: str, project: str, source_branch: str, target_branch: str
+) -> None:
+    """在后台线程中启动预取"""
+    if not settings.prefetch.enabled:
+        return
+    cache = ReviewCache(key)
+    # 先登记再启动线程：任务可能在线程开始运行前就被领取，此时读取缓存需等待预取
+    cache.begin_prefetch()
+    thread = threading.Thread(
+        target=PrefetchService().prefetch,
+        args=(cache, project, source_branch, target_branch),
+        name=f"prefetch-{key[:8]}",
+        daemon=True,
+    )
+    thread.start()
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import shutil
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+from app.service.spool import read_text
+
+
+class ReviewCache:
+    """单次审查的磁盘缓存：比较结果与文件内容，同机多进程共享"""
+
+    def __init__(self, key: str):
+        self.root = Path(settings.gitlab.temp_dir) / "cache" / key
+        # 预取状态放在缓存目录之外，清理缓存目录不影响预取与清理之间的协调
+        self._marker = self.root.with_name(f"{key}.prefetching")
+        self._cancelled = self.root.with_name(f"{key}.cancelled")
+
+    def _file_path(self, ref: str, file_path: str) -> Path:
+        digest = hashlib.sha1(f"{ref}\0{file_path}".encode("utf-8")).hexdigest()
+        return self.root / "files" / digest
+
+    @staticmethod
+    def _write(path: Path, data: str) -> None:
+        """先写临时文件再原子替换，避免读到半写入的内容"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.tmp")
+        tmp.write_text(data, encoding="utf-8")
+        tmp.replace(path)
+
+    def _wait(self, timeout: float, *paths: Path) -> None:
+        """预取进行中时等待任一条目写入，预取结束或超时即返回"""
+        deadline = time.monotonic() + timeout
+        while not any(path.exists() for path in paths):
+            if not self._marker.exists() or time.monotonic() >= deadline:
+                return
+            time.sleep(0.1)
+
+    def begin_prefetch(self) -> None:
+        """标记预取进行中；需在启动预取线程之前调用，使随后的读取等待预取结果"""
+        self._marker.parent.mkdir(parents=True, exist_ok=True)
+        self._marker.touch()
+
+    def end_prefetch(self) -> None:
+        self._marker.unlink(missing_ok=True)
+        if self._cancelled.exists():
+            # 审查已结束、缓存已清理，删除预取在清理之后写入的内容
+            shutil.rmtree(self.root, ignore_errors=True)
+            self._cancelled.unlink(missing_ok=True)
+
+    @property
+    def cancelled(self) -> bool:
+        """审查已结束，预取应尽快停止"""
+        return self._cancelled.exists()
+
+    def put_compare(self, compare: dict) -> None:
+        # 直接序列化到文件，不额外生成整个比较结果的字符串副本
+        path = self.root / "compare.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(compare, f, ensure_ascii=False)
+        tmp.replace(path)
+
+    def get_compare(self, wait: float = 0) -> Optional[dict]:
+        path = self.root / "compare.json"
+        self._wait(wait, path)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def put_file(self, ref: str, file_path: str, content: str) -> None:
+        self._write(self._file_path(ref, file_path), content)
+
+    def adopt_file(self, ref: str, file_path: str, source: Path) -> None:
+        """将已下载到临时文件的内容移入缓存（同一文件系统内原子替换）"""
+        path = self._file_path(ref, file_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        source.replace(path)
+
+    def put_missing(self, ref: str, file_path: str, error: str) -> None:
+        """记录文件在该 ref 上不存在，避免再次请求 GitLab"""
+        self._write(self._missing_path(ref, file_path), error)
+
+    def _missing_path(self, ref: str, file_path: str) -> Path:
+        path = self._file_path(ref, file_path)
+        return path.with_name(f"{path.name}.missing")
+
+    def get_file(
+        self, ref: str, file_path: str, wait: float = 0, max_bytes: Optional[int] = None
+    ) -> Optional[str]:
+        """读取缓存的文件内容，超过 max_bytes 时截断并注明"""
+        path = self._file_path(ref, file_path)
+        self._wait(wait, path, self._missing_path(ref, file_path))
+        if not path.exists():
+            return None
+        return read_text(path, max_bytes)
+
+    def get_missing(self, ref: str, file_path: str) -> Optional[str]:
+        missing = self._missing_path(ref, file_path)
+        return missing.read_text(encoding="utf-8") if missing.exists() else None
+
+    def clear(self) -> None:
+        """删除缓存；预取仍在进行（可能在其他进程中）时通知其停止，由其结束时再次清理"""
+        if not self._marker.exists():
+            shutil.rmtree(self.root, ignore_errors=True)
+            return
+        self._cancelled.touch()
+        shutil.rmtree(self.root, ignore_errors=True)
+        if not self._marker.exists():
+            # 预取恰好在此期间结束，未看到取消标记
+            shutil.rmtree(self.root, ignore_errors=True)
+            self._cancelled.unlink(missing_ok=True)
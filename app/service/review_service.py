@@ -1,6 +1,27 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
 from app.agent.code_review_agent import CodeReviewAgent
+from app.core.config import settings
+from app.models.diff import ParsedDiff
 from app.models.review import AgentReviewResult, Severity
+from app.service.comment_dedup import (
+    ExistingComment,
+    find_duplicate,
+    fingerprint_issue,
+    fingerprint_marker,
+    parse_existing_comments,
+)
 from app.service.gitlab_service import GitLabService
+from app.service.lint_service import LintService
+from app.service.review_cache import ReviewCache
+
+logger = logging.getLogger(__name__)
+
+CheckpointCallback = Callable[[str, Any], Awaitable[None]]
+# 进度回调 (阶段, 说明)，须为非阻塞调用
+ProgressCallback = Callable[[str, str], None]
 
 
 class ReviewService:
@@ -9,51 +30,224 @@ class ReviewService:
     def __init__(self):
         self.gitlab_service = GitLabService()
         self.agent = CodeReviewAgent(gitlab_service=self.gitlab_service)
+        self.lint_service = LintService()
 
     async def execute_review(
         self,
         project: str,
         source_branch: str,
         target_branch: str,
+        cache: Optional[ReviewCache] = None,
+        checkpoints: Optional[Dict[str, Any]] = None,
+        on_checkpoint: Optional[CheckpointCallback] = None,
+        progress: Optional[ProgressCallback] = None,
     ) -> dict:
-        """执行完整的代码审查流程"""
-        # 1. Agent 自主获取 diff 并完成审查
-        review_result = await self.agent.review(
-            project=project,
-            source_branch=source_branch,
-            target_branch=target_branch,
-        )
-
-        # 2. 创建或获取 MR
-        mr = self.gitlab_service.find_or_create_mr(
-            project, source_branch, target_branch
-        )
-
-        # 3. 更新 MR 描述（直接使用 Agent 生成的描述）
-        self.gitlab_service.update_mr_description(
-            project, mr.iid, review_result.mrDescription
-        )
-
-        # 4. 添加问题评论
-        self._add_issue_comments(project, mr.iid, review_result)
+        """执行完整的代码审查流程
+
+        checkpoints 为此前已完成阶段的记录，对应阶段直接跳过；每完成一个阶段
+        调用 on_checkpoint 持久化，进程中断后可从最后完成的阶段继续。
+        """
+        checkpoints = dict(checkpoints or {})
+
+        def report(phase: str, detail: str = "") -> None:
+            if progress is not None:
+                progress(phase, detail)
+
+        async def save(phase: str, data: Any) -> None:
+            checkpoints[phase] = data
+            if on_checkpoint is not None:
+                await on_checkpoint(phase, data)
+
+        # 1. 加载结构化 diff（优先读取预取缓存），供 Agent、静态分析与评论定位共用
+        report("diff")
+        diff = await self._load_diff(project, source_branch, target_branch, cache)
+
+        if "agent_result" in checkpoints:
+            review_result = AgentReviewResult.model_validate(checkpoints["agent_result"])
+        else:
+            # 2. 静态分析预检（可选）
+            if settings.lint.enabled:
+                report("lint")
+            lint_report = await self._run_lint(project, source_branch, diff)
+
+            # 3. Agent 自主分析 diff 并完成审查
+            report("agent", f"{len(diff.files)} 个文件变更")
+            review_result = await self.agent.review(
+                project=project,
+                source_branch=source_branch,
+                target_branch=target_branch,
+                lint_report=lint_report,
+                cache=cache,
+                diff=diff,
+                progress=progress,
+            )
+            await save("agent_result", review_result.model_dump(mode="json"))
+
+        # 4. 创建或获取 MR
+        report("mr")
+        if "mr" in checkpoints:
+            mr_iid, mr_url = checkpoints["mr"]["iid"], checkpoints["mr"]["web_url"]
+        else:
+            # GitLab 调用为同步请求（含退避重试），放到线程中执行，避免阻塞事件循环与心跳
+            mr = await asyncio.to_thread(
+                self.gitlab_service.find_or_create_mr,
+                project,
+                source_branch,
+                target_branch,
+            )
+            mr_iid, mr_url = mr.iid, mr.web_url
+            await save("mr", {"iid": mr_iid, "web_url": mr_url})
+
+        # 5. 更新 MR 描述（直接使用 Agent 生成的描述）
+        if "description" not in checkpoints:
+            await asyncio.to_thread(
+                self.gitlab_service.update_mr_description,
+                project,
+                mr_iid,
+                review_result.mrDescription,
+            )
+            await save("description", True)
+
+        # 6. 添加问题评论（中断后重跑时，已发布的评论会被指纹去重跳过）
+        if "comments" not in checkpoints:
+            report("comments", f"{len(review_result.issues)} 个问题")
+            await asyncio.to_thread(
+                self._add_issue_comments, project, mr_iid, review_result, diff
+            )
+            await save("comments", True)
 
         return {
             "success": True,
             "message": "代码审查完成",
             "review_result": review_result.model_dump(),
-            "mr_url": mr.web_url,
+            "mr_url": mr_url,
         }
 
+    async def _run_lint(
+        self, project: str, source_branch: str, diff: ParsedDiff
+    ) -> Optional[str]:
+        """运行静态分析预检，失败时跳过不影响审查"""
+        if not settings.lint.enabled:
+            return None
+        try:
+            findings = await self.lint_service.run(project, source_branch, diff)
+        except Exception:
+            logger.exception("静态分析预检失败，跳过")
+            return None
+        if not findings:
+            return None
+        return LintService.format_findings(findings)
+
+    async def _load_diff(
+        self,
+        project: str,
+        source_branch: str,
+        target_branch: str,
+        cache: Optional[ReviewCache],
+    ) -> ParsedDiff:
+        """加载并解析分支比较结果，优先读取预取缓存"""
+        compare = None
+        if cache:
+            compare = await asyncio.to_thread(
+                cache.get_compare, settings.prefetch.wait_seconds
+            )
+        if compare is None:
+            compare = await asyncio.to_thread(
+                self.gitlab_service.get_compare, project, source_branch, target_branch
+            )
+            if cache:
+                cache.put_compare(compare)
+        # 超过上限的文件 diff 只保留前面部分的内容，行号映射覆盖完整 diff，评论定位不受截断影响
+        return ParsedDiff.from_compare(compare, settings.memory.max_file_diff_bytes)
+
     def _add_issue_comments(
-        self, project: str, mr_iid: int, result: AgentReviewResult
+        self,
+        project: str,
+        mr_iid: int,
+        result: AgentReviewResult,
+        diff: ParsedDiff,
     ) -> None:
-        """为有问题的代码添加评论"""
+        """为有问题的代码添加评论，跳过 MR 上已存在的相同问题"""
+        try:
+            bot_user_id = self.gitlab_service.current_user_id()
+        except Exception:
+            logger.exception("获取当前 GitLab 用户失败，不识别历史格式评论且不自动解决评论")
+            bot_user_id = None
+
+        try:
+            existing = parse_existing_comments(
+                self.gitlab_service.list_mr_discussions(project, mr_iid), bot_user_id
+            )
+        except Exception:
+            logger.exception("获取 MR 已有讨论失败，跳过评论去重")
+            existing = []
+
+        try:
+            diff_refs = self.gitlab_service.get_mr_diff_refs(project, mr_iid)
+        except Exception:
+            logger.exception("获取 MR diff 基准失败，问题评论将作为普通评论发布")
+            diff_refs = None
+
+        matched = set()
+        posted = skipped = 0
         for issue in result.issues:
-            if issue.severity in (Severity.HIGH, Severity.CRITICAL, Severity.MEDIUM):
-                comment = self._format_issue_comment(issue)
-                self.gitlab_service.add_mr_comment(
-                    project, mr_iid, issue.file, issue.line, comment
+            if issue.severity not in (Severity.HIGH, Severity.CRITICAL, Severity.MEDIUM):
+                continue
+            duplicate = find_duplicate(
+                issue, existing, settings.review.dedup_line_window
+            )
+            if duplicate:
+                matched.add(duplicate.discussion_id)
+                skipped += 1
+                continue
+            comment = (
+                f"{self._format_issue_comment(issue)}\n\n{fingerprint_marker(issue)}"
+            )
+            # 发布前将行号校验/吸附到 diff 中的可评论位置，无法定位时直接发布普通评论
+            position = diff.position(
+                issue.file, issue.line, settings.review.snap_line_distance
+            )
+            self.gitlab_service.add_mr_comment(
+                project, mr_iid, issue.file, position, comment, diff_refs
+            )
+            # 同一次审查结果中的重复问题也只发布一次
+            existing.append(ExistingComment(
+                discussion_id="",
+                fingerprint=fingerprint_issue(issue),
+                line=issue.line,
+                resolved=False,
+                resolvable=False,
+                own=True,
+            ))
+            posted += 1
+
+        logger.info("问题评论: 新增 %d 条，跳过重复 %d 条", posted, skipped)
+
+        if settings.review.resolve_stale_comments:
+            self._resolve_stale_comments(project, mr_iid, existing, matched)
+
+    def _resolve_stale_comments(
+        self,
+        project: str,
+        mr_iid: int,
+        existing: List[ExistingComment],
+        matched: Set[str],
+    ) -> None:
+        """解决本次审查中已不再出现的历史问题评论（仅限本服务账号发布的）"""
+        for comment in existing:
+            if (
+                comment.discussion_id in matched
+                or comment.resolved
+                or not comment.resolvable
+                or not comment.own
+            ):
+                continue
+            try:
+                self.gitlab_service.resolve_mr_discussion(
+                    project, mr_iid, comment.discussion_id
                 )
+            except Exception:
+                logger.warning("解决历史评论失败: %s", comment.discussion_id)
 
     @staticmethod
     def _format_issue_comment(issue) -> str:
@@ -0,0 +1,134 @@
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from app.service.code_index import CodeIndex, CodeIndexService
+
+_TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[0-9]+|[一-鿿]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+# BM25 参数
+_K1 = 1.2
+_B = 0.75
+
+# 每个文件最多展示的命中行数及其上下文行数
+_SNIPPET_MATCHES = 3
+_SNIPPET_CONTEXT = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """切分为小写词项：完整标识符外，再按下划线与驼峰拆分出子词"""
+    tokens = []
+    for word in _TOKEN_RE.findall(text):
+        lowered = word.lower()
+        tokens.append(lowered)
+        parts = [part.lower() for chunk in word.split("_") for part in _CAMEL_RE.findall(chunk)]
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if len(part) > 1)
+    return tokens
+
+
+@dataclass
+class SearchHit:
+    path: str
+    score: float
+    snippets: List[Tuple[int, str]] = field(default_factory=list)
+
+    def format(self) -> str:
+        lines = [f"## {self.path} (score {self.score:.2f})"]
+        previous = None
+        for line_no, text in self.snippets:
+            if previous is not None and line_no > previous + 1:
+                lines.append("   ...")
+            lines.append(f"{line_no:>5}: {text}")
+            previous = line_no
+        return "\n".join(lines)
+
+
+class SearchIndex(CodeIndex):
+    """单个 commit 的词法倒排索引，按 BM25 对文件排序"""
+
+    def __init__(self, sha: str, files: Dict[str, dict]):
+        super().__init__(sha, files)
+        self._postings: Dict[str, List[Tuple[str, int]]] = {}
+        total = 0
+        for path, entry in files.items():
+            total += entry["len"]
+            for term, count in entry["tf"].items():
+                self._postings.setdefault(term, []).append((path, count))
+        self._avg_length = total / len(files) if files else 0.0
+
+    def _rank(self, terms: List[str]) -> List[Tuple[str, float]]:
+        scores: Dict[str, float] = {}
+        documents = len(self.files)
+        for term in set(terms):
+            postings = self._postings.get(term, [])
+            if not postings:
+                continue
+            idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+            for path, count in postings:
+                length = self.files[path]["len"]
+                norm = count + _K1 * (1 - _B + _B * length / (self._avg_length or 1))
+                scores[path] = scores.get(path, 0.0) + idf * count * (_K1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def _snippets(self, path: str, query: str, terms: List[str]) -> List[Tuple[int, str]]:
+        if self.worktree is None:
+            return []
+        try:
+            lines = (self.worktree / path).read_text(encoding="utf-8").splitlines()
+        except (OSError, UnicodeDecodeError):
+            return []
+
+        phrase = query.strip().lower()
+        wanted = set(terms)
+        scored = []
+        for index, line in enumerate(lines):
+            lowered = line.lower()
+            matched = wanted.intersection(tokenize(line))
+            if not matched:
+                continue
+            score = len(matched) + (len(wanted) if phrase and phrase in lowered else 0)
+            scored.append((score, index))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+        selected = set()
+        for _, index in scored[:_SNIPPET_MATCHES]:
+            start = max(index - _SNIPPET_CONTEXT, 0)
+            selected.update(range(start, min(index + _SNIPPET_CONTEXT + 1, len(lines))))
+        return [(index + 1, lines[index]) for index in sorted(selected)]
+
+    def search(self, query: str, limit: int) -> List[SearchHit]:
+        terms = tokenize(query)
+        return [
+            SearchHit(path, score, self._snippets(path, query, terms))
+            for path, score in self._rank(terms)[:limit]
+        ]
+
+
+class SearchIndexService(CodeIndexService[SearchIndex]):
+    """词法搜索索引服务"""
+
+    name = "search"
+    index_class = SearchIndex
+
+    def parse(self, path: str, text: str) -> dict:
+        # 路径本身也作为词项，便于按文件名搜索
+        tokens = tokenize(text) + tokenize(path)
+        return {"len": len(tokens), "tf": dict(Counter(tokens))}
+
+
+_service: Optional[SearchIndexService] = None
+_service_lock = threading.Lock()
+
+
+def get_search_index_service() -> SearchIndexService:
+    """获取进程内共享的词法搜索索引服务"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = SearchIndexService()
+        return _service
@@ -0,0 +1,50 @@
+import os
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from app.core.config import settings
+
+
+def truncation_notice(total: int, kept: int) -> str:
+    return f"\n... [文件已截断：共 {total} 字节，仅返回前 {kept} 字节]"
+
+
+@contextmanager
+def spooled_file() -> Iterator[Path]:
+    """gitlab.temp_dir 下的临时文件，用于流式落盘大文件，退出时删除"""
+    root = Path(settings.gitlab.temp_dir) / "spool"
+    root.mkdir(parents=True, exist_ok=True)
+    path = root / uuid.uuid4().hex
+    try:
+        yield path
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def _decode_head(data: bytes, truncated: bool) -> str:
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # 截断处可能切断多字节字符，只丢弃末尾不完整的部分；其余位置的错误说明不是文本文件
+        if truncated and e.start >= len(data) - 3:
+            return data[: e.start].decode("utf-8")
+        raise
+
+
+def read_head(path: Path, max_bytes: Optional[int] = None) -> Tuple[str, int]:
+    """读取文件开头至多 max_bytes 字节的文本（0 或 None 表示全部），返回文本与文件总字节数"""
+    total = os.path.getsize(path)
+    limit = total if not max_bytes else min(total, max_bytes)
+    with open(path, "rb") as f:
+        data = f.read(limit)
+    return _decode_head(data, limit < total), total
+
+
+def read_text(path: Path, max_bytes: Optional[int] = None) -> str:
+    """读取文件文本，超出 max_bytes 时截断并附加截断说明"""
+    text, total = read_head(path, max_bytes)
+    if max_bytes and total > max_bytes:
+        text += truncation_notice(total, max_bytes)
+    return text
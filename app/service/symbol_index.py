@@ -0,0 +1,160 @@
+import ast
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.service.code_index import CodeIndex, CodeIndexService
+
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_$][\w$]{2,}")
+
+# 非 Python 语言的定义识别规则（按行匹配，name 为符号名，kind 为定义类型）
+_DEFINITION_PATTERNS = [
+    re.compile(
+        r"^\s*(?:export\s+)?(?:default\s+)?(?:public\s+|private\s+|protected\s+|internal\s+)?"
+        r"(?:abstract\s+|final\s+|static\s+|sealed\s+|data\s+)*"
+        r"(?P<kind>class|interface|enum|struct|trait|object|record)\s+(?P<name>[A-Za-z_$][\w$]*)"
+    ),
+    re.compile(
+        r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?(?P<kind>function)\*?\s+"
+        r"(?P<name>[A-Za-z_$][\w$]*)"
+    ),
+    re.compile(r"^\s*(?P<kind>func)\s+(?:\([^)]*\)\s*)?(?P<name>[A-Za-z_]\w*)"),
+    re.compile(
+        r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:unsafe\s+)?(?P<kind>fn)\s+"
+        r"(?P<name>[A-Za-z_]\w*)"
+    ),
+    re.compile(r"^\s*(?:private\s+|public\s+|protected\s+)?(?P<kind>def|fun)\s+(?P<name>[A-Za-z_]\w*[?!]?)"),
+    re.compile(r"^\s*(?:export\s+)?(?P<kind>type)\s+(?P<name>[A-Za-z_$][\w$]*)"),
+    re.compile(
+        r"^\s*(?:export\s+)?(?P<kind>const|let|var)\s+(?P<name>[A-Za-z_$][\w$]*)\s*=\s*"
+        r"(?:async\s*)?(?:function|\([^)]*\)\s*=>|[A-Za-z_$][\w$]*\s*=>)"
+    ),
+    re.compile(
+        r"^\s*(?:(?:public|private|protected|static|final|abstract|synchronized|virtual|override)\s+)+"
+        r"[\w<>\[\],.?\s]+?\s+(?P<name>[A-Za-z_]\w*)\s*\((?P<kind>)"
+    ),
+]
+
+
+@dataclass
+class SymbolLocation:
+    path: str
+    line: int
+    kind: str = ""
+
+    def format(self) -> str:
+        return f"{self.path}:{self.line}" + (f" [{self.kind}]" if self.kind else "")
+
+
+def _parse_python(text: str) -> Tuple[List[list], Dict[str, List[int]]]:
+    tree = ast.parse(text)
+    definitions: List[list] = []
+    references: Dict[str, List[int]] = {}
+
+    def add_reference(name: str, line: int) -> None:
+        lines = references.setdefault(name, [])
+        if not lines or lines[-1] != line:
+            lines.append(line)
+
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            definitions.append([node.name, "def", node.lineno])
+        elif isinstance(node, ast.ClassDef):
+            definitions.append([node.name, "class", node.lineno])
+        elif isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Store) and node.col_offset == 0:
+                definitions.append([node.id, "var", node.lineno])
+            else:
+                add_reference(node.id, node.lineno)
+        elif isinstance(node, ast.Attribute):
+            add_reference(node.attr, node.lineno)
+        elif isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                add_reference(alias.name, node.lineno)
+    for lines in references.values():
+        lines.sort()
+    return definitions, references
+
+
+def _parse_generic(text: str) -> Tuple[List[list], Dict[str, List[int]]]:
+    definitions: List[list] = []
+    references: Dict[str, List[int]] = {}
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        defined = None
+        for pattern in _DEFINITION_PATTERNS:
+            match = pattern.match(line)
+            if match:
+                defined = match.group("name")
+                definitions.append([defined, match.group("kind") or "method", line_no])
+                break
+        for name in set(_IDENTIFIER_RE.findall(line)):
+            if name != defined:
+                references.setdefault(name, []).append(line_no)
+    return definitions, references
+
+
+def parse_source(path: str, text: str) -> dict:
+    """解析单个文件，返回 {"defs": [[name, kind, line]], "refs": {name: [line]}}"""
+    definitions, references = None, None
+    if path.endswith(".py"):
+        try:
+            definitions, references = _parse_python(text)
+        except (SyntaxError, ValueError):
+            pass
+    if definitions is None:
+        definitions, references = _parse_generic(text)
+    return {"defs": definitions, "refs": references}
+
+
+class SymbolIndex(CodeIndex):
+    """单个 commit 的符号索引：记录每个文件中的定义与引用位置"""
+
+    def __init__(self, sha: str, files: Dict[str, dict]):
+        super().__init__(sha, files)
+        self._definitions: Dict[str, List[SymbolLocation]] = {}
+        self._references: Dict[str, List[SymbolLocation]] = {}
+        for path in sorted(files):
+            entry = files[path]
+            for name, kind, line in entry["defs"]:
+                self._definitions.setdefault(name, []).append(
+                    SymbolLocation(path, line, kind)
+                )
+            for name, lines in entry["refs"].items():
+                self._references.setdefault(name, []).extend(
+                    SymbolLocation(path, line) for line in lines
+                )
+
+    @staticmethod
+    def _lookup(table: Dict[str, List[SymbolLocation]], symbol: str) -> List[SymbolLocation]:
+        # 支持 "Class.method" 形式，按最后一段匹配
+        return table.get(symbol.rsplit(".", 1)[-1], [])
+
+    def find_definition(self, symbol: str) -> List[SymbolLocation]:
+        return self._lookup(self._definitions, symbol)
+
+    def find_references(self, symbol: str) -> List[SymbolLocation]:
+        return self._lookup(self._references, symbol)
+
+
+class SymbolIndexService(CodeIndexService[SymbolIndex]):
+    """符号索引服务"""
+
+    name = "symbols"
+    index_class = SymbolIndex
+
+    def parse(self, path: str, text: str) -> dict:
+        return parse_source(path, text)
+
+
+_service: Optional[SymbolIndexService] = None
+_service_lock = threading.Lock()
+
+
+def get_symbol_index_service() -> SymbolIndexService:
+    """获取进程内共享的符号索引服务"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = SymbolIndexService()
+        return _service
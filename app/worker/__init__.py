@@ -0,0 +1 @@
+# app/worker/__init__.py
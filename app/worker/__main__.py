@@ -0,0 +1,27 @@
+import argparse
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.worker.runner import ReviewWorker
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Code Review Agent 独立 worker 进程")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.queue.worker_concurrency,
+        help="进程内并发执行的审查数",
+    )
+    args = parser.parse_args()
+    if settings.queue.backend == "memory":
+        # memory 队列只存在于 API 进程内，独立 worker 进程只会轮询一个空队列
+        parser.error("独立 worker 进程需要共享队列后端，请将 queue.backend 设置为 sqlite 或 redis")
+
+    asyncio.run(ReviewWorker(concurrency=args.concurrency).run())
@@ -0,0 +1,195 @@
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app.core.config import AdmissionConfig, settings
+from app.core.metrics import metrics
+from app.worker.queue import QueueStats, ReviewQueue, get_queue
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """服务已超出处理能力，新的审查请求需稍后重试"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"当前审查任务繁忙（{reason}），请约 {retry_after} 秒后重试")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class Capacity:
+    """当前处理能力快照，用于准入判断与健康检查"""
+
+    accepting: bool
+    reason: Optional[str]
+    # 按哪个优先级评估（None 表示不区分优先级）
+    priority: Optional[int]
+    queued: int
+    # 会排在新任务之前的排队任务数（优先级不低于新任务）
+    queued_ahead: int
+    running: int
+    local_sessions: int
+    oldest_wait_seconds: float
+    recent_wait_p90_seconds: float
+    mean_review_seconds: Optional[float]
+    estimated_wait_seconds: Optional[float]
+    queue_wait_slo_seconds: float
+    max_queued: int
+    retry_after: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class AdmissionController:
+    """准入控制：依据排队时长与执行中的审查数判断是否接受新的审查
+
+    排队数与最早排队时间来自共享队列（多进程、多机一致）；近期排队等待与审查耗时
+    由本进程的 worker 记录，用于估算新任务的等待时间。等待只统计优先级不低于新任务的
+    排队任务，低优先级积压（如批量审查）不会导致 hotfix 与交互请求被拒绝；任一指标超过
+    SLO 时拒绝新请求。批量提交本身不承诺等待时间，只受排队任务数上限约束。
+    """
+
+    def __init__(self, config: AdmissionConfig, queue: Optional[ReviewQueue] = None):
+        self.config = config
+        self._queue = queue
+        self._lock = threading.Lock()
+        # (记录时间, 秒数, 优先级)
+        self._waits: Deque[Tuple[float, float, int]] = deque()
+        self._durations: Deque[Tuple[float, float]] = deque()
+        self._sessions = 0
+        self._stats: Optional[QueueStats] = None
+        self._stats_at = 0.0
+
+    @property
+    def queue(self) -> ReviewQueue:
+        return self._queue or get_queue()
+
+    def _trim(self, now: float) -> None:
+        horizon = now - self.config.window_seconds
+        for window in (self._waits, self._durations):
+            while window and window[0][0] < horizon:
+                window.popleft()
+
+    def record_wait(self, seconds: float, priority: int) -> None:
+        """记录一个任务从入队到开始执行的等待时间"""
+        now = time.time()
+        with self._lock:
+            self._waits.append((now, seconds, priority))
+            self._trim(now)
+
+    def session_started(self) -> None:
+        with self._lock:
+            self._sessions += 1
+        metrics.set("review_sessions", self._sessions)
+
+    def session_finished(self, seconds: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._sessions -= 1
+            self._durations.append((now, seconds))
+            self._trim(now)
+        metrics.set("review_sessions", self._sessions)
+
+    def _queue_stats(self) -> QueueStats:
+        # 短时间内的连续请求共用一次查询，避免高峰期对队列后端的额外压力
+        now = time.monotonic()
+        if self._stats is None or now - self._stats_at > self.config.stats_ttl:
+            self._stats = self.queue.stats()
+            self._stats_at = now
+        return self._stats
+
+    def capacity(
+        self, incoming: int = 0, priority: Optional[int] = None, batch: bool = False
+    ) -> Capacity:
+        """计算当前处理能力
+
+        incoming 为即将提交的任务数；priority 为新任务的优先级（None 表示按全部排队任务评估）；
+        batch 为 True 时只检查排队任务数上限，不检查等待时间。
+        """
+        stats = self._queue_stats()
+        now = time.time()
+        with self._lock:
+            self._trim(now)
+            waits = sorted(
+                seconds
+                for _, seconds, waited_priority in self._waits
+                if priority is None or waited_priority <= priority
+            )
+            durations = [seconds for _, seconds in self._durations]
+            sessions = self._sessions
+
+        ahead, oldest_queued_at = stats.ahead_of(priority)
+        oldest_wait = now - oldest_queued_at if oldest_queued_at else 0.0
+        recent_p90 = waits[min(int(len(waits) * 0.9), len(waits) - 1)] if waits else 0.0
+        mean_review = sum(durations) / len(durations) if durations else None
+        estimated = None
+        if mean_review is not None and stats.running:
+            # 排在新任务之前的任务由当前执行中的并发槽位依次处理
+            estimated = (ahead + incoming) * mean_review / stats.running
+
+        slo = self.config.queue_wait_slo_seconds
+        reason = None
+        worst = max(oldest_wait, recent_p90, estimated or 0.0)
+        if stats.queued + incoming > self.config.max_queued:
+            reason = f"排队任务 {stats.queued + incoming} 个，超过上限 {self.config.max_queued}"
+        elif worst > slo and not batch:
+            reason = f"预计排队 {worst:.0f}s，超过目标 {slo:.0f}s"
+
+        retry_after = 0
+        if reason:
+            retry_after = int(min(max(self.config.retry_after_seconds, worst - slo), slo))
+
+        metrics.set("queue_depth", stats.queued)
+        metrics.set("queue_running", stats.running)
+        return Capacity(
+            accepting=reason is None,
+            reason=reason,
+            priority=priority,
+            queued=stats.queued,
+            queued_ahead=ahead,
+            running=stats.running,
+            local_sessions=sessions,
+            oldest_wait_seconds=round(oldest_wait, 1),
+            recent_wait_p90_seconds=round(recent_p90, 1),
+            mean_review_seconds=round(mean_review, 1) if mean_review is not None else None,
+            estimated_wait_seconds=round(estimated, 1) if estimated is not None else None,
+            queue_wait_slo_seconds=slo,
+            max_queued=self.config.max_queued,
+            retry_after=retry_after,
+        )
+
+    def admit(
+        self,
+        incoming: int = 1,
+        source: str = "api",
+        priority: Optional[int] = None,
+        batch: bool = False,
+    ) -> Capacity:
+        """准入检查，超出处理能力时抛出 AdmissionRejected"""
+        capacity = self.capacity(incoming, priority, batch)
+        if not self.config.enabled:
+            return capacity
+        if not capacity.accepting:
+            metrics.incr("admission", outcome="rejected", source=source)
+            logger.warning("拒绝新的审查请求（%s）: %s", source, capacity.reason)
+            raise AdmissionRejected(capacity.reason, capacity.retry_after)
+        metrics.incr("admission", outcome="accepted", source=source)
+        return capacity
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController(settings.admission)
+        return _controller
@@ -0,0 +1,80 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.worker.queue import JobStatus, ReviewJob, get_queue
+from app.worker.scheduler import get_scheduler
+
+
+def submit_review(
+    project: str,
+    source_branch: str,
+    target_branch: str,
+    origin: Optional[Dict[str, Any]] = None,
+) -> ReviewJob:
+    """将审查任务提交到共享队列"""
+    job = ReviewJob(
+        project=project,
+        source_branch=source_branch,
+        target_branch=target_branch,
+        origin=origin or {},
+    )
+    # 预取依赖 python-gitlab，导入较慢，提交任务时才加载
+    from app.service.prefetch_service import start_prefetch
+
+    get_scheduler().classify(job)
+    job = get_queue().enqueue(job)
+    # 排队期间提前拉取 diff 与变更文件，Agent 工具调用直接命中缓存
+    start_prefetch(job.id, project, source_branch, target_branch)
+    return job
+
+
+def submit_batch(
+    items: List[Tuple[str, str, str, Optional[str]]],
+    origin: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, List[ReviewJob]]:
+    """批量提交审查任务，返回批次 ID 与按提交顺序排列的任务
+
+    items 为 (项目, 源分支, 目标分支, 校验错误)；有校验错误的条目直接记录为失败任务，
+    以便按批次查询时每个条目都有状态。
+    """
+    from app.service.prefetch_service import start_prefetch
+
+    batch_id = uuid.uuid4().hex
+    scheduler = get_scheduler()
+    jobs = []
+    for index, (project, source_branch, target_branch, error) in enumerate(items):
+        job = ReviewJob(
+            project=project,
+            source_branch=source_branch,
+            target_branch=target_branch,
+            origin={**(origin or {}), "batch_index": index},
+            batch_id=batch_id,
+        )
+        scheduler.classify(job)
+        if error:
+            job.status = JobStatus.FAILED
+            job.error = error
+            job.finished_at = time.time()
+        jobs.append(job)
+    get_queue().enqueue_many(jobs)
+
+    # 大批次中的任务大多要排队很久，只为即将执行的前几个预取，避免同时拉取全部 diff
+    queued = [job for job in jobs if job.status == JobStatus.QUEUED]
+    for job in queued[: settings.queue.worker_concurrency]:
+        start_prefetch(job.id, job.project, job.source_branch, job.target_branch)
+    return batch_id, jobs
+
+
+async def wait_for_job(job_id: str) -> ReviewJob:
+    """轮询等待任务结束（完成或失败）"""
+    queue = get_queue()
+    while True:
+        job = await asyncio.to_thread(queue.get, job_id)
+        if job is None:
+            raise KeyError(f"任务不存在: {job_id}")
+        if job.status in JobStatus.FINISHED:
+            return job
+        await asyncio.sleep(settings.queue.poll_interval)
@@ -0,0 +1,68 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from app.core.config import settings
+from app.worker.queue import ReviewQueue, get_queue, make_worker_id
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderElector:
+    """基于队列后端租约的 leader 选举：当选时执行 on_elected，失去租约时执行 on_revoked
+
+    续约失败（含队列后端不可用）即视为失去租约，先停止 leader 职责再尝试重新当选，
+    避免租约过期后被其他进程接管时出现两个 leader。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        on_elected: Callable[[], None],
+        on_revoked: Optional[Callable[[], None]] = None,
+        queue: Optional[ReviewQueue] = None,
+    ):
+        self.name = name
+        self.on_elected = on_elected
+        self.on_revoked = on_revoked
+        self.queue = queue or get_queue()
+        self.owner = make_worker_id()
+        self.ttl = settings.queue.leader_lease_seconds
+        self.is_leader = False
+
+    def start(self) -> None:
+        thread = threading.Thread(
+            target=self._run, name=f"leader-{self.name}", daemon=True
+        )
+        thread.start()
+
+    def step(self) -> None:
+        """尝试获取或续约一次租约，并在 leader 状态变化时执行对应回调"""
+        try:
+            leader = self.queue.acquire_lease(self.name, self.owner, self.ttl)
+        except Exception:
+            logger.exception("续约 leader 租约失败: %s", self.name)
+            leader = False
+
+        if leader == self.is_leader:
+            return
+        if leader:
+            logger.info("当选 %s leader: %s", self.name, self.owner)
+            callback = self.on_elected
+        else:
+            logger.error("失去 %s leader 租约: %s", self.name, self.owner)
+            callback = self.on_revoked
+        # 回调失败时保持原状态，下一轮重试
+        if callback is not None:
+            try:
+                callback()
+            except Exception:
+                logger.exception("%s leader 状态切换回调失败", self.name)
+                return
+        self.is_leader = leader
+
+    def _run(self) -> None:
+        while True:
+            self.step()
+            time.sleep(self.ttl / 3)
@@ -0,0 +1,814 @@
+import fcntl
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.worker.scheduler import Scheduler, get_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+def make_worker_id() -> str:
+    """生成跨进程、跨主机唯一的 worker 标识"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    FINISHED = (DONE, FAILED)
+
+
+@dataclass
+class ReviewJob:
+    """审查任务"""
+
+    project: str
+    source_branch: str
+    target_branch: str
+    origin: Dict[str, Any] = field(default_factory=dict)
+    priority_class: str = ""
+    priority: int = 0
+    tenant: str = ""
+    # 已完成阶段的检查点（阶段名 -> 数据），中断后恢复时跳过这些阶段
+    checkpoints: Dict[str, Any] = field(default_factory=dict)
+    attempts: int = 0
+    heartbeat_at: Optional[float] = None
+    # 批量提交时所属的批次
+    batch_id: Optional[str] = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = JobStatus.QUEUED
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    worker_id: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, data: str) -> "ReviewJob":
+        return cls(**json.loads(data))
+
+    def is_stale(self, now: float, stale_seconds: float) -> bool:
+        last_seen = self.heartbeat_at or self.started_at or self.created_at
+        return self.status == JobStatus.RUNNING and now - last_seen > stale_seconds
+
+    def requeue(self, max_attempts: int) -> None:
+        """执行者失联后重新入队，超过最大执行次数则标记为失败"""
+        self.worker_id = None
+        self.heartbeat_at = None
+        if self.attempts >= max_attempts:
+            self.status = JobStatus.FAILED
+            self.error = f"任务执行 {self.attempts} 次均被中断"
+            self.finished_at = time.time()
+        else:
+            self.status = JobStatus.QUEUED
+
+
+@dataclass
+class QueueStats:
+    """队列负载快照"""
+
+    queued: int
+    running: int
+    oldest_queued_at: Optional[float] = None
+    # 按优先级划分的排队任务：优先级 -> (任务数, 最早入队时间)
+    by_priority: Dict[int, Tuple[int, float]] = field(default_factory=dict)
+
+    @staticmethod
+    def group(jobs: Iterable[ReviewJob]) -> Dict[int, Tuple[int, float]]:
+        grouped: Dict[int, Tuple[int, float]] = {}
+        for job in jobs:
+            count, oldest = grouped.get(job.priority, (0, job.created_at))
+            grouped[job.priority] = (count + 1, min(oldest, job.created_at))
+        return grouped
+
+    def ahead_of(self, priority: Optional[int]) -> Tuple[int, Optional[float]]:
+        """会排在该优先级新任务之前的排队任务数与最早入队时间；None 表示全部排队任务
+
+        只统计基础优先级不低于新任务的任务，不考虑等待老化带来的提升。
+        """
+        if priority is None:
+            return self.queued, self.oldest_queued_at
+        ahead = [value for key, value in self.by_priority.items() if key <= priority]
+        return (
+            sum(count for count, _ in ahead),
+            min((oldest for _, oldest in ahead), default=None),
+        )
+
+
+class ReviewQueue:
+    """审查任务队列后端接口，所有方法均为同步且线程安全"""
+
+    @property
+    def scheduler(self) -> Scheduler:
+        return get_scheduler()
+
+    def enqueue(self, job: ReviewJob) -> ReviewJob:
+        raise NotImplementedError
+
+    def enqueue_many(self, jobs: List[ReviewJob]) -> List[ReviewJob]:
+        """批量入队；非排队状态的任务（如校验失败）只保存不进入待执行队列"""
+        raise NotImplementedError
+
+    def claim(self, worker_id: str) -> Optional[ReviewJob]:
+        """按调度策略领取一个任务并标记为执行中，无任务时返回 None"""
+        raise NotImplementedError
+
+    def get(self, job_id: str) -> Optional[ReviewJob]:
+        raise NotImplementedError
+
+    def batch(self, batch_id: str) -> List[ReviewJob]:
+        """批次内的全部任务，按提交顺序排列"""
+        raise NotImplementedError
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def fail(self, job_id: str, error: str) -> None:
+        raise NotImplementedError
+
+    def position(self, job_id: str) -> Optional[int]:
+        """排队中的任务之前约有多少个待执行任务，非排队状态返回 None
+
+        按基础优先级与入队时间估算，不考虑老化与公平分配对实际顺序的调整。
+        """
+        raise NotImplementedError
+
+    def stats(self) -> QueueStats:
+        """当前排队与执行中的任务数，以及最早排队任务的入队时间"""
+        raise NotImplementedError
+
+    def checkpoint(self, job_id: str, phase: str, data: Any) -> None:
+        """记录任务已完成的阶段"""
+        raise NotImplementedError
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        """刷新执行中任务的心跳"""
+        raise NotImplementedError
+
+    def requeue_stale(self, stale_seconds: float, max_attempts: int) -> List[str]:
+        """将心跳超时的执行中任务重新入队，返回受影响的任务 ID"""
+        raise NotImplementedError
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """获取或续期具名租约（用于 leader 选举），成功返回 True"""
+        raise NotImplementedError
+
+
+class InMemoryQueue(ReviewQueue):
+    """进程内队列，用于单进程部署与测试；租约基于本机文件锁
+
+    配置 journal_path 时，每次状态变化都追加写入任务日志，重启后据此恢复未完成的任务。
+    """
+
+    # 日志压缩时保留的已结束任务数，供重启后查询最近的结果
+    _KEEP_FINISHED = 200
+
+    def __init__(self, lock_dir: Optional[str] = None, journal_path: Optional[str] = None):
+        self._jobs: Dict[str, ReviewJob] = {}
+        self._pending: List[str] = []
+        self._lock = threading.Lock()
+        self._lock_dir = Path(lock_dir or settings.gitlab.temp_dir)
+        self._lease_files: Dict[str, IO] = {}
+        self._journal: Optional[IO] = None
+        self._journal_lock: Optional[IO] = None
+        if journal_path:
+            self._open_journal(Path(journal_path))
+
+    def _open_journal(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lock = open(path.with_name(f"{path.name}.lock"), "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            logger.warning("任务日志 %s 已被其他进程占用，本进程队列不做持久化", path)
+            return
+        self._journal_lock = lock
+
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        job = ReviewJob.from_json(line)
+                    except (ValueError, TypeError):
+                        # 进程被杀时最后一行可能写了一半
+                        continue
+                    self._jobs[job.id] = job
+
+        # 上次进程中执行到一半的任务重新入队，已完成的阶段由检查点跳过
+        recovered = 0
+        for job in self._jobs.values():
+            if job.status == JobStatus.RUNNING:
+                job.requeue(settings.queue.max_attempts)
+                recovered += 1
+        finished = sorted(
+            (job for job in self._jobs.values() if job.status in JobStatus.FINISHED),
+            key=lambda job: job.finished_at or 0,
+        )
+        for job in finished[: max(len(finished) - self._KEEP_FINISHED, 0)]:
+            del self._jobs[job.id]
+        self._pending = [
+            job.id
+            for job in sorted(self._jobs.values(), key=lambda job: job.created_at)
+            if job.status == JobStatus.QUEUED
+        ]
+
+        # 压缩日志：每个任务只保留最新状态
+        tmp = path.with_name(f"{path.name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for job in self._jobs.values():
+                f.write(job.to_json() + "\n")
+        tmp.replace(path)
+        self._journal = open(path, "a", encoding="utf-8")
+        if self._jobs:
+            logger.info(
+                "已从任务日志恢复 %d 个任务（待执行 %d，其中中断恢复 %d）",
+                len(self._jobs),
+                len(self._pending),
+                recovered,
+            )
+
+    def _persist(self, job: ReviewJob) -> None:
+        if self._journal is not None:
+            self._journal.write(job.to_json() + "\n")
+            self._journal.flush()
+
+    def enqueue(self, job: ReviewJob) -> ReviewJob:
+        with self._lock:
+            self._jobs[job.id] = job
+            self._pending.append(job.id)
+            self._persist(job)
+        return job
+
+    def enqueue_many(self, jobs: List[ReviewJob]) -> List[ReviewJob]:
+        with self._lock:
+            for job in jobs:
+                self._jobs[job.id] = job
+                if job.status == JobStatus.QUEUED:
+                    self._pending.append(job.id)
+                self._persist(job)
+        return jobs
+
+    def claim(self, worker_id: str) -> Optional[ReviewJob]:
+        with self._lock:
+            running = [
+                job for job in self._jobs.values() if job.status == JobStatus.RUNNING
+            ]
+            job = self.scheduler.select(
+                [self._jobs[job_id] for job_id in self._pending], running
+            )
+            if job is None:
+                return None
+            self._pending.remove(job.id)
+            job.status = JobStatus.RUNNING
+            job.worker_id = worker_id
+            job.started_at = time.time()
+            job.attempts += 1
+            self._persist(job)
+            return job
+
+    def get(self, job_id: str) -> Optional[ReviewJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def batch(self, batch_id: str) -> List[ReviewJob]:
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.batch_id == batch_id]
+        return sorted(jobs, key=lambda job: job.origin.get("batch_index", 0))
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job.status = JobStatus.DONE
+            job.result = result
+            job.finished_at = time.time()
+            self._persist(job)
+
+    def fail(self, job_id: str, error: str) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job.status = JobStatus.FAILED
+            job.error = error
+            job.finished_at = time.time()
+            self._persist(job)
+
+    def position(self, job_id: str) -> Optional[int]:
+        with self._lock:
+            if job_id not in self._pending:
+                return None
+            job = self._jobs[job_id]
+            return sum(
+                1
+                for other in (self._jobs[pending_id] for pending_id in self._pending)
+                if other.priority < job.priority
+                or (other.priority == job.priority and other.created_at < job.created_at)
+            )
+
+    def stats(self) -> QueueStats:
+        with self._lock:
+            running = sum(
+                1 for job in self._jobs.values() if job.status == JobStatus.RUNNING
+            )
+            pending = [self._jobs[job_id] for job_id in self._pending]
+            return QueueStats(
+                queued=len(pending),
+                running=running,
+                oldest_queued_at=min((job.created_at for job in pending), default=None),
+                by_priority=QueueStats.group(pending),
+            )
+
+    def checkpoint(self, job_id: str, phase: str, data: Any) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job.checkpoints[phase] = data
+            self._persist(job)
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        # 执行者与队列同进程，进程存活即任务存活，心跳只保存在内存中
+        now = time.time()
+        with self._lock:
+            for job_id in job_ids:
+                if job_id in self._jobs:
+                    self._jobs[job_id].heartbeat_at = now
+
+    def requeue_stale(self, stale_seconds: float, max_attempts: int) -> List[str]:
+        # 同进程内不存在失联的执行者，中断的任务在重启加载日志时恢复
+        return []
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        # 文件锁随进程退出自动释放，无需续期
+        with self._lock:
+            if name in self._lease_files:
+                return True
+            self._lock_dir.mkdir(parents=True, exist_ok=True)
+            handle = open(self._lock_dir / f"{name}.lock", "w")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                return False
+            self._lease_files[name] = handle
+            return True
+
+
+class SQLiteQueue(ReviewQueue):
+    """基于 SQLite 的共享队列，支持同机多进程"""
+
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " data TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_batch"
+                " ON jobs (json_extract(data, '$.batch_id'))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                " name TEXT PRIMARY KEY,"
+                " owner TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """以 IMMEDIATE 事务执行，保证多进程间的领取与更新互斥"""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _save(conn: sqlite3.Connection, job: ReviewJob) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO jobs (id, status, created_at, data) VALUES (?, ?, ?, ?)",
+            (job.id, job.status, job.created_at, job.to_json()),
+        )
+
+    @staticmethod
+    def _load(conn: sqlite3.Connection, job_id: str) -> Optional[ReviewJob]:
+        row = conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return ReviewJob.from_json(row[0]) if row else None
+
+    def enqueue(self, job: ReviewJob) -> ReviewJob:
+        with self._transaction() as conn:
+            self._save(conn, job)
+        return job
+
+    def enqueue_many(self, jobs: List[ReviewJob]) -> List[ReviewJob]:
+        with self._transaction() as conn:
+            for job in jobs:
+                self._save(conn, job)
+        return jobs
+
+    def claim(self, worker_id: str) -> Optional[ReviewJob]:
+        with self._transaction() as conn:
+            # 每个优先级各取最早入队的 scan_limit 个，避免高优先级任务被大量低优先级任务挡在扫描范围外
+            pending = [
+                ReviewJob.from_json(row[0])
+                for row in conn.execute(
+                    "SELECT data FROM ("
+                    " SELECT data, ROW_NUMBER() OVER ("
+                    "  PARTITION BY json_extract(data, '$.priority') ORDER BY created_at"
+                    " ) AS rank FROM jobs WHERE status = ?"
+                    ") WHERE rank <= ?",
+                    (JobStatus.QUEUED, settings.scheduling.scan_limit),
+                )
+            ]
+            running = [
+                ReviewJob.from_json(row[0])
+                for row in conn.execute(
+                    "SELECT data FROM jobs WHERE status = ?", (JobStatus.RUNNING,)
+                )
+            ]
+            job = self.scheduler.select(pending, running)
+            if job is None:
+                return None
+            job.status = JobStatus.RUNNING
+            job.worker_id = worker_id
+            job.started_at = time.time()
+            job.attempts += 1
+            self._save(conn, job)
+            return job
+
+    def get(self, job_id: str) -> Optional[ReviewJob]:
+        with self._transaction() as conn:
+            return self._load(conn, job_id)
+
+    def batch(self, batch_id: str) -> List[ReviewJob]:
+        with self._transaction() as conn:
+            jobs = [
+                ReviewJob.from_json(row[0])
+                for row in conn.execute(
+                    "SELECT data FROM jobs WHERE json_extract(data, '$.batch_id') = ?",
+                    (batch_id,),
+                )
+            ]
+        return sorted(jobs, key=lambda job: job.origin.get("batch_index", 0))
+
+    def _finish(self, job_id: str, **changes: Any) -> None:
+        with self._transaction() as conn:
+            job = self._load(conn, job_id)
+            if job is None:
+                return
+            for key, value in changes.items():
+                setattr(job, key, value)
+            job.finished_at = time.time()
+            self._save(conn, job)
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        self._finish(job_id, status=JobStatus.DONE, result=result)
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._finish(job_id, status=JobStatus.FAILED, error=error)
+
+    def position(self, job_id: str) -> Optional[int]:
+        with self._transaction() as conn:
+            job = self._load(conn, job_id)
+            if job is None or job.status != JobStatus.QUEUED:
+                return None
+            row = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?"
+                " AND (json_extract(data, '$.priority') < ?"
+                " OR (json_extract(data, '$.priority') = ? AND created_at < ?))",
+                (JobStatus.QUEUED, job.priority, job.priority, job.created_at),
+            ).fetchone()
+            return row[0]
+
+    def stats(self) -> QueueStats:
+        with self._transaction() as conn:
+            rows = {
+                status: (count, oldest)
+                for status, count, oldest in conn.execute(
+                    "SELECT status, COUNT(*), MIN(created_at) FROM jobs"
+                    " WHERE status IN (?, ?) GROUP BY status",
+                    (JobStatus.QUEUED, JobStatus.RUNNING),
+                )
+            }
+            by_priority = {
+                int(priority): (count, oldest)
+                for priority, count, oldest in conn.execute(
+                    "SELECT json_extract(data, '$.priority'), COUNT(*), MIN(created_at)"
+                    " FROM jobs WHERE status = ? GROUP BY 1",
+                    (JobStatus.QUEUED,),
+                )
+            }
+        queued, oldest = rows.get(JobStatus.QUEUED, (0, None))
+        return QueueStats(
+            queued=queued,
+            running=rows.get(JobStatus.RUNNING, (0, None))[0],
+            oldest_queued_at=oldest,
+            by_priority=by_priority,
+        )
+
+    def checkpoint(self, job_id: str, phase: str, data: Any) -> None:
+        with self._transaction() as conn:
+            job = self._load(conn, job_id)
+            if job is None:
+                return
+            job.checkpoints[phase] = data
+            self._save(conn, job)
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            for job_id in job_ids:
+                job = self._load(conn, job_id)
+                if job is not None and job.status == JobStatus.RUNNING:
+                    job.heartbeat_at = now
+                    self._save(conn, job)
+
+    def requeue_stale(self, stale_seconds: float, max_attempts: int) -> List[str]:
+        now = time.time()
+        requeued = []
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT data FROM jobs WHERE status = ?", (JobStatus.RUNNING,)
+            ).fetchall()
+            for (data,) in rows:
+                job = ReviewJob.from_json(data)
+                if job.is_stale(now, stale_seconds):
+                    job.requeue(max_attempts)
+                    self._save(conn, job)
+                    requeued.append(job.id)
+        return requeued
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT owner, expires_at FROM leases WHERE name = ?", (name,)
+            ).fetchone()
+            if row is not None and row[0] != owner and row[1] >= now:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                (name, owner, now + ttl),
+            )
+            return True
+
+
+class RedisQueue(ReviewQueue):
+    """基于 Redis 的共享队列，支持多机部署（需安装 redis 包）"""
+
+    def __init__(self, url: str, prefix: str = "code-review"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("queue.backend=redis 需要安装 redis 包: pip install redis") from e
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    def _pending_key(self, priority: int) -> str:
+        return f"{self.prefix}:pending:{priority}"
+
+    @property
+    def _legacy_pending_key(self) -> str:
+        # 旧版本所有优先级共用一个列表，升级后继续消费其中的存量任务
+        return f"{self.prefix}:pending"
+
+    @property
+    def _priorities_key(self) -> str:
+        return f"{self.prefix}:priorities"
+
+    def _pending_keys(self) -> List[Tuple[Optional[int], str]]:
+        """各优先级的待执行列表，按优先级从高到低排列，旧版共用列表排在最后"""
+        priorities = sorted(int(value) for value in self.client.smembers(self._priorities_key))
+        return [(priority, self._pending_key(priority)) for priority in priorities] + [
+            (None, self._legacy_pending_key)
+        ]
+
+    def _push_pending(self, pipe: Any, job: ReviewJob) -> None:
+        pipe.sadd(self._priorities_key, job.priority)
+        pipe.rpush(self._pending_key(job.priority), job.id)
+
+    @property
+    def _running_key(self) -> str:
+        return f"{self.prefix}:running"
+
+    @property
+    def _heartbeat_key(self) -> str:
+        return f"{self.prefix}:heartbeats"
+
+    def _batch_key(self, batch_id: str) -> str:
+        return f"{self.prefix}:batch:{batch_id}"
+
+    def _get_many(self, job_ids: List[str]) -> List[ReviewJob]:
+        if not job_ids:
+            return []
+        values = self.client.mget([self._job_key(job_id) for job_id in job_ids])
+        return [ReviewJob.from_json(value) for value in values if value]
+
+    def enqueue(self, job: ReviewJob) -> ReviewJob:
+        pipe = self.client.pipeline()
+        pipe.set(self._job_key(job.id), job.to_json())
+        self._push_pending(pipe, job)
+        pipe.execute()
+        return job
+
+    def enqueue_many(self, jobs: List[ReviewJob]) -> List[ReviewJob]:
+        pipe = self.client.pipeline()
+        for job in jobs:
+            pipe.set(self._job_key(job.id), job.to_json())
+            if job.status == JobStatus.QUEUED:
+                self._push_pending(pipe, job)
+            if job.batch_id:
+                # 批次按提交顺序记录任务 ID
+                pipe.rpush(self._batch_key(job.batch_id), job.id)
+        pipe.execute()
+        return jobs
+
+    def claim(self, worker_id: str) -> Optional[ReviewJob]:
+        # 选中后以 LREM 原子摘除，返回 0 说明已被其他 worker 领取，重新调度
+        for _ in range(3):
+            # 每个优先级各取最早入队的 scan_limit 个，避免高优先级任务被大量低优先级任务挡在扫描范围外
+            keys = [key for _, key in self._pending_keys()]
+            pipe = self.client.pipeline()
+            for key in keys:
+                pipe.lrange(key, 0, settings.scheduling.scan_limit - 1)
+            source = {
+                job_id: key for key, job_ids in zip(keys, pipe.execute()) for job_id in job_ids
+            }
+            pending = self._get_many(list(source))
+            running = self._get_many(list(self.client.smembers(self._running_key)))
+            job = self.scheduler.select(pending, running)
+            if job is None:
+                return None
+            if not self.client.lrem(source[job.id], 1, job.id):
+                continue
+            job.status = JobStatus.RUNNING
+            job.worker_id = worker_id
+            job.started_at = time.time()
+            job.attempts += 1
+            pipe = self.client.pipeline()
+            pipe.set(self._job_key(job.id), job.to_json())
+            pipe.sadd(self._running_key, job.id)
+            pipe.hset(self._heartbeat_key, job.id, job.started_at)
+            pipe.execute()
+            return job
+        return None
+
+    def get(self, job_id: str) -> Optional[ReviewJob]:
+        data = self.client.get(self._job_key(job_id))
+        return ReviewJob.from_json(data) if data else None
+
+    def batch(self, batch_id: str) -> List[ReviewJob]:
+        return self._get_many(self.client.lrange(self._batch_key(batch_id), 0, -1))
+
+    def _finish(self, job_id: str, **changes: Any) -> None:
+        job = self.get(job_id)
+        if job is None:
+            return
+        for key, value in changes.items():
+            setattr(job, key, value)
+        job.finished_at = time.time()
+        pipe = self.client.pipeline()
+        pipe.set(self._job_key(job.id), job.to_json())
+        pipe.srem(self._running_key, job.id)
+        pipe.hdel(self._heartbeat_key, job.id)
+        pipe.execute()
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        self._finish(job_id, status=JobStatus.DONE, result=result)
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._finish(job_id, status=JobStatus.FAILED, error=error)
+
+    def position(self, job_id: str) -> Optional[int]:
+        job = self.get(job_id)
+        if job is None or job.status != JobStatus.QUEUED:
+            return None
+        index = self.client.lpos(self._pending_key(job.priority), job_id)
+        if index is None:
+            return self.client.lpos(self._legacy_pending_key, job_id)
+        ahead = [
+            key
+            for priority, key in self._pending_keys()
+            if priority is not None and priority < job.priority
+        ]
+        pipe = self.client.pipeline()
+        for key in ahead:
+            pipe.llen(key)
+        return index + sum(pipe.execute())
+
+    def stats(self) -> QueueStats:
+        pipe = self.client.pipeline()
+        for _, key in self._pending_keys():
+            pipe.lrange(key, 0, -1)
+        pipe.scard(self._running_key)
+        *lists, running = pipe.execute()
+        pending_ids = [job_id for job_ids in lists for job_id in job_ids]
+        # 按优先级统计需要读取全部排队任务；数量受 admission.max_queued 约束，且准入检查会缓存结果
+        pending = self._get_many(pending_ids)
+        return QueueStats(
+            queued=len(pending_ids),
+            running=running,
+            oldest_queued_at=min((job.created_at for job in pending), default=None),
+            by_priority=QueueStats.group(pending),
+        )
+
+    def checkpoint(self, job_id: str, phase: str, data: Any) -> None:
+        job = self.get(job_id)
+        if job is None:
+            return
+        job.checkpoints[phase] = data
+        self.client.set(self._job_key(job.id), job.to_json())
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        # 心跳单独存放，避免与任务数据的并发写入互相覆盖
+        if job_ids:
+            now = time.time()
+            self.client.hset(self._heartbeat_key, mapping={job_id: now for job_id in job_ids})
+
+    def requeue_stale(self, stale_seconds: float, max_attempts: int) -> List[str]:
+        now = time.time()
+        requeued = []
+        heartbeats = self.client.hgetall(self._heartbeat_key)
+        for job in self._get_many(list(self.client.smembers(self._running_key))):
+            if job.id in heartbeats:
+                job.heartbeat_at = float(heartbeats[job.id])
+            if not job.is_stale(now, stale_seconds):
+                continue
+            # SREM 成功者负责重新入队，避免多个 worker 重复处理
+            if not self.client.srem(self._running_key, job.id):
+                continue
+            job.requeue(max_attempts)
+            pipe = self.client.pipeline()
+            pipe.set(self._job_key(job.id), job.to_json())
+            pipe.hdel(self._heartbeat_key, job.id)
+            if job.status == JobStatus.QUEUED:
+                self._push_pending(pipe, job)
+            pipe.execute()
+            requeued.append(job.id)
+        return requeued
+
+    def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        key = f"{self.prefix}:lease:{name}"
+        if self.client.set(key, owner, nx=True, px=int(ttl * 1000)):
+            return True
+        if self.client.get(key) == owner:
+            self.client.pexpire(key, int(ttl * 1000))
+            return True
+        return False
+
+
+_queue: Optional[ReviewQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> ReviewQueue:
+    """获取当前进程共享的队列后端"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            backend = settings.queue.backend
+            if backend == "memory":
+                _queue = InMemoryQueue(journal_path=settings.queue.journal_path)
+            elif backend == "sqlite":
+                _queue = SQLiteQueue(settings.queue.sqlite_path)
+            elif backend == "redis":
+                _queue = RedisQueue(settings.queue.redis_url)
+            else:
+                raise ValueError(f"不支持的队列后端: {backend}")
+        return _queue
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+from typing import Any, Optional, Set
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.service.review_cache import ReviewCache
+from app.worker.admission import get_admission_controller
+from app.worker.queue import ReviewJob, ReviewQueue, get_queue, make_worker_id
+
+logger = logging.getLogger(__name__)
+
+
+class ReviewWorker:
+    """审查任务消费者：从共享队列领取任务并在当前事件循环中并发执行"""
+
+    def __init__(
+        self, queue: Optional[ReviewQueue] = None, concurrency: Optional[int] = None
+    ):
+        self.queue = queue or get_queue()
+        self.concurrency = concurrency or settings.queue.worker_concurrency
+        self.worker_id = make_worker_id()
+        self._active: Set[str] = set()
+
+    async def run(self) -> None:
+        logger.info(
+            "审查 worker 已启动: id=%s, 并发=%d", self.worker_id, self.concurrency
+        )
+        await asyncio.gather(
+            self._maintain(), *(self._consume() for _ in range(self.concurrency))
+        )
+
+    async def _maintain(self) -> None:
+        """定期刷新执行中任务的心跳，并回收失联 worker 遗留的任务"""
+        config = settings.queue
+        while True:
+            try:
+                await asyncio.to_thread(self.queue.heartbeat, list(self._active))
+                requeued = await asyncio.to_thread(
+                    self.queue.requeue_stale, config.stale_seconds, config.max_attempts
+                )
+                if requeued:
+                    logger.warning("回收心跳超时的审查任务: %s", ", ".join(requeued))
+            except Exception:
+                logger.exception("任务心跳或回收失败")
+            await asyncio.sleep(config.heartbeat_interval)
+
+    async def _consume(self) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(self.queue.claim, self.worker_id)
+            except Exception:
+                logger.exception("领取审查任务失败")
+                job = None
+            if job is None:
+                await asyncio.sleep(settings.queue.poll_interval)
+                continue
+            await self._execute(job)
+
+    async def _execute(self, job: ReviewJob) -> None:
+        wait = job.started_at - job.created_at
+        metrics.observe("queue_wait_seconds", wait, priority=job.priority_class)
+        admission = get_admission_controller()
+        admission.record_wait(wait, job.priority)
+        logger.info(
+            "开始执行审查任务 %s: %s %s -> %s（优先级 %s，等待 %.1fs）",
+            job.id,
+            job.project,
+            job.source_branch,
+            job.target_branch,
+            job.priority_class,
+            wait,
+        )
+        # Agent 相关依赖（claude-agent-sdk 等）在首次执行任务时才加载
+        from app.service.review_service import ReviewService
+
+        cache = ReviewCache(job.id)
+        if job.attempts > 1:
+            # 中断前的预取不会再完成，避免工具调用空等
+            cache.end_prefetch()
+            logger.info(
+                "恢复中断的审查任务 %s（第 %d 次执行），已完成阶段: %s",
+                job.id,
+                job.attempts,
+                ", ".join(job.checkpoints) or "无",
+            )
+
+        async def checkpoint(phase: str, data: Any) -> None:
+            await asyncio.to_thread(self.queue.checkpoint, job.id, phase, data)
+
+        # 飞书发起的任务在原卡片上实时展示审查进度
+        progress_card = None
+        if job.origin.get("type") == "feishu":
+            from app.feishu_bot import progress_card_for
+
+            progress_card = progress_card_for(job)
+
+        self._active.add(job.id)
+        admission.session_started()
+        started = time.monotonic()
+        try:
+            result = await ReviewService().execute_review(
+                project=job.project,
+                source_branch=job.source_branch,
+                target_branch=job.target_branch,
+                cache=cache,
+                checkpoints=job.checkpoints,
+                on_checkpoint=checkpoint,
+                progress=progress_card.report if progress_card else None,
+            )
+            await asyncio.to_thread(self.queue.complete, job.id, result)
+        except Exception as e:
+            logger.exception("审查任务 %s 失败", job.id)
+            await asyncio.to_thread(self.queue.fail, job.id, str(e))
+        finally:
+            self._active.discard(job.id)
+            admission.session_finished(time.monotonic() - started)
+            if progress_card is not None:
+                await asyncio.to_thread(progress_card.close)
+            await asyncio.to_thread(cache.clear)
+
+        finished = await asyncio.to_thread(self.queue.get, job.id)
+        if finished is not None:
+            await asyncio.to_thread(_notify, finished)
+
+
+def _notify(job: ReviewJob) -> None:
+    """将任务结果回传给发起方"""
+    if job.origin.get("type") != "feishu":
+        return
+    from app.feishu_bot import notify_review_finished
+
+    try:
+        notify_review_finished(job)
+    except Exception:
+        logger.exception("飞书结果通知失败: %s", job.id)
@@ -0,0 +1,102 @@
+import fnmatch
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, List, Optional
+
+from app.core.config import PriorityClassConfig, SchedulingConfig, settings
+
+if TYPE_CHECKING:
+    from app.worker.queue import ReviewJob
+
+
+class Scheduler:
+    """审查任务调度策略：优先级分类、按项目/发起人加权公平分配、等待老化防饥饿
+
+    调度只依赖待执行与执行中的任务本身，不保存额外状态，因此所有队列后端
+    （含多进程、多机）都可以在领取任务的事务内直接调用。
+    """
+
+    def __init__(self, config: SchedulingConfig):
+        self.config = config
+
+    @staticmethod
+    def _matches(patterns: List[str], value: str) -> bool:
+        return not patterns or any(fnmatch.fnmatchcase(value, p) for p in patterns)
+
+    def _match_class(
+        self, project: str, source_branch: str, target_branch: str
+    ) -> Optional[PriorityClassConfig]:
+        for priority_class in self.config.classes:
+            if (
+                self._matches(priority_class.projects, project)
+                and self._matches(priority_class.target_branches, target_branch)
+                and self._matches(priority_class.source_branches, source_branch)
+            ):
+                return priority_class
+        return None
+
+    def priority_for(
+        self, project: str, source_branch: str, target_branch: str, batch: bool = False
+    ) -> int:
+        """新任务入队后的优先级，供准入检查在入队前按优先级估算排队等待"""
+        priority_class = self._match_class(project, source_branch, target_branch)
+        priority = (
+            self.config.default_priority if priority_class is None else priority_class.priority
+        )
+        return priority + self.config.batch_priority_offset if batch else priority
+
+    def tenant_of(self, job: "ReviewJob") -> str:
+        """公平分配的单位：项目，或发起人（缺省时退回项目）"""
+        if self.config.fair_share_key == "requester":
+            requester = job.origin.get("requester") or job.origin.get("chat_id")
+            if requester:
+                return f"{job.origin.get('type', '')}:{requester}"
+        return job.project
+
+    def classify(self, job: "ReviewJob") -> "ReviewJob":
+        """入队前确定任务的优先级分类与公平分配单位；批量任务降低 batch_priority_offset 级"""
+        priority_class = self._match_class(job.project, job.source_branch, job.target_branch)
+        if priority_class is None:
+            job.priority_class = self.config.default_class
+            job.priority = self.config.default_priority
+        else:
+            job.priority_class = priority_class.name
+            job.priority = priority_class.priority
+        if job.batch_id:
+            job.priority += self.config.batch_priority_offset
+        job.tenant = self.tenant_of(job)
+        return job
+
+    def effective_priority(self, job: "ReviewJob", now: float) -> int:
+        """数值越小越优先；每等待 aging_seconds 提升一级"""
+        if self.config.aging_seconds <= 0:
+            return job.priority
+        return job.priority - int((now - job.created_at) // self.config.aging_seconds)
+
+    def select(
+        self, pending: List["ReviewJob"], running: List["ReviewJob"]
+    ) -> Optional["ReviewJob"]:
+        """从待执行任务中选出下一个：先比有效优先级，再选加权后执行中任务最少的单位"""
+        if not pending:
+            return None
+        now = time.time()
+        best = min(self.effective_priority(job, now) for job in pending)
+        candidates = [job for job in pending if self.effective_priority(job, now) == best]
+
+        active = Counter(job.tenant for job in running)
+
+        def share(job: "ReviewJob") -> float:
+            weight = self.config.weights.get(job.tenant, 1.0)
+            return active[job.tenant] / weight if weight > 0 else float("inf")
+
+        return min(candidates, key=lambda job: (share(job), job.created_at))
+
+
+_scheduler: Optional[Scheduler] = None
+
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler(settings.scheduling)
+    return _scheduler
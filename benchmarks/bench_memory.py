@@ -0,0 +1,157 @@
+"""内存基准：高并发审查下 diff 与文件内容处理的峰值 RSS
+
+用法: python benchmarks/bench_memory.py [--concurrency 20] [--huge-files 3] [--huge-mb 4]
+
+模拟 concurrency 个审查同时调用 get_diff 与 get_file_content：每个 MR 含若干个
+超大生成文件（diff 与文件内容各约 huge-mb MB）和一批普通文件。分别在不限制
+（memory.* 设为 0）与默认上限两种配置下，于全新子进程中运行并记录峰值 RSS（JSON）。
+"""
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+_NORMAL_FILES = 30
+
+
+def _synthetic_compare(review: int, huge_files: int, huge_bytes: int) -> dict:
+    """构造一次审查的比较结果：超大生成文件 + 普通源码文件"""
+    diffs = []
+    for index in range(huge_files):
+        line = f"+    'generated_{review}_{index}': 'value-xxxxxxxxxxxxxxxxxxxxxxxx',\n"
+        count = huge_bytes // len(line)
+        diffs.append({
+            "old_path": f"gen/data_{index}.py",
+            "new_path": f"gen/data_{index}.py",
+            "new_file": True,
+            "diff": f"@@ -0,0 +1,{count} @@\n" + line * count,
+        })
+    for index in range(_NORMAL_FILES):
+        body = "".join(f"+    value_{i} = compute({i})\n" for i in range(40))
+        diffs.append({
+            "old_path": f"src/module_{index}.py",
+            "new_path": f"src/module_{index}.py",
+            "diff": f"@@ -10,3 +10,43 @@ def handler():\n context\n{body} context\n context\n",
+        })
+    return {"diffs": diffs}
+
+
+def run_worker(concurrency: int, huge_files: int, huge_mb: float, bounded: bool) -> dict:
+    """在当前进程中运行并发审查模拟，返回峰值 RSS 与耗时"""
+    from app.agent import tools
+    from app.agent.budget import ReviewBudget
+    from app.core.config import settings
+    from app.service.gitlab_service import GitLabService
+
+    if not bounded:
+        settings.memory.max_diff_bytes = 0
+        settings.memory.max_file_diff_bytes = 0
+        settings.memory.max_file_bytes = 0
+        settings.agent.max_review_payload_bytes = 0
+    huge_bytes = int(huge_mb * 1024 * 1024)
+
+    class FakeGitLabService(GitLabService):
+        """不访问网络：比较结果与文件内容由内存生成，文件按块流式写出"""
+
+        def __init__(self, review: int):
+            self.review = review
+
+        def get_compare(self, project_path, source_branch, target_branch):
+            return _synthetic_compare(self.review, huge_files, huge_bytes)
+
+        def download_file(self, project_path, file_path, ref, dest):
+            chunk = (f"# {file_path}@{ref}\n" + "x = 1\n" * 10_000).encode()
+            with open(dest, "wb") as f:
+                written = 0
+                while written < huge_bytes:
+                    f.write(chunk)
+                    written += len(chunk)
+            return dest.stat().st_size
+
+    async def review(index: int) -> int:
+        tools.set_review_context(
+            gitlab_service=FakeGitLabService(index),
+            project="group/repo",
+            source_branch="feature",
+            target_branch="main",
+            budget=ReviewBudget.from_config(settings.agent),
+        )
+        payloads = [await tools.get_diff.handler({
+            "project": "group/repo", "source_branch": "feature", "target_branch": "main",
+        })]
+        for file_index in range(huge_files):
+            payloads.append(await tools.get_file_content.handler({
+                "project": "group/repo",
+                "file_path": f"gen/data_{file_index}.py",
+                "branch": "feature",
+            }))
+        # 所有审查同时持有各自的工具返回内容，模拟并发会话中的 MCP 载荷
+        await asyncio.sleep(0.5)
+        return sum(len(item["text"]) for payload in payloads for item in payload["content"])
+
+    async def main() -> list:
+        return await asyncio.gather(*(review(index) for index in range(concurrency)))
+
+    started = time.perf_counter()
+    sizes = asyncio.run(main())
+    return {
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "seconds": round(time.perf_counter() - started, 3),
+        "payload_mb_per_review": round(sum(sizes) / len(sizes) / 1024 / 1024, 2),
+    }
+
+
+def measure(args: argparse.Namespace, bounded: bool) -> dict:
+    """在全新解释器中运行一轮，避免两种配置互相影响峰值 RSS"""
+    output = subprocess.run(
+        [
+            sys.executable,
+            __file__,
+            "--worker",
+            "bounded" if bounded else "unbounded",
+            "--concurrency", str(args.concurrency),
+            "--huge-files", str(args.huge_files),
+            "--huge-mb", str(args.huge_mb),
+        ],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--huge-files", type=int, default=3)
+    parser.add_argument("--huge-mb", type=float, default=4)
+    parser.add_argument("--worker", choices=["bounded", "unbounded"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(
+            args.concurrency, args.huge_files, args.huge_mb, args.worker == "bounded"
+        )
+        print(json.dumps(result))
+        return
+
+    print(json.dumps({
+        "benchmark": "memory",
+        "concurrency": args.concurrency,
+        "huge_files": args.huge_files,
+        "huge_mb": args.huge_mb,
+        "unbounded": measure(args, bounded=False),
+        "bounded": measure(args, bounded=True),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""启动耗时基准：导入耗时与首次健康检查响应耗时
+
+用法: python benchmarks/bench_startup.py [--runs 5] [--port 18000]
+
+每轮在全新子进程中测量，输出各项指标的中位数（JSON）。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def measure_import() -> float:
+    """在全新解释器中导入 app.main 的耗时（秒）"""
+    code = (
+        "import time; t = time.perf_counter(); import app.main; "
+        "print(time.perf_counter() - t)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_first_healthy(port: int, timeout: float = 60.0) -> float:
+    """从启动 uvicorn 进程到 /api/v1/health 首次返回 200 的耗时（秒）"""
+    url = f"http://127.0.0.1:{port}/api/v1/health"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError(f"{timeout}s 内未收到健康检查响应")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=18000)
+    args = parser.parse_args()
+
+    import_times = [measure_import() for _ in range(args.runs)]
+    healthy_times = [measure_first_healthy(args.port) for _ in range(args.runs)]
+
+    print(json.dumps({
+        "benchmark": "startup",
+        "runs": args.runs,
+        "import_seconds": round(statistics.median(import_times), 4),
+        "first_healthy_seconds": round(statistics.median(healthy_times), 4),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,12 @@ set -euo pipefail
 
 # ============================================================
 # pay-agent-codereview 一键启动脚本
-# 用法: ./start.sh [--check] [-y] [-d|--daemon]
-#   --check      仅检测环境，不启动服务
-#   -y           跳过所有确认提示，自动安装
-#   -d|--daemon  后台运行（日志输出到 logs/ 目录）
+# 用法: ./start.sh [--check] [-y] [-d|--daemon] [--workers N] [--worker-procs M]
+#   --check           仅检测环境，不启动服务
+#   -y                跳过所有确认提示，自动安装
+#   -d|--daemon       后台运行（日志输出到 logs/ 目录）
+#   --workers N       uvicorn 进程数（大于 1 时关闭 reload，需将 queue.backend 设为 sqlite 或 redis）
+#   --worker-procs M  额外启动 M 个独立 worker 进程（python -m app.worker，同样需要共享队列后端）
 # ============================================================
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
@@ -16,13 +18,18 @@ cd "$SCRIPT_DIR"
 CHECK_ONLY=false
 AUTO_YES=false
 DAEMON=false
-for arg in "$@"; do
-    case "$arg" in
-        --check)       CHECK_ONLY=true ;;
-        -y)            AUTO_YES=true ;;
-        -d|--daemon)   DAEMON=true ;;
-        *)             echo "未知参数: $arg"; exit 1 ;;
+WORKERS=""
+WORKER_PROCS=0
+while [[ $# -gt 0 ]]; do
+    case "$1" in
+        --check)        CHECK_ONLY=true ;;
+        -y)             AUTO_YES=true ;;
+        -d|--daemon)    DAEMON=true ;;
+        --workers)      WORKERS="${2:?--workers 需要参数}"; shift ;;
+        --worker-procs) WORKER_PROCS="${2:?--worker-procs 需要参数}"; shift ;;
+        *)              echo "未知参数: $1"; exit 1 ;;
     esac
+    shift
 done
 
 LOG_DIR="$SCRIPT_DIR/logs"
@@ -292,15 +299,41 @@ if ! $ENV_OK; then
 fi
 
 if [[ -f "$PID_FILE" ]]; then
-    OLD_PID=$(cat "$PID_FILE")
-    if kill -0 "$OLD_PID" 2>/dev/null; then
-        error "服务已在运行中 (PID: $OLD_PID)"
-        error "请先执行 ./stop.sh 停止服务"
+    while read -r OLD_PID; do
+        if [[ -n "$OLD_PID" ]] && kill -0 "$OLD_PID" 2>/dev/null; then
+            error "服务已在运行中 (PID: $OLD_PID)"
+            error "请先执行 ./stop.sh 停止服务"
+            exit 1
+        fi
+    done < "$PID_FILE"
+    rm -f "$PID_FILE"
+fi
+
+# 多进程部署需要共享队列后端：memory 队列只存在于各自进程内
+if [[ "${WORKERS:-1}" -gt 1 || "$WORKER_PROCS" -gt 0 ]]; then
+    QUEUE_BACKEND="$(python -c 'from app.core.config import settings; print(settings.queue.backend)')"
+    if [[ "$QUEUE_BACKEND" == "memory" ]]; then
+        error "--workers 大于 1 或 --worker-procs 大于 0 时需要共享队列后端"
+        error "请在 config/config.yaml 中将 queue.backend 设置为 sqlite 或 redis"
         exit 1
     fi
-    rm -f "$PID_FILE"
 fi
 
+APP_ARGS=()
+if [[ -n "$WORKERS" ]]; then
+    APP_ARGS+=(--workers "$WORKERS")
+fi
+
+# 独立 worker 进程（消费共享队列），PID 逐行追加到 PID 文件
+start_worker_procs() {
+    local i
+    for ((i = 1; i <= WORKER_PROCS; i++)); do
+        nohup python -m app.worker >> "$LOG_DIR/worker-$i.log" 2>&1 &
+        echo "$!" >> "$PID_FILE"
+        info "worker 进程 $i 已启动 (PID: $!)"
+    done
+}
+
 mkdir -p "$LOG_DIR"
 
 step "启动 Code Review Agent 服务..."
@@ -310,9 +343,10 @@ info "API 文档: http://localhost:8000/docs"
 
 if $DAEMON; then
     LOG_FILE="$LOG_DIR/app.log"
-    nohup python -m app.main >> "$LOG_FILE" 2>&1 &
+    nohup python -m app.main ${APP_ARGS[@]+"${APP_ARGS[@]}"} >> "$LOG_FILE" 2>&1 &
     APP_PID=$!
     echo "$APP_PID" > "$PID_FILE"
+    start_worker_procs
     echo ""
     info "服务已在后台启动 (PID: $APP_PID)"
     info "日志文件: $LOG_FILE"
@@ -321,5 +355,9 @@ else
     LOG_FILE="$LOG_DIR/app.log"
     info "日志文件: $LOG_FILE"
     echo ""
-    python -m app.main 2>&1 | tee -a "$LOG_FILE"
+    if [[ "$WORKER_PROCS" -gt 0 ]]; then
+        start_worker_procs
+        trap './stop.sh' EXIT
+    fi
+    python -m app.main ${APP_ARGS[@]+"${APP_ARGS[@]}"} 2>&1 | tee -a "$LOG_FILE"
 fi
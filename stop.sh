@@ -18,27 +18,31 @@ if [[ ! -f "$PID_FILE" ]]; then
     exit 0
 fi
 
-PID=$(cat "$PID_FILE")
+stop_pid() {
+    local pid="$1"
+    if ! kill -0 "$pid" 2>/dev/null; then
+        warn "进程 $pid 已不存在"
+        return
+    fi
 
-if ! kill -0 "$PID" 2>/dev/null; then
-    warn "进程 $PID 已不存在，清理 PID 文件"
-    rm -f "$PID_FILE"
-    exit 0
-fi
+    info "正在停止进程 (PID: $pid)..."
+    kill "$pid"
 
-info "正在停止服务 (PID: $PID)..."
-kill "$PID"
+    for i in $(seq 1 10); do
+        if ! kill -0 "$pid" 2>/dev/null; then
+            info "进程 $pid 已停止"
+            return
+        fi
+        sleep 1
+    done
 
-for i in $(seq 1 10); do
-    if ! kill -0 "$PID" 2>/dev/null; then
-        rm -f "$PID_FILE"
-        info "服务已停止"
-        exit 0
-    fi
-    sleep 1
-done
+    warn "进程 $pid 未响应 SIGTERM，强制终止..."
+    kill -9 "$pid" 2>/dev/null || true
+}
+
+while read -r PID; do
+    [[ -n "$PID" ]] && stop_pid "$PID"
+done < "$PID_FILE"
 
-warn "服务未响应 SIGTERM，强制终止..."
-kill -9 "$PID" 2>/dev/null || true
 rm -f "$PID_FILE"
-info "服务已强制停止"
+info "服务已停止"
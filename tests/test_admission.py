@@ -0,0 +1,81 @@
+import time
+
+from app.core.config import AdmissionConfig
+from app.worker.admission import AdmissionController, AdmissionRejected
+from app.worker.queue import InMemoryQueue, ReviewJob
+
+import pytest
+
+
+def _job(priority, age, batch_id=None):
+    job = ReviewJob(
+        project="group/repo",
+        source_branch="feature",
+        target_branch="main",
+        priority=priority,
+        batch_id=batch_id,
+    )
+    job.created_at = time.time() - age
+    return job
+
+
+def _controller(queue, **overrides):
+    config = AdmissionConfig(stats_ttl=0, **overrides)
+    controller = AdmissionController(config, queue)
+    # 4 个执行中会话，平均审查 180s
+    for _ in range(4):
+        controller.session_started()
+        controller.session_finished(180)
+    return controller
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return InMemoryQueue(lock_dir=str(tmp_path))
+
+
+def _running(queue, count):
+    for _ in range(count):
+        queue.enqueue(_job(1, 0))
+        queue.claim("worker")
+
+
+def test_batch_admitted_against_max_queued_only(queue):
+    _running(queue, 4)
+    controller = _controller(queue)
+    capacity = controller.admit(100, batch=True)
+    assert capacity.accepting
+    with pytest.raises(AdmissionRejected):
+        controller.admit(501, batch=True)
+
+
+def test_low_priority_backlog_does_not_reject_higher_priority(queue):
+    _running(queue, 4)
+    queue.enqueue_many([_job(2, 1200, batch_id="b") for _ in range(100)])
+    controller = _controller(queue)
+
+    for priority in (0, 1):
+        capacity = controller.admit(priority=priority)
+        assert capacity.queued == 100
+        assert capacity.queued_ahead == 0
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.admit(priority=2)
+    assert 0 < excinfo.value.retry_after <= 600
+
+
+def test_recent_waits_are_filtered_by_priority(queue):
+    _running(queue, 4)
+    controller = _controller(queue)
+    for _ in range(10):
+        controller.record_wait(3600, priority=2)
+    assert controller.capacity(1, priority=1).accepting
+    assert not controller.capacity(1, priority=2).accepting
+    assert not controller.capacity(1).accepting
+
+
+def test_disabled_admission_never_rejects(queue):
+    _running(queue, 4)
+    queue.enqueue_many([_job(1, 1200) for _ in range(100)])
+    controller = _controller(queue, enabled=False)
+    assert not controller.admit(priority=1).accepting
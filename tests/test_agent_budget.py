@@ -0,0 +1,92 @@
+import asyncio
+
+from claude_agent_sdk import AssistantMessage, TextBlock, ToolResultBlock, ToolUseBlock, UserMessage
+
+from app.agent import tools
+from app.agent.budget import ReviewBudget
+from app.agent.code_review_agent import CodeReviewAgent
+from app.models.review import AgentReviewResult, ReviewDecision
+
+_SUBMIT = "mcp__code-review__submit_review"
+
+
+def _assistant(message_id, *blocks):
+    return AssistantMessage(content=list(blocks), model="m", message_id=message_id)
+
+
+def _result(tool_use_id):
+    return UserMessage(content=[ToolResultBlock(tool_use_id=tool_use_id, content="ok")])
+
+
+class FakeClient:
+    """按顺序返回消息；on_result 中的工具结果返回前执行对应的工具副作用"""
+
+    def __init__(self, messages, on_result=None):
+        self.messages = messages
+        self.on_result = on_result or {}
+        self.interrupts = 0
+
+    async def receive_response(self):
+        for msg in self.messages:
+            if self.interrupts:
+                return
+            if isinstance(msg, UserMessage):
+                for block in msg.content:
+                    action = self.on_result.get(block.tool_use_id)
+                    if action:
+                        action()
+            yield msg
+
+    async def interrupt(self):
+        self.interrupts += 1
+
+
+def _budget(max_turns):
+    return ReviewBudget(
+        max_tokens=10**9, max_turns=max_turns, max_seconds=3600, max_file_fetches=100
+    )
+
+
+def _submit():
+    tools._context()["review_result"] = AgentReviewResult(
+        mrDescription="done", issues=[], reviewDecision=ReviewDecision.APPROVE
+    )
+
+
+def _run(client, budget):
+    async def run():
+        tools.set_review_context(
+            gitlab_service=object(), project="p", source_branch="s", target_branch="t"
+        )
+        await CodeReviewAgent._receive(client, budget)
+        return tools.get_review_result()
+
+    return asyncio.run(run())
+
+
+def test_submit_review_on_the_last_turn_is_not_interrupted():
+    client = FakeClient(
+        [
+            _assistant("m1", ToolUseBlock(id="t1", name="mcp__code-review__get_diff", input={})),
+            _result("t1"),
+            # 第 2 轮即达到 max_turns - 1，且这一轮正是提交结果
+            _assistant("m2", TextBlock(text="提交"), ToolUseBlock(id="t2", name=_SUBMIT, input={})),
+            _result("t2"),
+        ],
+        on_result={"t2": _submit},
+    )
+    result = _run(client, _budget(max_turns=3))
+    assert client.interrupts == 0
+    assert result is not None and result.reviewDecision == ReviewDecision.APPROVE
+
+
+def test_exhausted_budget_without_submit_is_interrupted():
+    client = FakeClient([
+        _assistant("m1", ToolUseBlock(id="t1", name="mcp__code-review__get_diff", input={})),
+        _result("t1"),
+        _assistant("m2", ToolUseBlock(id="t2", name="mcp__code-review__get_file_content", input={})),
+        _result("t2"),
+        _assistant("m3", TextBlock(text="继续")),
+    ])
+    assert _run(client, _budget(max_turns=3)) is None
+    assert client.interrupts == 1
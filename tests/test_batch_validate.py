@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from gitlab.exceptions import GitlabGetError
+
+import app.service.gitlab_service as gitlab_service
+from app.api.router import _validate_batch
+from app.api.schemas import BatchReviewItem
+
+
+class FakeBranches:
+    def __init__(self, errors):
+        self.errors = errors
+
+    def get(self, branch):
+        if branch in self.errors:
+            raise self.errors[branch]
+
+
+class FakeProject:
+    def __init__(self, errors):
+        self.branches = FakeBranches(errors)
+
+
+class FakeProjects:
+    def __init__(self, errors):
+        self.errors = errors
+
+    def get(self, project, lazy=False):
+        return FakeProject(self.errors)
+
+
+class FakeGitLabService:
+    errors = {}
+
+    def __init__(self):
+        self.gl = type("FakeGitlab", (), {"projects": FakeProjects(self.errors)})()
+
+    def get_project(self, project):
+        if project in self.errors:
+            raise self.errors[project]
+
+
+@pytest.fixture
+def errors(monkeypatch):
+    errors = {}
+    monkeypatch.setattr(FakeGitLabService, "errors", errors)
+    monkeypatch.setattr(gitlab_service, "GitLabService", FakeGitLabService)
+    return errors
+
+
+def _items(*branches):
+    return [
+        BatchReviewItem(project=project, source_branch=source, target_branch="main")
+        for project, source in branches
+    ]
+
+
+def test_only_404_counts_as_missing(errors):
+    errors["gone"] = GitlabGetError("404 Branch Not Found", response_code=404)
+    errors["flaky"] = GitlabGetError("502 Bad Gateway", response_code=502)
+    errors["slow"] = TimeoutError("read timed out")
+
+    result = asyncio.run(
+        _validate_batch(
+            _items(("group/repo", "gone"), ("group/repo", "flaky"), ("group/repo", "slow"))
+        )
+    )
+    assert result == ["源分支不存在: gone", None, None]
+
+
+def test_project_lookup_failures(errors):
+    errors["group/missing"] = GitlabGetError("404 Project Not Found", response_code=404)
+    errors["group/unavailable"] = GitlabGetError("503", response_code=503)
+
+    result = asyncio.run(
+        _validate_batch(
+            _items(
+                ("group/missing", "feature"),
+                ("group/unavailable", "feature"),
+                ("group/missing", "feature"),
+            )
+        )
+    )
+    assert result == ["项目不存在或无权访问: group/missing", None, "与第 0 条重复"]
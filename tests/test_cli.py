@@ -0,0 +1,36 @@
+import argparse
+import json
+import subprocess
+
+import pytest
+
+from app.cli import _parse_range, main
+
+
+def test_parse_range():
+    assert _parse_range("main..feature/x") == ("main", "feature/x")
+    for value in ("main", "main..", "..feature", "main...feature"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            _parse_range(value)
+
+
+def test_review_reports_empty_and_failed_ranges(tmp_path, capsys):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    for args in (["init", "-q", "-b", "main"], ["commit", "-q", "--allow-empty", "-m", "init"]):
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+            cwd=repo, check=True, capture_output=True,
+        )
+    output = tmp_path / "out"
+
+    code = main(["review", str(repo), "main..main", "main..missing", "-o", str(output), "--json"])
+
+    summaries = json.loads((output / "summary.json").read_text(encoding="utf-8"))
+    assert [s["status"] for s in summaries] == ["empty", "failed"]
+    assert json.loads(capsys.readouterr().out) == summaries
+    assert code == 1
+
+
+def test_review_rejects_non_repository(tmp_path):
+    assert main(["review", str(tmp_path), "main..feature"]) == 1
@@ -0,0 +1,119 @@
+import pytest
+
+from app.core.config import settings
+from app.models.diff import ParsedDiff
+from app.models.review import AgentReviewResult, Issue
+from app.service.comment_dedup import fingerprint_marker, parse_existing_comments
+from app.service.review_service import ReviewService
+
+BOT = 7
+HUMAN = 42
+
+
+def _issue(description="空指针", line=10):
+    return Issue(
+        severity="high",
+        category="bug",
+        file="app/main.py",
+        line=line,
+        description=description,
+        suggestion="判空",
+    )
+
+
+def _legacy_body(issue):
+    return ReviewService._format_issue_comment(issue)
+
+
+def _discussion(id, body, author, resolved=False):
+    return {
+        "id": id,
+        "notes": [{
+            "body": body,
+            "author": {"id": author},
+            "resolvable": True,
+            "resolved": resolved,
+            "position": {"new_path": "app/main.py", "new_line": 10},
+        }],
+    }
+
+
+def test_legacy_comments_only_recognized_from_bot():
+    issue = _issue()
+    discussions = [
+        _discussion("bot", _legacy_body(issue), BOT),
+        _discussion("human", _legacy_body(issue), HUMAN),
+        _discussion("marked", f"{_legacy_body(issue)}\n\n{fingerprint_marker(issue)}", HUMAN),
+    ]
+
+    comments = parse_existing_comments(discussions, BOT)
+    assert [(c.discussion_id, c.own) for c in comments] == [("bot", True), ("marked", False)]
+    # 不知道服务账号时只识别带指纹标记的评论
+    assert [c.discussion_id for c in parse_existing_comments(discussions)] == ["marked"]
+
+
+class FakeGitLab:
+    def __init__(self, discussions, user_id=BOT):
+        self.discussions = discussions
+        self.user_id = user_id
+        self.posted = []
+        self.resolved = []
+
+    def current_user_id(self):
+        if self.user_id is None:
+            raise RuntimeError("401")
+        return self.user_id
+
+    def list_mr_discussions(self, project, mr_iid):
+        return self.discussions
+
+    def get_mr_diff_refs(self, project, mr_iid):
+        return None
+
+    def add_mr_comment(self, project, mr_iid, file, position, comment, diff_refs):
+        self.posted.append(comment)
+
+    def resolve_mr_discussion(self, project, mr_iid, discussion_id):
+        self.resolved.append(discussion_id)
+
+
+def _post(gitlab, issues):
+    service = ReviewService.__new__(ReviewService)
+    service.gitlab_service = gitlab
+    result = AgentReviewResult(
+        mrDescription="", issues=issues, reviewDecision="request-changes"
+    )
+    service._add_issue_comments("group/repo", 1, result, ParsedDiff(files=[]))
+
+
+@pytest.fixture
+def resolve_stale(monkeypatch):
+    monkeypatch.setattr(settings.review, "resolve_stale_comments", True)
+
+
+def test_duplicates_skipped_and_only_own_stale_comments_resolved(resolve_stale):
+    kept, fixed = _issue("空指针", line=10), _issue("越界访问", line=30)
+    gitlab = FakeGitLab([
+        _discussion("kept", f"{_legacy_body(kept)}\n\n{fingerprint_marker(kept)}", BOT),
+        _discussion("fixed", f"{_legacy_body(fixed)}\n\n{fingerprint_marker(fixed)}", BOT),
+        _discussion("human", _legacy_body(fixed), HUMAN),
+        _discussion("quoted", f"{_legacy_body(fixed)}\n\n{fingerprint_marker(fixed)}", HUMAN),
+    ])
+    new = _issue("资源泄漏", line=50)
+
+    _post(gitlab, [_issue("空指针", line=12), new, new])
+
+    assert len(gitlab.posted) == 1 and "资源泄漏" in gitlab.posted[0]
+    assert gitlab.resolved == ["fixed"]
+
+
+def test_nothing_resolved_without_bot_identity(resolve_stale):
+    fixed = _issue()
+    gitlab = FakeGitLab(
+        [_discussion("fixed", f"{_legacy_body(fixed)}\n\n{fingerprint_marker(fixed)}", BOT)],
+        user_id=None,
+    )
+
+    _post(gitlab, [])
+
+    assert gitlab.resolved == []
@@ -0,0 +1,129 @@
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import DiffConfig
+from app.models.diff import FileDiff, ParsedDiff, estimate_tokens
+
+
+def _file(diff, path="app/main.py", **flags):
+    return {"old_path": path, "new_path": path, "diff": diff, **flags}
+
+
+def _hunk(diff):
+    return FileDiff.parse(_file(diff)).hunks[0]
+
+
+def test_parse_tracks_old_and_new_line_numbers():
+    file_diff = FileDiff.parse(_file(
+        "@@ -10,3 +10,4 @@ def handler():\n"
+        " context\n"
+        "-old = 1\n"
+        "+new = 1\n"
+        "+extra = 2\n"
+        " tail\n"
+    ))
+    hunk = file_diff.hunks[0]
+    assert (hunk.old_start, hunk.old_count, hunk.new_start, hunk.new_count) == (10, 3, 10, 4)
+    assert hunk.section == " def handler():"
+    assert [(line.kind, line.old_line, line.new_line) for line in hunk.lines] == [
+        (" ", 10, 10),
+        ("-", 11, None),
+        ("+", None, 11),
+        ("+", None, 12),
+        (" ", 12, 13),
+    ]
+    assert file_diff.added_lines() == {11, 12}
+
+
+def test_position_snaps_to_nearest_commentable_line():
+    diff = ParsedDiff.from_compare({"diffs": [_file("@@ -1,2 +1,3 @@\n a\n+b\n c\n")]})
+    added = diff.position("app/main.py", 2)
+    assert (added.old_line, added.new_line) == (None, 2)
+    context = diff.position("app/main.py", 3)
+    assert (context.old_line, context.new_line) == (2, 3)
+    assert diff.position("app/main.py", 6) is None
+    assert diff.position("app/main.py", 5, max_distance=2).new_line == 3
+    assert diff.position("other.py", 2) is None
+
+
+@pytest.mark.parametrize("diff", [
+    "@@ -1,2 +1,2 @@\n-x = 1   \n-y = 2\n+x = 1\n+y = 2\n",
+    "@@ -1,1 +1,1 @@\n-x = 1\r\n+x = 1\n",
+    "@@ -1,1 +1,2 @@\n-x = 1\n+x = 1\n+\n",
+])
+def test_trailing_whitespace_and_line_endings_are_whitespace_only(diff):
+    assert _hunk(diff).is_whitespace_only()
+
+
+@pytest.mark.parametrize("diff", [
+    # Python 中缩进变化会改变代码块归属
+    "@@ -1,2 +1,2 @@\n-if ok:\n-    run()\n+if ok:\n+run()\n",
+    # 字符串中的空白属于内容
+    '@@ -1,1 +1,1 @@\n-sep = " "\n+sep = ""\n',
+    '@@ -1,1 +1,1 @@\n-msg = "a  b"\n+msg = "a b"\n',
+])
+def test_semantic_whitespace_changes_are_kept(diff):
+    assert not _hunk(diff).is_whitespace_only()
+
+
+def test_compact_render_folds_whitespace_only_files_and_renames():
+    body = "".join(f"+line {i}\n" for i in range(5))
+    removed = body.replace("+", "-")
+    diff = ParsedDiff.from_compare({"diffs": [
+        _file("@@ -1,1 +1,1 @@\n-x = 1  \n+x = 1\n", path="a.py"),
+        _file(f"@@ -1,5 +0,0 @@\n{removed}", path="old.py", deleted_file=True),
+        _file(f"@@ -0,0 +1,5 @@\n{body}", path="new.py", new_file=True),
+    ]})
+    rendered = diff.render("compact")
+    assert "=== a.py: 仅空白字符变更（1 处），已省略" in rendered
+    assert "=== 重命名: old.py -> new.py（内容无变化）" in rendered
+    assert "+line 0" not in rendered
+    assert "+line 0" in diff.render()
+
+
+def test_render_mode_is_validated():
+    assert DiffConfig(render_mode="compact").render_mode == "compact"
+    with pytest.raises(ValidationError):
+        DiffConfig(render_mode="short")
+
+
+def test_truncated_file_keeps_positions_for_the_whole_diff():
+    body = "".join(f"+added {i}\n" for i in range(50))
+    raw = (
+        f"@@ -1,2 +1,52 @@\n context\n{body} tail\n"
+        "@@ -100,3 +150,3 @@ def later():\n keep\n-old\n+new\n keep\n"
+    )
+    full = ParsedDiff.from_compare({"diffs": [_file(raw)]})
+    truncated = ParsedDiff.from_compare({"diffs": [_file(raw)]}, max_file_bytes=120)
+    file_diff = truncated.files[0]
+
+    assert file_diff.truncated_size == len(raw)
+    assert "def later" not in truncated.render()
+    assert "diff 已截断" in truncated.render()
+    assert file_diff.added_lines() == full.files[0].added_lines()
+    for line in (2, 40, 51, 52, 150, 151, 152):
+        assert truncated.position("app/main.py", line) == full.position("app/main.py", line)
+    assert truncated.position("app/main.py", 152).old_line == 102
+    assert truncated.position("app/main.py", 151).old_line is None
+    assert truncated.position("app/main.py", 120) is None
+
+
+def test_full_tokens_estimated_without_rendering():
+    raw = "@@ -1,3 +1,3 @@ def f():\n context\n-旧的注释 old\n+新的注释 new\n keep\n"
+    parsed = ParsedDiff.from_compare({"diffs": [_file(raw), _file(raw, "b.py")]})
+    assert parsed.full_tokens() == estimate_tokens(parsed.render())
+
+
+def test_diff_caps_measure_utf8_bytes():
+    line = "+" + "中" * 10 + "\n"  # 31 字节，11 个字符
+    raw = "@@ -0,0 +1,4 @@\n" + line * 4
+    file_diff = FileDiff.parse(_file(raw), max_bytes=80)
+    assert file_diff.truncated_size == len(raw.encode("utf-8"))
+    assert len(file_diff.hunks[0].lines) == 2
+    assert sorted(file_diff.added_lines()) == [1, 2, 3, 4]
+
+    parsed = ParsedDiff.from_compare({"diffs": [_file(raw), _file(raw, "b.py")]})
+    rendered = parsed.render(max_bytes=200)
+    # 按字符计两个文件都放得下，按字节计第二个文件超限
+    assert len(parsed.render()) <= 200 < len(parsed.render().encode("utf-8"))
+    assert "超过 200 字节上限" in rendered and "- b.py" in rendered
@@ -0,0 +1,19 @@
+from app.feishu_bot import _failed_phase
+from app.worker.queue import ReviewJob
+
+
+def _job(*phases):
+    return ReviewJob(
+        project="group/repo",
+        source_branch="feature",
+        target_branch="main",
+        checkpoints={phase: True for phase in phases},
+    )
+
+
+def test_failed_phase_follows_last_checkpoint():
+    assert _failed_phase(_job()) == "agent"
+    assert _failed_phase(_job("agent_result")) == "mr"
+    assert _failed_phase(_job("agent_result", "mr")) == "mr"
+    assert _failed_phase(_job("agent_result", "mr", "description")) == "comments"
+    assert _failed_phase(_job("agent_result", "mr", "description", "comments")) == "comments"
@@ -0,0 +1,101 @@
+import subprocess
+
+import pytest
+
+from app.core.config import settings
+from app.service.git_service import LocalGitService, LocalRepoService
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings.gitlab, "temp_dir", str(tmp_path / "work"))
+    monkeypatch.setattr(settings.gitlab, "max_worktrees", 1)
+    origin = tmp_path / "origin"
+    origin.mkdir()
+
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+            cwd=origin, check=True, capture_output=True,
+        )
+
+    git("init", "-q", "-b", "main")
+    git("commit", "-q", "--allow-empty", "-m", "init")
+    for branch in ("a", "b"):
+        git("checkout", "-q", "-b", branch, "main")
+        (origin / f"{branch}.txt").write_text(branch)
+        git("add", ".")
+        git("commit", "-q", "-m", branch)
+    return str(origin)
+
+
+def test_worktree_in_use_is_not_evicted(repo):
+    service = LocalRepoService()
+    with service.checked_out(repo, "a") as first:
+        second = service.checkout(repo, "b")
+        # 超出 max_worktrees 时正在使用的工作目录也保留
+        assert (first / "a.txt").read_text() == "a"
+        assert second.exists()
+    service.release(second)
+
+    # 释放后，下一次检出会淘汰最久未用的目录
+    with service.checked_out(repo, "a") as again:
+        assert again == first
+        assert not second.exists()
+
+
+@pytest.fixture
+def local_repo(tmp_path):
+    repo = tmp_path / "local"
+    repo.mkdir()
+
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+            cwd=repo, check=True, capture_output=True,
+        )
+
+    git("init", "-q", "-b", "main")
+    (repo / "keep.py").write_text("a = 1\nb = 2\n")
+    (repo / "gone.py").write_text("x = 1\n")
+    (repo / "old_name.py").write_text("".join(f"line {i}\n" for i in range(20)))
+    git("add", ".")
+    git("commit", "-q", "-m", "base")
+    git("checkout", "-q", "-b", "feature")
+    (repo / "keep.py").write_text("a = 1\nb = 3\n")
+    (repo / "新文件.py").write_text("print('hi')\n")
+    git("rm", "-q", "gone.py")
+    git("mv", "old_name.py", "new_name.py")
+    git("add", ".")
+    git("commit", "-q", "-m", "feature")
+    # 目标分支在分叉后的提交不应出现在比较结果中
+    git("checkout", "-q", "main")
+    (repo / "main_only.py").write_text("m = 1\n")
+    git("add", ".")
+    git("commit", "-q", "-m", "main")
+    return str(repo)
+
+
+def test_local_compare_matches_gitlab_shape(local_repo):
+    service = LocalGitService()
+    diffs = {d["new_path"]: d for d in service.get_compare(local_repo, "feature", "main")["diffs"]}
+
+    assert set(diffs) == {"keep.py", "新文件.py", "gone.py", "new_name.py"}
+    assert diffs["keep.py"]["diff"].startswith("@@ -1,2 +1,2 @@")
+    assert "-b = 2\n+b = 3\n" in diffs["keep.py"]["diff"]
+    assert diffs["新文件.py"]["new_file"] and diffs["新文件.py"]["old_path"] == "新文件.py"
+    assert diffs["gone.py"]["deleted_file"]
+    renamed = diffs["new_name.py"]
+    assert renamed["renamed_file"] and renamed["old_path"] == "old_name.py"
+    assert renamed["diff"] == ""
+
+
+def test_local_file_content(local_repo):
+    service = LocalGitService()
+    sha = service.resolve(local_repo, "feature")
+    assert len(sha) == 40
+    assert service.get_file_content(local_repo, "keep.py", sha) == "a = 1\nb = 3\n"
+    with pytest.raises(FileNotFoundError):
+        service.get_file_content(local_repo, "gone.py", sha)
+    with pytest.raises(RuntimeError):
+        service.resolve(local_repo, "no-such-branch")
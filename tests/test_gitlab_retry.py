@@ -0,0 +1,40 @@
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from app.service.gitlab_service import _TransientResponseError, _classify_gitlab_error
+
+
+def _request(method):
+    return requests.Request(method, "https://gitlab.example.com/api/v4").prepare()
+
+
+def _response(status, method):
+    response = requests.Response()
+    response.status_code = status
+    response.request = _request(method)
+    return response
+
+
+def test_idempotent_methods_retry_server_errors():
+    for method in ("GET", "PUT", "DELETE"):
+        assert _classify_gitlab_error(_TransientResponseError(_response(503, method))) == 0.0
+    assert _classify_gitlab_error(requests.ReadTimeout(request=_request("GET"))) == 0.0
+
+
+def test_post_is_not_retried_after_it_may_have_reached_the_server():
+    assert _classify_gitlab_error(_TransientResponseError(_response(502, "POST"))) is None
+    assert _classify_gitlab_error(requests.ReadTimeout(request=_request("POST"))) is None
+    assert _classify_gitlab_error(
+        requests.ConnectionError("Connection reset by peer", request=_request("POST"))
+    ) is None
+
+
+def test_post_retries_rate_limit_and_refused_connections():
+    response = _response(429, "POST")
+    response.headers["Retry-After"] = "7"
+    assert _classify_gitlab_error(_TransientResponseError(response)) == 7.0
+    assert _classify_gitlab_error(requests.ConnectTimeout(request=_request("POST"))) == 0.0
+    refused = MaxRetryError(None, "/api/v4", NewConnectionError(None, "refused"))
+    assert _classify_gitlab_error(
+        requests.ConnectionError(refused, request=_request("POST"))
+    ) == 0.0
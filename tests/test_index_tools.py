@@ -0,0 +1,101 @@
+import asyncio
+import threading
+from pathlib import Path
+
+from app.agent import tools
+
+
+class FakeRepoService:
+    def __init__(self):
+        self.checkouts = []
+        self.released = []
+        self._lock = threading.Lock()
+
+    def checkout(self, project, ref):
+        with self._lock:
+            self.checkouts.append((project, ref))
+        return Path("/tmp") / f"{ref}-sha"
+
+    def release(self, worktree):
+        self.released.append(worktree)
+
+
+class FakeIndexService:
+    def __init__(self, name, repo_service):
+        self.name = name
+        self.repo_service = repo_service
+        self.calls = []
+
+    def get(self, project, ref, worktree=None):
+        self.calls.append((project, ref, worktree))
+        return (self.name, worktree)
+
+
+def _review(repo, symbols, search):
+    async def run():
+        tools.set_review_context(
+            gitlab_service=object(),
+            project="group/repo",
+            source_branch="feature",
+            target_branch="main",
+        )
+        first = await asyncio.gather(*(
+            tools._get_index(service, "group/repo", "feature")
+            for service in (symbols, search, symbols, search)
+        ))
+        again = await tools._get_index(symbols, "group/repo", "feature")
+        other = await tools._get_index(symbols, "group/repo", "main")
+        assert repo.released == []
+        tools.clear_review_context()
+        return first, again, other
+
+    return asyncio.run(run())
+
+
+def test_index_checked_out_once_per_review_and_branch():
+    repo = FakeRepoService()
+    symbols = FakeIndexService("symbols", repo)
+    search = FakeIndexService("search", repo)
+
+    first, again, other = _review(repo, symbols, search)
+
+    worktree = Path("/tmp/feature-sha")
+    assert first == [("symbols", worktree), ("search", worktree)] * 2
+    assert again == ("symbols", worktree)
+    assert other == ("symbols", Path("/tmp/main-sha"))
+    assert repo.checkouts == [("group/repo", "feature"), ("group/repo", "main")]
+    assert len(symbols.calls) == 2 and len(search.calls) == 1
+    # 审查结束时释放持有的工作目录
+    assert repo.released == [worktree, Path("/tmp/main-sha")]
+
+    # 新的审查重新解析分支
+    repo.released.clear()
+    _review(repo, symbols, search)
+    assert len(repo.checkouts) == 4
+
+
+def test_failed_checkout_is_retried():
+    class FlakyRepoService(FakeRepoService):
+        def checkout(self, project, ref):
+            if not self.checkouts:
+                self.checkouts.append(None)
+                raise RuntimeError("network")
+            return super().checkout(project, ref)
+
+    repo = FlakyRepoService()
+    symbols = FakeIndexService("symbols", repo)
+
+    async def run():
+        tools.set_review_context(
+            gitlab_service=object(),
+            project="group/repo",
+            source_branch="feature",
+            target_branch="main",
+        )
+        try:
+            await tools._get_index(symbols, "group/repo", "feature")
+        except RuntimeError:
+            pass
+        return await tools._get_index(symbols, "group/repo", "feature")
+
+    assert asyncio.run(run()) == ("symbols", Path("/tmp/feature-sha"))
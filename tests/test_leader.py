@@ -0,0 +1,45 @@
+from app.worker.leader import LeaderElector
+
+
+class FakeLeaseQueue:
+    def __init__(self):
+        self.results = []
+
+    def acquire_lease(self, name, owner, ttl):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def _elector(queue, events, fail_elected=False):
+    def elected():
+        events.append("elected")
+        if fail_elected and events.count("elected") == 1:
+            raise RuntimeError("connect failed")
+
+    return LeaderElector(
+        "bot", elected, lambda: events.append("revoked"), queue=queue
+    )
+
+
+def test_callbacks_run_on_every_transition():
+    queue, events = FakeLeaseQueue(), []
+    elector = _elector(queue, events)
+    queue.results = [True, True, False, False, True, RuntimeError("backend down"), True]
+    for _ in queue.results[:]:
+        elector.step()
+    assert events == ["elected", "revoked", "elected", "revoked", "elected"]
+    assert elector.is_leader
+
+
+def test_failed_callback_is_retried_next_round():
+    queue, events = FakeLeaseQueue(), []
+    elector = _elector(queue, events, fail_elected=True)
+    queue.results = [True, True, True]
+    elector.step()
+    assert not elector.is_leader
+    elector.step()
+    assert elector.is_leader
+    elector.step()
+    assert events == ["elected", "elected"]
@@ -0,0 +1,26 @@
+import asyncio
+
+import pytest
+
+from app.core.config import LintAnalyzerConfig, settings
+from app.service.lint_service import LintService
+
+
+def test_timed_out_analyzer_is_reaped(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings.lint, "timeout", 0.2)
+    (tmp_path / "main.py").write_text("x = 1\n")
+    analyzer = LintAnalyzerConfig(name="slow", command=["sh", "-c", "exec sleep 10", "sh"])
+    processes = []
+    create = asyncio.create_subprocess_exec
+
+    async def tracking_exec(*args, **kwargs):
+        process = await create(*args, **kwargs)
+        processes.append(process)
+        return process
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", tracking_exec)
+    service = LintService(repo_service=object())
+
+    with pytest.raises(RuntimeError, match="执行超时"):
+        asyncio.run(service._run_analyzer(analyzer, tmp_path, {"main.py": {1}}))
+    assert processes[0].returncode is not None
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from app.core.config import OutboundLimitConfig
+from app.core.outbound import CircuitOpenError, OutboundGovernor, RateLimitedError
+
+
+def _governor(**config):
+    return OutboundGovernor(
+        "test", OutboundLimitConfig(rate=100, burst=100, failure_threshold=2, **config)
+    )
+
+
+def test_session_outcomes_counted_by_classification():
+    governor = _governor()
+
+    governor.record(asyncio.run(governor.admit()), ValueError("invalid request"))
+    governor.record(asyncio.run(governor.admit()), RateLimitedError("overloaded"))
+    # 业务错误不计入，两次可重试错误才熔断
+    assert governor.breaker.state == "closed"
+    governor.record(asyncio.run(governor.admit()), RateLimitedError("overloaded"))
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(governor.admit())
+
+
+def test_abandoned_trial_allows_next_trial():
+    governor = _governor(recovery_timeout=0)
+    for _ in range(2):
+        governor.record(asyncio.run(governor.admit()), RateLimitedError("429"))
+
+    asyncio.run(governor.admit())
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(governor.admit())
+    governor.abandon()
+    governor.record(asyncio.run(governor.admit()))
+    assert governor.breaker.state == "closed"
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from app.core.config import settings
+from app.service import prefetch_service
+from app.service.prefetch_service import PrefetchService, start_prefetch
+from app.service.review_cache import ReviewCache
+
+_COMPARE = {
+    "diffs": [
+        {"old_path": f"f{i}.py", "new_path": f"f{i}.py", "new_file": True, "diff": "+x\n"}
+        for i in range(4)
+    ]
+}
+
+
+class SlowGitLab:
+    """get_compare 与 download_file 在 release 之前阻塞"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.downloading = threading.Event()
+        self.downloads = 0
+
+    def get_compare(self, project, source_branch, target_branch):
+        return _COMPARE
+
+    def download_file(self, project, file_path, ref, dest):
+        self.downloads += 1
+        self.downloading.set()
+        self.release.wait(5)
+        dest.write_text("x = 1\n")
+        return dest.stat().st_size
+
+
+@pytest.fixture
+def gitlab(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings.gitlab, "temp_dir", str(tmp_path))
+    monkeypatch.setattr(settings.prefetch, "enabled", True)
+    monkeypatch.setattr(settings.prefetch, "concurrency", 1)
+    monkeypatch.setattr(settings.index, "enabled", False)
+    fake = SlowGitLab()
+    monkeypatch.setattr(PrefetchService, "_gitlab", lambda self: fake)
+    threads = []
+    original = prefetch_service.threading.Thread
+
+    def track(*args, **kwargs):
+        thread = original(*args, **kwargs)
+        threads.append(thread)
+        return thread
+
+    monkeypatch.setattr(prefetch_service.threading, "Thread", track)
+    fake.threads = threads
+    return fake
+
+
+def test_marker_is_set_before_the_thread_runs(gitlab):
+    start_prefetch("job1", "group/repo", "feature", "main")
+    # 线程尚未产出任何内容时，读取方也会等待预取而不是立即回源
+    assert ReviewCache("job1").get_compare(wait=5) == _COMPARE
+    gitlab.release.set()
+    gitlab.threads[0].join(5)
+
+
+def test_clear_during_prefetch_cancels_and_leaves_nothing(gitlab, tmp_path):
+    start_prefetch("job2", "group/repo", "feature", "main")
+    cache = ReviewCache("job2")
+    assert gitlab.downloading.wait(5)
+
+    cache.clear()
+    assert cache.cancelled
+    gitlab.release.set()
+    gitlab.threads[0].join(5)
+
+    # 进行中的下载完成后不再继续，之后写入的内容也被清除
+    assert gitlab.downloads == 1
+    assert list((tmp_path / "cache").iterdir()) == []
+
+
+def test_clear_without_prefetch(gitlab, tmp_path):
+    cache = ReviewCache("job3")
+    cache.put_file("main", "a.py", "x")
+    cache.clear()
+    assert not cache.cancelled
+    assert list((tmp_path / "cache").iterdir()) == []
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from app.worker.queue import InMemoryQueue, JobStatus, QueueStats, ReviewJob, SQLiteQueue
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def queue(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryQueue(lock_dir=str(tmp_path))
+    return SQLiteQueue(str(tmp_path / "queue.db"))
+
+
+def _job(priority=1, age=0.0, **fields):
+    job = ReviewJob(
+        project="group/repo",
+        source_branch="feature",
+        target_branch="main",
+        priority=priority,
+        **fields,
+    )
+    job.created_at = time.time() - age
+    return job
+
+
+def test_stats_group_queued_jobs_by_priority(queue):
+    queue.enqueue(_job(priority=0, age=5))
+    queue.enqueue_many([_job(priority=2, age=50), _job(priority=2, age=20)])
+    failed = _job(priority=1, age=100, status=JobStatus.FAILED)
+    queue.enqueue_many([failed])
+
+    stats = queue.stats()
+    assert stats.queued == 3
+    assert stats.running == 0
+    assert set(stats.by_priority) == {0, 2}
+    assert stats.by_priority[2][0] == 2
+
+    ahead, oldest = stats.ahead_of(1)
+    assert ahead == 1
+    assert oldest == pytest.approx(time.time() - 5, abs=1)
+    assert stats.ahead_of(None) == (3, stats.oldest_queued_at)
+
+
+def test_claim_moves_job_to_running(queue):
+    job = queue.enqueue(_job())
+    claimed = queue.claim("worker")
+    assert claimed.id == job.id
+    assert claimed.status == JobStatus.RUNNING
+    assert queue.claim("worker") is None
+    stats = queue.stats()
+    assert (stats.queued, stats.running, stats.by_priority) == (0, 1, {})
+
+
+def test_ahead_of_empty_stats():
+    assert QueueStats(queued=0, running=0).ahead_of(0) == (0, None)
+
+
+def test_claim_sees_interactive_job_behind_scan_limit(queue, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings.scheduling, "scan_limit", 5)
+    queue.enqueue_many([_job(priority=2, age=60 - i) for i in range(10)])
+    interactive = queue.enqueue(_job(priority=0))
+
+    assert queue.position(interactive.id) == 0
+    assert queue.claim("worker").id == interactive.id
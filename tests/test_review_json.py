@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from app.agent.review_json import ReviewJsonError, parse_review_json
+from app.models.review import ReviewDecision, Severity
+
+
+def _review(**overrides):
+    data = {
+        "mrDescription": "desc",
+        "issues": [
+            {
+                "file": "a.py",
+                "line": 3,
+                "severity": "high",
+                "category": "bug",
+                "description": "d",
+                "suggestion": "s",
+            }
+        ],
+        "reviewDecision": "request-changes",
+    }
+    data.update(overrides)
+    return data
+
+
+def test_valid_json_needs_no_repair():
+    result, repairs = parse_review_json(json.dumps(_review()))
+    assert repairs == []
+    assert result.reviewDecision == ReviewDecision.REQUEST_CHANGES
+
+
+def test_code_fence_and_surrounding_text():
+    text = "结果如下：\n```json\n" + json.dumps(_review()) + "\n```"
+    result, repairs = parse_review_json(text)
+    assert "code_fence" in repairs or "surrounding_text" in repairs
+    assert result.issues[0].severity == Severity.HIGH
+
+
+def test_python_literals_outside_strings_are_fixed():
+    text = (
+        '{"mrDescription": "returns None when flag is True", "issues": ['
+        '{"file": "a.py", "line": None, "severity": "low", "category": "style",'
+        ' "description": "x", "suggestion": "use `is None`"}],'
+        ' "reviewDecision": "approve"}'
+    )
+    result, repairs = parse_review_json(text)
+    assert "python_literal" in repairs
+    assert result.mrDescription == "returns None when flag is True"
+    assert result.issues[0].line is None
+    assert result.issues[0].suggestion == "use `is None`"
+
+
+def test_trailing_comma_inside_string_is_kept():
+    text = (
+        '{"mrDescription": "ends with True, }", "issues": [],'
+        ' "reviewDecision": "approve",}'
+    )
+    result, repairs = parse_review_json(text)
+    assert "trailing_comma" in repairs
+    assert result.mrDescription == "ends with True, }"
+
+
+def test_escaped_quotes_in_strings():
+    text = '{"mrDescription": "say \\"None\\", True,]", "issues": [], "reviewDecision": "approve",}'
+    result, _ = parse_review_json(text)
+    assert result.mrDescription == 'say "None", True,]'
+
+
+def test_enum_and_line_normalization():
+    data = _review(reviewDecision="APPROVE_WITH_COMMENTS")
+    data["issues"][0].update(severity="HIGH", line="L42")
+    result, repairs = parse_review_json(json.dumps(data))
+    assert result.reviewDecision == ReviewDecision.APPROVE_WITH_COMMENTS
+    assert result.issues[0].line == 42
+    assert {"enum_value", "line_type"} <= set(repairs)
+
+
+def test_field_errors_are_reported_as_pointers():
+    data = _review()
+    data["issues"][0]["severity"] = "urgent"
+    with pytest.raises(ReviewJsonError) as excinfo:
+        parse_review_json(json.dumps(data))
+    assert any(error.startswith("/issues/0/severity") for error in excinfo.value.errors)
+
+
+def test_unrepairable_json():
+    with pytest.raises(ReviewJsonError):
+        parse_review_json("{not json")
@@ -0,0 +1,65 @@
+import time
+
+from app.core.config import PriorityClassConfig, SchedulingConfig
+from app.worker.queue import ReviewJob
+from app.worker.scheduler import Scheduler
+
+
+def _scheduler(**overrides):
+    config = SchedulingConfig(
+        classes=[
+            PriorityClassConfig(
+                name="hotfix", priority=0, target_branches=["release/*", "hotfix/*"]
+            )
+        ],
+        **overrides,
+    )
+    return Scheduler(config)
+
+
+def _job(project="group/repo", target="main", batch_id=None, age=0.0):
+    job = ReviewJob(
+        project=project, source_branch="feature", target_branch=target, batch_id=batch_id
+    )
+    job.created_at = time.time() - age
+    return job
+
+
+def test_classify_matches_first_class():
+    scheduler = _scheduler()
+    hotfix = scheduler.classify(_job(target="release/1.2"))
+    assert (hotfix.priority_class, hotfix.priority) == ("hotfix", 0)
+    normal = scheduler.classify(_job())
+    assert (normal.priority_class, normal.priority) == ("normal", 1)
+
+
+def test_select_prefers_priority_then_fair_share():
+    scheduler = _scheduler(aging_seconds=0)
+    busy = scheduler.classify(_job(project="a", age=30))
+    idle = scheduler.classify(_job(project="b", age=10))
+    hotfix = scheduler.classify(_job(project="a", target="release/1", age=1))
+    running = [scheduler.classify(_job(project="a"))]
+
+    assert scheduler.select([busy, idle, hotfix], running) is hotfix
+    assert scheduler.select([busy, idle], running) is idle
+    assert scheduler.select([busy, idle], []) is busy
+
+
+def test_aging_promotes_long_waiting_jobs():
+    scheduler = _scheduler(aging_seconds=300)
+    old_batch = scheduler.classify(_job(batch_id="b", age=700))
+    fresh = scheduler.classify(_job(project="other"))
+    assert scheduler.select([fresh, old_batch], []) is old_batch
+
+
+def test_batch_jobs_scheduled_below_their_class():
+    scheduler = _scheduler()
+    batch = scheduler.classify(_job(target="release/1.2", batch_id="b"))
+    assert (batch.priority_class, batch.priority) == ("hotfix", 1)
+
+
+def test_priority_for_matches_classify():
+    scheduler = _scheduler()
+    assert scheduler.priority_for("group/repo", "feature", "hotfix/x") == 0
+    assert scheduler.priority_for("group/repo", "feature", "main") == 1
+    assert scheduler.priority_for("group/repo", "feature", "main", batch=True) == 2
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 这些 SDK 导入耗时较长，只在实际使用时加载
+_HEAVY_MODULES = ("gitlab", "lark_oapi", "claude_agent_sdk")
+
+
+def test_app_import_does_not_load_heavy_sdks():
+    code = (
+        "import sys, app.main; "
+        f"print(','.join(m for m in {_HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == ""
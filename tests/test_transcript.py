@@ -0,0 +1,78 @@
+import json
+
+from claude_agent_sdk import (
+    AssistantMessage,
+    ResultMessage,
+    TextBlock,
+    ToolResultBlock,
+    ToolUseBlock,
+    UserMessage,
+)
+
+from app.agent.transcript import TranscriptRecorder
+from app.cli import _load_transcripts, build_profile
+
+
+def _assistant(message_id, *blocks, usage=None):
+    return AssistantMessage(content=list(blocks), model="m", message_id=message_id, usage=usage)
+
+
+def _result(tool_use_id, text, is_error=False):
+    return UserMessage(content=[
+        ToolResultBlock(tool_use_id, [{"type": "text", "text": text}], is_error)
+    ])
+
+
+def _record_review(path, tool_results):
+    recorder = TranscriptRecorder(path)
+    recorder.start(project="group/repo")
+    usage = {"input_tokens": 100, "output_tokens": 10}
+    # 同一次响应拆分为文本与工具调用两条消息，只计一轮、用量只记一次
+    recorder.record(_assistant("m1", TextBlock("先看 diff"), usage=usage))
+    recorder.record(_assistant(
+        "m1",
+        ToolUseBlock("t1", "mcp__review__get_diff", {"project": "x" * 500}),
+        usage=usage,
+    ))
+    recorder.record(_result("t1", "d" * 40))
+    for index, (text, is_error) in enumerate(tool_results, start=2):
+        tool_id = f"t{index}"
+        recorder.record(_assistant(
+            f"m{index}", ToolUseBlock(tool_id, "mcp__review__get_file_content", {}), usage=usage
+        ))
+        recorder.record(_result(tool_id, text, is_error))
+    recorder.record(ResultMessage(
+        subtype="success", duration_ms=1, duration_api_ms=1, is_error=False,
+        num_turns=1 + len(tool_results), session_id="s",
+    ))
+    recorder.close(tokens=330, elapsed=1.5, wrapped_up=False)
+
+
+def test_recorder_counts_turns_once_per_response(tmp_path):
+    path = tmp_path / "review.jsonl"
+    _record_review(path, [("f" * 10, False)])
+
+    events = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [e["type"] for e in events] == [
+        "start", "assistant", "assistant", "tool_result",
+        "assistant", "tool_result", "result", "end",
+    ]
+    first, second = events[1], events[2]
+    assert first["turn"] == second["turn"] == 1
+    assert "usage" in first and "usage" not in second
+    assert second["tool_calls"][0]["args"]["project"].endswith("...(+300)")
+    assert events[3]["name"] == "mcp__review__get_diff" and events[3]["chars"] == 40
+    assert events[-1]["turns"] == 2
+
+
+def test_profile_aggregates_turns_and_tools(tmp_path):
+    _record_review(tmp_path / "a.jsonl", [])
+    _record_review(tmp_path / "b.jsonl", [("f" * 10, False), ("", True)])
+
+    profile = build_profile(_load_transcripts([tmp_path]))
+    assert profile["reviews"] == 2
+    assert profile["turns"]["histogram"] == {1: 1, 3: 1}
+    assert profile["tokens"]["total"] == 660
+    files = profile["tools"]["mcp__review__get_file_content"]
+    assert (files["calls"], files["errors"], files["calls_per_review"]) == (2, 1, 1.0)
+    assert profile["tools"]["mcp__review__get_diff"]["total_chars"] == 80